@@ -0,0 +1,3 @@
+"""
+性能基准测试脚本，在backend目录下以 python -m benchmarks.<模块名> 运行
+"""
@@ -0,0 +1,64 @@
+"""
+图像编解码基准测试：对比临时文件往返与内存编解码的单次请求耗时
+
+用法：
+    python -m benchmarks.codec_benchmark [--sizes 1 12 48] [--repeat 5]
+"""
+import argparse
+import base64
+import os
+import tempfile
+import cv2
+import numpy as np
+from benchmarks.common import image_shape, synthetic_image, summarize, time_call
+from src.utils.image_codec import decode_base64_image, encode_base64_image
+
+
+def legacy_round_trip(image_data: str) -> str:
+    """原先ImageService中基于临时文件的解码与编码流程"""
+    if "base64," in image_data:
+        image_data = image_data.split("base64,")[1]
+    image_bytes = base64.b64decode(image_data)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+        temp_file.write(image_bytes)
+        temp_file_path = temp_file.name
+    image = cv2.imread(temp_file_path)
+    os.unlink(temp_file_path)
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+        cv2.imwrite(temp_file.name, image)
+        temp_file_path = temp_file.name
+    with open(temp_file_path, "rb") as image_file:
+        encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
+    os.unlink(temp_file_path)
+    return encoded_image
+
+
+def memory_round_trip(image_data: str) -> str:
+    """内存编解码流程"""
+    return encode_base64_image(decode_base64_image(image_data))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="图像编解码基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 48], help="图像百万像素数")
+    parser.add_argument("--repeat", type=int, default=5, help="计时次数")
+    args = parser.parse_args()
+    
+    print(f"{'MP':>6} {'payload(MB)':>12} {'tempfile(ms)':>14} {'memory(ms)':>12} {'speedup':>8}")
+    for megapixels in args.sizes:
+        height, width = image_shape(megapixels)
+        image = synthetic_image(height, width)
+        _, buffer = cv2.imencode(".jpg", image)
+        image_data = "data:image/jpeg;base64," + base64.b64encode(buffer).decode("ascii")
+        
+        legacy = summarize(time_call(lambda: legacy_round_trip(image_data), repeat=args.repeat))
+        memory = summarize(time_call(lambda: memory_round_trip(image_data), repeat=args.repeat))
+        print(
+            f"{megapixels:>6g} {len(image_data) / 1e6:>12.1f} {legacy['median_ms']:>14.1f} "
+            f"{memory['median_ms']:>12.1f} {legacy['median_ms'] / memory['median_ms']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
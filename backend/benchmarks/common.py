@@ -0,0 +1,126 @@
+"""
+基准测试公共工具
+"""
+import math
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import cv2
+import numpy as np
+
+
+def image_shape(megapixels: float, aspect: float = 4 / 3) -> Tuple[int, int]:
+    """
+    根据像素数计算图像尺寸
+    
+    Args:
+        megapixels: 百万像素数
+        aspect: 宽高比
+        
+    Returns:
+        (高, 宽)
+    """
+    pixels = megapixels * 1_000_000
+    height = int(math.sqrt(pixels / aspect))
+    width = int(pixels / height)
+    return height, width
+
+
+def synthetic_image(height: int, width: int, channels: int = 3, seed: int = 0) -> np.ndarray:
+    """
+    生成带有渐变、几何图形和噪声的合成图像，压缩特性接近真实照片
+    
+    Args:
+        height: 图像高度
+        width: 图像宽度
+        channels: 通道数，1或3
+        seed: 随机种子
+        
+    Returns:
+        uint8图像
+    """
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    base = np.stack([
+        (x * 0.6 + y * 0.4),
+        (255 - x) * 0.5 + y * 0.3,
+        (x + y) * 0.5,
+    ], axis=2)
+    base += rng.normal(0, 6, size=base.shape).astype(np.float32)
+    image = np.clip(base, 0, 255).astype(np.uint8)
+    
+    # 绘制若干圆和线，为边缘类处理器提供结构
+    scale = max(min(height, width) // 20, 4)
+    for _ in range(12):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(scale // 2, scale * 2)), color, thickness=max(scale // 8, 2))
+    for _ in range(12):
+        pt1 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        pt2 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.line(image, pt1, pt2, color, thickness=max(scale // 10, 2))
+    
+    if channels == 1:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def time_call(func: Callable[[], object], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """
+    多次调用函数并记录耗时
+    
+    Args:
+        func: 被测函数
+        repeat: 计时次数
+        warmup: 预热次数
+        
+    Returns:
+        每次调用的耗时（秒）
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    计算耗时统计
+    
+    Args:
+        samples: 耗时样本（秒）
+        
+    Returns:
+        中位数与p95（毫秒）
+    """
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, math.ceil(len(ordered) * 0.95) - 1)
+    return {
+        "median_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[p95_index] * 1000,
+    }
+
+
+def peak_memory(func: Callable[[], object]) -> float:
+    """
+    测量函数执行期间的峰值内存，numpy与OpenCV返回的数组均经由numpy分配器计入
+    
+    Args:
+        func: 被测函数
+        
+    Returns:
+        峰值内存（MB）
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
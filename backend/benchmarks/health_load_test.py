@@ -0,0 +1,123 @@
+"""
+负载测试：在重负载图像处理请求持续运行时测量健康检查接口的延迟
+
+在进程内启动uvicorn服务，先测量空闲时 /api/health 的延迟，
+再启动多个客户端持续发送Retinex请求并再次测量，对比两者的分布。
+
+用法：
+    python -m benchmarks.health_load_test [--backend thread|process] [--heavy-clients 4] [--duration 10]
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import threading
+import time
+import urllib.request
+from typing import Dict, List
+import cv2
+from benchmarks.common import image_shape, summarize, synthetic_image
+
+
+def _free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int):
+    """在后台线程中启动uvicorn服务"""
+    import uvicorn
+    from src.app import create_app
+    
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _sample_health(base_url: str, duration: float, interval: float = 0.05) -> List[float]:
+    """在指定时长内周期性请求健康检查接口并记录延迟"""
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{base_url}/api/health") as response:
+            response.read()
+        samples.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return samples
+
+
+def _heavy_client(base_url: str, payload: bytes, stop: threading.Event, stats: Dict[str, int]) -> None:
+    """持续发送重负载处理请求"""
+    while not stop.is_set():
+        request = urllib.request.Request(
+            f"{base_url}/api/image/process",
+            data=payload,
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request) as response:
+            code = json.loads(response.read())["code"]
+        key = "completed" if code == 200 else f"code_{code}"
+        stats[key] = stats.get(key, 0) + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="健康检查延迟负载测试")
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread", help="执行后端")
+    parser.add_argument("--workers", type=int, default=None, help="工作者数量")
+    parser.add_argument("--heavy-clients", type=int, default=4, help="并发重负载客户端数")
+    parser.add_argument("--duration", type=float, default=10.0, help="负载阶段时长（秒）")
+    parser.add_argument("--size", type=float, default=4.0, help="重负载图像百万像素数")
+    args = parser.parse_args()
+    
+    # 配置需在导入应用之前写入环境变量
+    os.environ["IMAGE_EXECUTOR_BACKEND"] = args.backend
+    if args.workers is not None:
+        os.environ["IMAGE_EXECUTOR_MAX_WORKERS"] = str(args.workers)
+    
+    port = _free_port()
+    server, thread = _start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    
+    height, width = image_shape(args.size)
+    _, buffer = cv2.imencode(".jpg", synthetic_image(height, width))
+    payload = json.dumps({
+        "processor_name": "retinex_multi_scale",
+        "image_data": base64.b64encode(buffer).decode("ascii"),
+        "params": {}
+    }).encode("utf-8")
+    
+    idle = summarize(_sample_health(base_url, duration=2.0))
+    
+    stop = threading.Event()
+    stats: Dict[str, int] = {}
+    clients = [
+        threading.Thread(target=_heavy_client, args=(base_url, payload, stop, stats), daemon=True)
+        for _ in range(args.heavy_clients)
+    ]
+    for client in clients:
+        client.start()
+    time.sleep(0.5)
+    loaded = summarize(_sample_health(base_url, duration=args.duration))
+    stop.set()
+    for client in clients:
+        client.join()
+    
+    server.should_exit = True
+    thread.join()
+    
+    print(f"backend={args.backend} heavy_clients={args.heavy_clients} image={args.size}MP")
+    print(f"{'phase':>8} {'p50(ms)':>10} {'p95(ms)':>10}")
+    print(f"{'idle':>8} {idle['median_ms']:>10.2f} {idle['p95_ms']:>10.2f}")
+    print(f"{'loaded':>8} {loaded['median_ms']:>10.2f} {loaded['p95_ms']:>10.2f}")
+    print(f"heavy requests: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+由粗到精霍夫检测基准测试：在带有已知圆与线段的合成图像上，对比 exact 与 pyramid 策略的耗时与检测精度
+
+圆：与真值圆心距离不超过半径10%（至少3像素）且半径误差不超过15%视为命中，给出召回率、精确率与命中圆的圆心、半径平均误差。
+线段：沿线段每2像素取样，距离另一侧任一线段不超过容差视为覆盖；召回率为被覆盖的真值长度比例，
+精确率为被覆盖的检测长度比例，误差为检测取样点到最近真值线段的平均距离（只计覆盖的点）。
+参数按图像尺寸换算，使各尺寸下的场景相似。
+
+用法：
+    python -m benchmarks.hough_benchmark [--sizes 2 12] [--images 3] [--levels 2] [--repeat 3]
+"""
+import argparse
+import math
+from typing import Any, Dict, List, Tuple
+import cv2
+import numpy as np
+from benchmarks.common import image_shape, summarize, time_call
+from src.models.image_processor_manager import ImageProcessorManager
+import src.models.processors
+
+
+def scene(megapixels: float, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Dict[str, Any]]]:
+    """
+    生成带有渐变背景、噪声以及已知圆与线段的合成图像
+    
+    Args:
+        megapixels: 百万像素数
+        seed: 随机种子
+        
+    Returns:
+        (图像, 真值圆 (n, 3), 真值线段 (m, 4), 各处理器按尺寸换算的参数)
+    """
+    height, width = image_shape(megapixels)
+    rng = np.random.default_rng(seed)
+    unit = min(height, width) / 20
+    
+    y = np.linspace(0, 160, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 160, width, dtype=np.float32)[None, :]
+    base = np.stack([x * 0.6 + y * 0.4, (160 - x) * 0.5 + y * 0.3, (x + y) * 0.5], axis=2)
+    base += rng.normal(0, 6, size=base.shape).astype(np.float32)
+    image = np.clip(base, 0, 255).astype(np.uint8)
+    
+    # 杂乱的短笔画与小斑点，提供接近真实照片的边缘像素数，它们短于最小线长、小于最小半径，不属于真值
+    for _ in range(int(400 * megapixels)):
+        x1, y1 = float(rng.uniform(0, width)), float(rng.uniform(0, height))
+        length, angle = rng.uniform(unit * 0.05, unit * 0.4), rng.uniform(0, 2 * math.pi)
+        shade = tuple(int(c) for c in rng.integers(0, 256, 3))
+        if rng.random() < 0.5:
+            end = (round(x1 + length * math.cos(angle)), round(y1 + length * math.sin(angle)))
+            cv2.line(image, (round(x1), round(y1)), end, shade, int(rng.integers(1, 4)))
+        else:
+            cv2.circle(image, (round(x1), round(y1)), max(round(length / 4), 1), shade, -1)
+    
+    # 互不重叠的圆
+    circles: List[Tuple[float, float, float]] = []
+    while len(circles) < 10:
+        radius = float(rng.uniform(unit * 0.6, unit * 1.6))
+        cx = float(rng.uniform(radius + 2, width - radius - 2))
+        cy = float(rng.uniform(radius + 2, height - radius - 2))
+        if all(math.hypot(cx - px, cy - py) > radius + pr + unit for px, py, pr in circles):
+            circles.append((cx, cy, radius))
+    for cx, cy, radius in circles:
+        cv2.circle(image, (round(cx), round(cy)), round(radius), (240, 240, 240), max(round(unit / 15), 2))
+    
+    lines = []
+    for _ in range(10):
+        length = rng.uniform(unit * 4, unit * 10)
+        angle = rng.uniform(0, math.pi)
+        x1, y1 = rng.uniform(0, width), rng.uniform(0, height)
+        x2 = float(np.clip(x1 + length * math.cos(angle), 0, width - 1))
+        y2 = float(np.clip(y1 + length * math.sin(angle), 0, height - 1))
+        lines.append((x1, y1, x2, y2))
+        cv2.line(image, (round(x1), round(y1)), (round(x2), round(y2)), (250, 250, 250), max(round(unit / 20), 2))
+    
+    params = {
+        "hough_circles": {
+            "dp": 2.0,
+            "min_dist": min(round(unit), 500),
+            "param1": 200,
+            "param2": min(max(round(unit * 0.8), 30), 500),
+            "min_radius": min(round(unit * 0.5), 500),
+            "max_radius": min(round(unit * 1.8), 500),
+        },
+        "hough_lines": {
+            "threshold": min(round(unit), 500),
+            "min_line_length": min(round(unit * 2), 500),
+            "max_line_gap": min(round(unit / 6), 500),
+        },
+    }
+    return image, np.array(circles), np.array(lines), params
+
+
+def circle_accuracy(detected: np.ndarray, truth: np.ndarray) -> Dict[str, float]:
+    """
+    按圆心贪心匹配检测结果与真值
+    
+    Args:
+        detected: 检测到的圆 (n, 3)
+        truth: 真值圆 (m, 3)
+        
+    Returns:
+        召回率、精确率、圆心与半径的平均误差（像素）
+    """
+    used = set()
+    center_errors, radius_errors = [], []
+    for cx, cy, radius in truth:
+        best, best_distance = None, max(0.1 * radius, 3.0)
+        for index, (dx, dy, dr) in enumerate(detected):
+            distance = math.hypot(dx - cx, dy - cy)
+            if index not in used and distance <= best_distance and abs(dr - radius) <= 0.15 * radius:
+                best, best_distance = index, distance
+        if best is not None:
+            used.add(best)
+            center_errors.append(best_distance)
+            radius_errors.append(abs(detected[best][2] - radius))
+    return {
+        "recall": len(used) / max(len(truth), 1),
+        "precision": len(used) / max(len(detected), 1),
+        "error": float(np.mean(center_errors)) if center_errors else float("nan"),
+        "radius_error": float(np.mean(radius_errors)) if radius_errors else float("nan"),
+    }
+
+
+def _sample(segments: np.ndarray, step: float = 2.0) -> np.ndarray:
+    """沿线段等间距取样"""
+    points = []
+    for x1, y1, x2, y2 in segments.astype(np.float64):
+        count = max(int(math.hypot(x2 - x1, y2 - y1) / step), 1) + 1
+        t = np.linspace(0.0, 1.0, count)[:, None]
+        points.append(np.hstack([x1 + (x2 - x1) * t, y1 + (y2 - y1) * t]))
+    return np.vstack(points) if points else np.empty((0, 2))
+
+
+def _distance_to_segments(points: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """每个点到最近线段的距离"""
+    if len(segments) == 0:
+        return np.full(len(points), np.inf)
+    start = segments[None, :, :2].astype(np.float64)
+    direction = segments[None, :, 2:].astype(np.float64) - start
+    offset = points[:, None, :] - start
+    t = np.clip((offset * direction).sum(axis=2) / np.maximum((direction ** 2).sum(axis=2), 1e-9), 0.0, 1.0)
+    return np.hypot(*(offset - t[:, :, None] * direction).transpose(2, 0, 1)).min(axis=1)
+
+
+def line_accuracy(detected: np.ndarray, truth: np.ndarray, tolerance: float) -> Dict[str, float]:
+    """
+    按取样点覆盖计算线段检测精度
+    
+    Args:
+        detected: 检测到的线段 (n, 4)
+        truth: 真值线段 (m, 4)
+        tolerance: 覆盖容差（像素），取真值线宽的一半加上若干像素
+        
+    Returns:
+        召回率、精确率与平均误差（像素）
+    """
+    truth_points = _sample(truth)
+    detected_points = _sample(detected)
+    truth_distance = _distance_to_segments(truth_points, detected)
+    detected_distance = _distance_to_segments(detected_points, truth)
+    covered = detected_distance <= tolerance
+    return {
+        "recall": float(np.mean(truth_distance <= tolerance)) if len(truth_points) else float("nan"),
+        "precision": float(np.mean(covered)) if len(detected_points) else float("nan"),
+        "error": float(np.mean(detected_distance[covered])) if covered.any() else float("nan"),
+        "radius_error": float("nan"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="由粗到精霍夫检测基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[2, 12], help="图像百万像素数")
+    parser.add_argument("--images", type=int, default=3, help="每个尺寸的合成图像数")
+    parser.add_argument("--levels", type=int, default=2, help="pyramid 策略的金字塔层数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时次数")
+    args = parser.parse_args()
+    
+    print(f"{'processor':>14} {'MP':>4} {'strategy':>8} {'time(ms)':>9} {'speedup':>8} {'recall':>7} "
+          f"{'precision':>9} {'error(px)':>9} {'r_err(px)':>9}")
+    for megapixels in args.sizes:
+        for name in ("hough_circles", "hough_lines"):
+            rows: Dict[str, List[Dict[str, float]]] = {"exact": [], "pyramid": []}
+            for seed in range(args.images):
+                image, circles, lines, params = scene(megapixels, seed)
+                processor = ImageProcessorManager.get_instance(name)
+                for strategy in rows:
+                    validated = processor.validate_parameters(
+                        **params[name], strategy=strategy, pyramid_levels=args.levels
+                    )
+                    detected = next(iter(processor.detect(image, **validated).values()))
+                    if name == "hough_circles":
+                        accuracy = circle_accuracy(detected, circles)
+                    else:
+                        accuracy = line_accuracy(detected, lines, min(image.shape[:2]) / 20 / 40 + 3)
+                    timing = summarize(time_call(lambda: processor.detect(image, **validated), repeat=args.repeat))
+                    rows[strategy].append({**accuracy, "ms": timing["median_ms"]})
+            
+            exact_ms = np.mean([row["ms"] for row in rows["exact"]])
+            for strategy, results in rows.items():
+                mean = {key: float(np.nanmean([row[key] for row in results])) for key in results[0]}
+                print(
+                    f"{name:>14} {megapixels:>4g} {strategy:>8} {mean['ms']:>9.1f} {exact_ms / mean['ms']:>7.2f}x "
+                    f"{mean['recall']:>7.3f} {mean['precision']:>9.3f} {mean['error']:>9.2f} {mean['radius_error']:>9.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
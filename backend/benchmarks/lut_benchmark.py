@@ -0,0 +1,56 @@
+"""
+查找表融合基准测试：对比逐像素处理器链逐步执行与组合为一张查找表执行的耗时，并检查两者结果逐位相同
+
+用法：
+    python -m benchmarks.lut_benchmark [--sizes 2 12 24] [--repeat 5]
+"""
+import argparse
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from benchmarks.common import image_shape, summarize, synthetic_image, time_call
+from src.models.image_processor_manager import ImageProcessorManager
+from src.models.typed_image import TypedImage
+from src.services.pipeline_planner import PipelinePlanner
+import src.models.processors
+
+
+# 测试的处理器链：(名称, 通道数, [(处理器名称, 参数), ...])
+CHAINS: List[Tuple[str, int, List[Tuple[str, Dict[str, Any]]]]] = [
+    ("color x2", 3, [("white_balance", {}), ("grey_world", {})]),
+    ("color x4", 3, [("white_balance", {}), ("grey_world", {}), ("white_balance", {}), ("grey_world", {})]),
+]
+
+
+def run_stepwise(steps: List[Tuple[str, Dict[str, Any]]], image: np.ndarray) -> np.ndarray:
+    """逐步执行处理器链，每一步遍历一次图像"""
+    result = TypedImage(image)
+    for name, params in steps:
+        result = ImageProcessorManager.execute_typed(name, result, params)
+    return result.data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查找表融合基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[2, 12, 24], help="图像百万像素数")
+    parser.add_argument("--repeat", type=int, default=5, help="计时次数")
+    args = parser.parse_args()
+    
+    print(f"{'chain':>14} {'MP':>4} {'stepwise(ms)':>12} {'fused(ms)':>10} {'speedup':>8} {'identical':>9}")
+    for megapixels in args.sizes:
+        height, width = image_shape(megapixels)
+        for name, channels, chain in CHAINS:
+            image = synthetic_image(height, width, channels=channels)
+            plan = PipelinePlanner.compile([step[0] for step in chain], [step[1] for step in chain])
+            steps = [(step["processor_name"], step["params"]) for step in plan.steps[0].params["steps"]]
+            
+            identical = np.array_equal(run_stepwise(steps, image), PipelinePlanner.execute(plan, image))
+            stepwise = summarize(time_call(lambda: run_stepwise(steps, image), repeat=args.repeat))
+            fused = summarize(time_call(lambda: PipelinePlanner.execute(plan, image), repeat=args.repeat))
+            print(
+                f"{name:>14} {megapixels:>4g} {stepwise['median_ms']:>12.1f} {fused['median_ms']:>10.1f} "
+                f"{stepwise['median_ms'] / fused['median_ms']:>7.2f}x {str(identical):>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+执行计划一致性检查：对覆盖各条改写规则（含指定了 ROI 的步骤）的处理器链，比较按执行计划执行与逐步执行的结果，
+在彩色与灰度的合成图像上要求两者形状与像素逐位相同，有不一致时以状态码1退出
+
+用法：
+    python -m benchmarks.plan_check [--megapixels 0.3]
+"""
+import argparse
+import sys
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from benchmarks.common import image_shape, synthetic_image
+from src.models.image_processor_manager import ImageProcessorManager
+from src.services.pipeline_planner import PipelinePlanner
+import src.models.processors
+
+
+# 检查的处理器链：(名称, [(处理器名称, 参数), ...])
+CHAINS: List[Tuple[str, List[Tuple[str, Dict[str, Any]]]]] = [
+    ("fold erosion", [("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5})]),
+    ("fold erosion roi", [("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5, "roi": "10,10,100,100"})]),
+    ("open", [("erosion", {}), ("dilation", {})]),
+    ("open roi", [("erosion", {"roi": "10,10,100,100"}), ("dilation", {})]),
+    ("gray contour", [("contour_detection", {"color": "128,128,128"}), ("threshold", {})]),
+    ("gray contour roi", [("contour_detection", {"color": "128,128,128"}), ("threshold", {"roi": "10,10,100,100"})]),
+    ("gray lines roi", [("hough_lines", {"color": "200,200,200"}), ("sobel_filter", {"roi": "10,10,100,100"})]),
+    ("gray drawing roi", [("contour_detection", {"color": "128,128,128", "roi": "10,10,100,100"}), ("threshold", {})]),
+    ("lookup table", [("white_balance", {}), ("grey_world", {}), ("white_balance", {})]),
+    ("lookup table roi", [("white_balance", {}), ("grey_world", {"roi": "10,10,100,100"}), ("white_balance", {})]),
+]
+
+
+def run_sequential(chain: List[Tuple[str, Dict[str, Any]]], image: np.ndarray) -> np.ndarray:
+    """不经执行计划，逐步验证参数并执行"""
+    for name, params in chain:
+        validated = ImageProcessorManager.get_processor(name).validate_parameters(**params)
+        image = ImageProcessorManager.execute(name, image, validated)
+    return image
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="执行计划一致性检查")
+    parser.add_argument("--megapixels", type=float, default=0.3, help="合成图像的百万像素数")
+    args = parser.parse_args()
+    
+    height, width = image_shape(args.megapixels)
+    failures = 0
+    for name, chain in CHAINS:
+        plan = PipelinePlanner.compile([step[0] for step in chain], [step[1] for step in chain])
+        for channels in (3, 1):
+            image = synthetic_image(height, width, channels=channels)
+            planned = PipelinePlanner.execute(plan, image)
+            sequential = run_sequential(chain, image)
+            identical = planned.shape == sequential.shape and np.array_equal(planned, sequential)
+            failures += not identical
+            print(f"{name:>18} {channels}ch {'ok' if identical else 'MISMATCH':>8} "
+                  f"planned {planned.shape} sequential {sequential.shape} steps {[step.processor_name for step in plan.steps]}")
+    
+    if failures:
+        print(f"{failures} 项不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+处理器单次调用开销基准测试：在小图像上对比每次新建处理器实例与复用长期实例的耗时
+
+小图像上处理本身只需几微秒，实例创建、结构元素生成等固定开销占比明显。
+
+用法：
+    python -m benchmarks.processor_overhead_benchmark [--size 64] [--repeat 2000]
+"""
+import argparse
+from benchmarks.common import summarize, synthetic_image, time_call
+from src.models.image_processor_manager import ImageProcessorManager
+import src.models.processors
+
+
+CASES = [
+    ("erosion", {"kernel_size": 5}),
+    ("dilation", {"kernel_size": 5}),
+    ("morphology_ex", {"operation": "open", "kernel_size": 5}),
+    ("threshold", {"threshold_type": "binary_inv"}),
+    ("resize", {"scale": 0.5, "interpolation": "linear"}),
+    ("contour_detection", {"mode": "external", "method": "simple"}),
+    ("gaussian_filter", {}),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="处理器单次调用开销基准测试")
+    parser.add_argument("--size", type=int, default=64, help="图像边长（像素）")
+    parser.add_argument("--repeat", type=int, default=2000, help="计时次数")
+    args = parser.parse_args()
+    
+    image = synthetic_image(args.size, args.size)
+    
+    print(f"image: {args.size}x{args.size}, median of {args.repeat} calls")
+    print(f"{'processor':>18} {'fresh(us)':>10} {'reused(us)':>11} {'validated+reused(us)':>21} {'parameters()(us)':>17}")
+    for name, params in CASES:
+        processor_class = ImageProcessorManager.get_processor(name)
+        validated = processor_class.validate_parameters(**params)
+        
+        # 每次调用新建实例，产物缓存为空，与原先的实例化方式一致
+        fresh = summarize(time_call(
+            lambda: processor_class().process(image, **validated), repeat=args.repeat, warmup=10
+        ))
+        reused = summarize(time_call(
+            lambda: ImageProcessorManager.execute(name, image, validated), repeat=args.repeat, warmup=10
+        ))
+        full = summarize(time_call(
+            lambda: ImageProcessorManager.process_image(name, image, **params), repeat=args.repeat, warmup=10
+        ))
+        # 参数验证原先每次都会重新构建参数模型列表，现已缓存
+        specs = summarize(time_call(processor_class.parameters, repeat=args.repeat, warmup=10))
+        
+        print(
+            f"{name:>18} {fresh['median_ms'] * 1000:>10.1f} {reused['median_ms'] * 1000:>11.1f} "
+            f"{full['median_ms'] * 1000:>21.1f} {specs['median_ms'] * 1000:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
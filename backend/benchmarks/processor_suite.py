@@ -0,0 +1,196 @@
+"""
+处理器基准测试套件：以默认参数在多种尺寸和通道布局的合成图像上运行所有已注册的处理器，
+记录耗时中位数、p95与峰值内存，输出JSON，并与保存的基线比较，超过阈值的回归使进程以非零状态退出
+
+处理器通过 ImageProcessorManager.list_processors() 自动发现，新增处理器无需修改本脚本。
+没有默认值的必填参数取其描述中“可选值：”列出的第一个值。
+
+用法：
+    python -m benchmarks.processor_suite [--sizes 0.3 2 12] [--channels 3 1] [--repeat 5]
+        [--output results.json] [--baseline benchmarks/baselines/processors.json] [--threshold 0.2]
+        [--save-baseline benchmarks/baselines/processors.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
+from benchmarks.common import image_shape, peak_memory, summarize, synthetic_image, time_call
+from src.models.image_processor_manager import ImageProcessorManager
+import src.models.processors
+
+
+# 描述中列出可选值的标记
+OPTIONS_MARKER = "可选值："
+
+
+def default_params(processor: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    构造处理器的默认参数：有默认值的参数交给验证补全，没有默认值的必填参数取描述中的第一个可选值
+    
+    Args:
+        processor: list_processors() 返回的处理器信息
+    
+    Returns:
+        参数字典，无法确定必填参数的取值时返回None
+    """
+    params = {}
+    for param in processor["parameters"]:
+        if not param["required"] or param["default"] is not None:
+            continue
+        description = param["description"]
+        if OPTIONS_MARKER not in description:
+            return None
+        params[param["name"]] = description.split(OPTIONS_MARKER, 1)[1].split(",")[0].strip()
+    return params
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    """结果在基线中的键"""
+    return f"{result['processor']}|{result['megapixels']:g}MP|{result['channels']}ch"
+
+
+def run_suite(sizes: List[float], channels: List[int], repeat: int,
+              only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    运行所有处理器
+    
+    Args:
+        sizes: 图像百万像素数
+        channels: 通道数，1或3
+        repeat: 计时次数
+        only: 只运行这些处理器，为None时运行全部
+    
+    Returns:
+        每个（处理器, 尺寸, 通道数）组合的结果，不支持该输入的组合记录错误信息
+    """
+    results = []
+    images = {
+        (megapixels, channel_count): synthetic_image(*image_shape(megapixels), channels=channel_count)
+        for megapixels in sizes
+        for channel_count in channels
+    }
+    for processor in ImageProcessorManager.list_processors():
+        name = processor["name"]
+        if only and name not in only:
+            continue
+        params = default_params(processor)
+        if params is None:
+            print(f"跳过 {name}：无法确定必填参数的取值", file=sys.stderr)
+            continue
+        validated = ImageProcessorManager.get_processor(name).validate_parameters(**params)
+        
+        for (megapixels, channel_count), image in images.items():
+            result = {"processor": name, "megapixels": megapixels, "channels": channel_count}
+            call = lambda: ImageProcessorManager.execute(name, image, validated)
+            try:
+                timing = summarize(time_call(call, repeat=repeat))
+                result.update(timing, peak_mb=peak_memory(call))
+            except Exception as e:
+                # 例如HSV类处理器不接受单通道输入
+                result["error"] = str(e).splitlines()[-1] if str(e) else type(e).__name__
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """单条结果的可读形式"""
+    label = f"{result['processor']:>24} {result['megapixels']:>5g}MP {result['channels']}ch"
+    if "error" in result:
+        return f"{label}  error: {result['error']}"
+    return f"{label} {result['median_ms']:>10.2f}ms {result['p95_ms']:>10.2f}ms {result['peak_mb']:>9.1f}MB"
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[str]:
+    """
+    与基线比较，耗时中位数或峰值内存超过基线 (1 + threshold) 倍视为回归；
+    耗时增加不足 min_delta_ms 的视为噪声忽略
+    
+    Args:
+        results: 本次结果
+        baseline: 基线JSON
+        threshold: 允许的相对增长
+        min_delta_ms: 耗时回归的最小绝对增长（毫秒）
+    
+    Returns:
+        回归描述列表
+    """
+    reference = {case_key(result): result for result in baseline.get("results", []) if "error" not in result}
+    regressions = []
+    for result in results:
+        base = reference.get(case_key(result))
+        if base is None or "error" in result:
+            continue
+        slower = result["median_ms"] - base["median_ms"]
+        if result["median_ms"] > base["median_ms"] * (1 + threshold) and slower > min_delta_ms:
+            regressions.append(
+                f"{case_key(result)} 耗时 {base['median_ms']:.2f}ms -> {result['median_ms']:.2f}ms "
+                f"(+{slower / base['median_ms']:.0%})"
+            )
+        if result["peak_mb"] > base["peak_mb"] * (1 + threshold) and result["peak_mb"] - base["peak_mb"] > 0.1:
+            regressions.append(
+                f"{case_key(result)} 峰值内存 {base['peak_mb']:.1f}MB -> {result['peak_mb']:.1f}MB"
+            )
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息，随结果一起保存，比较不同机器上的基线没有意义"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="处理器基准测试套件")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.3, 2, 12], help="图像百万像素数")
+    parser.add_argument("--channels", type=int, nargs="+", default=[3, 1], choices=[1, 3], help="通道数")
+    parser.add_argument("--repeat", type=int, default=5, help="计时次数")
+    parser.add_argument("--only", nargs="+", default=None, help="只运行这些处理器")
+    parser.add_argument("--output", type=Path, default=None, help="结果JSON的输出路径")
+    parser.add_argument("--baseline", type=Path, default=None, help="用于比较的基线JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的相对增长，超过视为回归")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="耗时回归的最小绝对增长（毫秒）")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="将本次结果保存为基线")
+    args = parser.parse_args()
+    
+    report = {
+        "environment": environment(),
+        "config": {"sizes": args.sizes, "channels": args.channels, "repeat": args.repeat},
+        "results": run_suite(args.sizes, args.channels, args.repeat, args.only),
+    }
+    
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    
+    if args.baseline is None:
+        return
+    if not args.baseline.exists():
+        print(f"基线不存在: {args.baseline}，使用 --save-baseline 生成", file=sys.stderr)
+        sys.exit(2)
+    
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(report["results"], baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"发现 {len(regressions)} 项超过 {args.threshold:.0%} 的回归：")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("未发现回归")
+
+
+if __name__ == "__main__":
+    main()
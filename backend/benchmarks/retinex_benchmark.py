@@ -0,0 +1,69 @@
+"""
+Retinex基准测试：对比原float64全分辨率实现与金字塔近似引擎的耗时、峰值内存和输出误差
+
+用法：
+    python -m benchmarks.retinex_benchmark [--sizes 1 4] [--repeat 3]
+"""
+import argparse
+from typing import Sequence
+import cv2
+import numpy as np
+from benchmarks.common import image_shape, peak_memory, summarize, synthetic_image, time_call
+from src.utils.retinex import multi_scale_retinex
+
+
+def legacy_retinex(image: np.ndarray, sigmas: Sequence[float]) -> np.ndarray:
+    """原先float64全分辨率的(多尺度)Retinex实现"""
+    img = np.float64(image) + 1.0
+    retinex = np.zeros_like(img)
+    
+    for sigma in sigmas:
+        gaussian = cv2.GaussianBlur(img, (0, 0), sigma)
+        gaussian = np.where(gaussian == 0, 0.01, gaussian)
+        retinex += np.log10(img) - np.log10(gaussian)
+    
+    retinex = retinex / len(sigmas)
+    
+    for i in range(retinex.shape[2]):
+        retinex[:, :, i] = (retinex[:, :, i] - np.min(retinex[:, :, i])) / \
+                          (np.max(retinex[:, :, i]) - np.min(retinex[:, :, i])) * 255
+    
+    return np.uint8(np.minimum(np.maximum(retinex, 0), 255))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retinex基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4], help="图像百万像素数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时次数")
+    args = parser.parse_args()
+    
+    cases = {
+        "single sigma=300": [300],
+        "multi 15/80/250": [15, 80, 250],
+    }
+    
+    header = f"{'case':>18} {'MP':>4} {'legacy(ms)':>11} {'engine(ms)':>11} {'legacy(MB)':>11} {'engine(MB)':>11} " \
+             f"{'mean err':>9} {'p99 err':>8} {'max err':>8}"
+    print(header)
+    for megapixels in args.sizes:
+        height, width = image_shape(megapixels)
+        image = synthetic_image(height, width)
+        for name, sigmas in cases.items():
+            legacy_output = legacy_retinex(image, sigmas)
+            engine_output = multi_scale_retinex(image, sigmas)
+            error = np.abs(legacy_output.astype(np.int16) - engine_output.astype(np.int16))
+            
+            legacy_time = summarize(time_call(lambda: legacy_retinex(image, sigmas), repeat=args.repeat, warmup=0))
+            engine_time = summarize(time_call(lambda: multi_scale_retinex(image, sigmas), repeat=args.repeat))
+            legacy_memory = peak_memory(lambda: legacy_retinex(image, sigmas))
+            engine_memory = peak_memory(lambda: multi_scale_retinex(image, sigmas))
+            
+            print(
+                f"{name:>18} {megapixels:>4g} {legacy_time['median_ms']:>11.1f} {engine_time['median_ms']:>11.1f} "
+                f"{legacy_memory:>11.1f} {engine_memory:>11.1f} {error.mean():>9.2f} "
+                f"{np.percentile(error, 99):>8.0f} {int(error.max()):>8d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+进程间图像传递基准测试：对比进程执行后端下图像随任务pickle传递与经共享内存传递的吞吐量
+
+工作进程只做最少的计算，测得的差异即为传递本身的开销。send 只把图像传入工作进程，round-trip 同时传回一张同样大小的图像；
+shm 为普通图像（先复制到共享内存段），shm-pooled 为已以共享内存为存储的图像（如上传存储中的图像），无需复制。
+
+用法：
+    python -m benchmarks.shm_transfer_benchmark [--sizes 0.3 2 12] [--requests 64] [--workers 2] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, Dict
+import numpy as np
+from benchmarks.common import image_shape, synthetic_image
+from src.services.executor import ProcessingExecutor
+from src.services.shared_memory_pool import get_shared_memory_pool, shutdown_shared_memory_pool
+
+
+def corner(image: np.ndarray) -> int:
+    """只读取一个像素，图像传入工作进程即可完成"""
+    return int(image[0, 0, 0])
+
+
+def duplicate(image: np.ndarray) -> np.ndarray:
+    """返回图像的副本，需要把同样大小的图像传回"""
+    return image.copy()
+
+
+async def throughput(executor: ProcessingExecutor, func: Callable[[np.ndarray], object],
+                     image: np.ndarray, requests: int, concurrency: int) -> float:
+    """
+    以固定的并发数提交任务并计算吞吐量，结果随即丢弃
+    
+    Args:
+        executor: 执行器
+        func: 工作进程中执行的函数
+        image: 输入图像
+        requests: 任务数
+        concurrency: 同时提交的任务数
+    
+    Returns:
+        每秒完成的任务数
+    """
+    slots = asyncio.Semaphore(concurrency)
+    
+    async def submit() -> None:
+        async with slots:
+            await executor.run(func, image)
+    
+    # 预热：启动工作进程并建立共享内存段的映射
+    await asyncio.gather(*(submit() for _ in range(concurrency)))
+    start = time.perf_counter()
+    await asyncio.gather(*(submit() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(sizes, requests: int, workers: int, concurrency: int) -> None:
+    executors: Dict[str, ProcessingExecutor] = {
+        "pickle": ProcessingExecutor(backend="process", max_workers=workers, max_queue=concurrency, shared_memory=False),
+        "shm": ProcessingExecutor(backend="process", max_workers=workers, max_queue=concurrency, shared_memory=True),
+    }
+    pool = get_shared_memory_pool()
+    
+    print(f"{'MP':>6} {'image(MB)':>10} {'direction':>11} {'pickle(img/s)':>14} {'shm(img/s)':>11} "
+          f"{'shm-pooled(img/s)':>18} {'speedup':>8}")
+    try:
+        for megapixels in sizes:
+            height, width = image_shape(megapixels)
+            image = synthetic_image(height, width)
+            pooled = pool.allocate(image.shape, image.dtype)
+            np.copyto(pooled, image)
+            
+            for direction, func in (("send", corner), ("round-trip", duplicate)):
+                pickled = await throughput(executors["pickle"], func, image, requests, concurrency)
+                shared = await throughput(executors["shm"], func, image, requests, concurrency)
+                shared_pooled = await throughput(executors["shm"], func, pooled, requests, concurrency)
+                print(
+                    f"{megapixels:>6g} {image.nbytes / 1e6:>10.1f} {direction:>11} {pickled:>14.1f} {shared:>11.1f} "
+                    f"{shared_pooled:>18.1f} {shared_pooled / pickled:>7.2f}x"
+                )
+            del pooled
+    finally:
+        for executor in executors.values():
+            executor.shutdown()
+        shutdown_shared_memory_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="进程间图像传递基准测试")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.3, 2, 12], help="图像百万像素数")
+    parser.add_argument("--requests", type=int, default=64, help="每组计时的任务数")
+    parser.add_argument("--workers", type=int, default=2, help="工作进程数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时提交的任务数")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.requests, args.workers, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
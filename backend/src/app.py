@@ -1,15 +1,39 @@
 """
 FastAPI应用实例
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from src.middlewares.cors import setup_cors
 from src.controllers.health_controller import router as health_router
 from src.controllers.image_controller import router as image_router
+from src.controllers.job_controller import router as job_router
+from src.controllers.metrics_controller import router as metrics_router
+from src.controllers.preview_controller import router as preview_router
+from src.services.executor import shutdown_executor
+from src.services.job_manager import get_job_manager, shutdown_job_manager
+from src.services.shared_memory_pool import shutdown_shared_memory_pool
+from src.services.tiled_executor import shutdown_tiled_executor
 
 # 导入处理器包以确保处理器注册
 import src.models.processors
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期，启动时开始调度异步任务，关闭时停止调度并释放图像处理工作池、分块执行线程池与共享内存
+    
+    Args:
+        app: FastAPI应用实例
+    """
+    await get_job_manager().start()
+    yield
+    shutdown_job_manager()
+    shutdown_executor()
+    shutdown_tiled_executor()
+    shutdown_shared_memory_pool()
+
+
 def create_app() -> FastAPI:
     """
     创建FastAPI应用实例
@@ -23,6 +47,7 @@ def create_app() -> FastAPI:
         version="0.1.0",
         docs_url="/api/docs",
         redoc_url="/api/redoc",
+        lifespan=lifespan,
     )
     
     # 设置CORS
@@ -47,5 +72,14 @@ def register_routers(app: FastAPI) -> None:
     # 注册图像处理路由
     app.include_router(image_router)
     
+    # 注册交互式预览路由
+    app.include_router(preview_router)
+    
+    # 注册异步任务路由
+    app.include_router(job_router)
+    
+    # 注册指标路由
+    app.include_router(metrics_router)
+    
     # 在这里可以注册更多路由
     # app.include_router(other_router) 
\ No newline at end of file
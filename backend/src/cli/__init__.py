@@ -0,0 +1,3 @@
+"""
+命令行工具，在backend目录下以 python -m src.cli.<模块名> 运行
+"""
\ No newline at end of file
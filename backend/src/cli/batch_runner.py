@@ -0,0 +1,332 @@
+"""
+离线批量处理：遍历输入目录，在进程池中对每个图像文件应用同一处理器链，输出到结构相同的目录
+
+进度记录在输出目录的清单文件（JSON Lines）中，中断后以相同参数重新运行会跳过已完成的文件。
+输出文件名为输入文件名（含原扩展名）加上输出格式的扩展名，如 a.png 输出为 a.png.jpg，
+同名而扩展名不同的输入（a.png 与 a.jpg）不会写到同一输出文件。
+处理器链的最后一步输出几何结果时（如 {"return": "geometry"}），输出格式为 json 或 npz（请求的是图像格式时按 json），
+每个文件写出 a.png.json 或 a.png.npz。
+
+用法：
+    python -m src.cli.batch_runner INPUT_DIR OUTPUT_DIR --spec chain.json [--workers 8] [--format png]
+
+处理器链规格文件（JSON或YAML，YAML需要安装PyYAML）与批量处理接口的请求体字段一致：
+    {"processor_names": ["gaussian_filter", "canny_edge"], "params_list": [{"kernel_size": 9}, {}], "output_format": "png"}
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from src.services.image_service import ImageService
+from src.services.pipeline_planner import ExecutionPlan, PipelinePlanner
+from src.utils.digest import chain_digest
+from src.utils.geometry import GEOMETRY_FORMATS, encode_geometry
+from src.utils.image_codec import DEFAULT_FORMAT, FORMAT_EXTENSIONS, decode_image, encode_image
+
+
+# 默认处理的输入文件扩展名
+INPUT_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+# 清单文件名，默认位于输出目录下
+MANIFEST_NAME = ".batch_manifest.jsonl"
+
+# 每处理多少个文件输出一次进度
+PROGRESS_INTERVAL = 100
+
+
+# 工作进程内的处理器链与输出配置，由 _init_worker 设置
+_worker_plan: Optional[ExecutionPlan] = None
+_worker_output_dir: Optional[Path] = None
+_worker_format: str = DEFAULT_FORMAT
+
+
+def load_spec(path: Path) -> Dict[str, Any]:
+    """
+    读取处理器链规格文件
+    
+    Args:
+        path: JSON或YAML文件路径
+    
+    Returns:
+        规格字典
+    
+    Raises:
+        ValueError: 文件格式错误或缺少PyYAML
+    """
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取YAML规格文件需要安装PyYAML")
+        spec = yaml.safe_load(text)
+    else:
+        try:
+            spec = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"规格文件不是合法的JSON: {str(e)}")
+    
+    if not isinstance(spec, dict) or not spec.get("processor_names"):
+        raise ValueError("规格文件必须包含非空的 processor_names")
+    return spec
+
+
+def iter_input_files(input_dir: Path, extensions: Set[str]) -> Iterator[str]:
+    """
+    遍历输入目录下的图像文件，不预先收集完整列表，适用于数百万文件
+    
+    Args:
+        input_dir: 输入目录
+        extensions: 处理的文件扩展名（小写，含点）
+    
+    Yields:
+        相对输入目录的POSIX路径
+    """
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield Path(root, name).relative_to(input_dir).as_posix()
+
+
+def output_path(output_dir: Path, relative_path: str, image_format: str) -> Path:
+    """
+    计算输出文件路径：与输入相同的相对路径后加上输出格式的扩展名，保留原扩展名使输出文件与输入一一对应
+    
+    Args:
+        output_dir: 输出目录
+        relative_path: 相对输入目录的路径
+        image_format: 输出格式，图像格式或几何结果格式
+    
+    Returns:
+        输出文件路径
+    """
+    image_format = image_format.lower()
+    extension = f".{image_format}" if image_format in GEOMETRY_FORMATS else FORMAT_EXTENSIONS[image_format]
+    return output_dir / (relative_path + extension)
+
+
+class Manifest:
+    """
+    进度清单
+    
+    第一行记录处理器链与输出格式的摘要，之后每处理完一个文件追加一行 {"path": ..., "status": "done"|"failed"}。
+    只追加写入，中断时最多丢失最后几行，对应的文件会在下次运行时重新处理（输出文件原子替换，重复处理无副作用）。
+    """
+    
+    def __init__(self, path: Path, spec_key: str, restart: bool = False):
+        """
+        打开清单，读取已完成的文件
+        
+        Args:
+            path: 清单文件路径
+            spec_key: 处理器链与输出格式的摘要
+            restart: 是否丢弃已有进度重新开始
+        
+        Raises:
+            ValueError: 已有清单的处理器链与本次不同
+        """
+        self.path = path
+        self.done: Set[str] = set()
+        if path.exists() and not restart:
+            self._load(spec_key)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("w", encoding="utf-8") as file:
+                file.write(json.dumps({"spec": spec_key}) + "\n")
+        self._file = path.open("a", encoding="utf-8")
+    
+    def _load(self, spec_key: str) -> None:
+        """读取已有清单，校验处理器链摘要"""
+        with self.path.open("r", encoding="utf-8") as file:
+            header = file.readline()
+            try:
+                recorded = json.loads(header).get("spec")
+            except (json.JSONDecodeError, AttributeError):
+                recorded = None
+            if recorded != spec_key:
+                raise ValueError(f"清单 {self.path} 对应的处理器链或输出格式与本次不同，使用 --restart 重新开始")
+            
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时可能写了半行
+                    continue
+                if entry.get("status") == "done":
+                    self.done.add(entry["path"])
+                else:
+                    self.done.discard(entry.get("path"))
+    
+    def record(self, relative_path: str, status: str, error: Optional[str] = None) -> None:
+        """
+        追加一个文件的处理结果
+        
+        Args:
+            relative_path: 相对输入目录的路径
+            status: done 或 failed
+            error: 失败原因
+        """
+        entry = {"path": relative_path, "status": status}
+        if error is not None:
+            entry["error"] = error
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        if status == "done":
+            self.done.add(relative_path)
+    
+    def flush(self) -> None:
+        """将已追加的记录写入磁盘"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def close(self) -> None:
+        """关闭清单文件"""
+        self.flush()
+        self._file.close()
+
+
+def _init_worker(plan: ExecutionPlan, output_dir: str, image_format: str) -> None:
+    """工作进程初始化：导入处理器包以确保处理器注册，并保存处理器链与输出配置"""
+    import src.models.processors
+    global _worker_plan, _worker_output_dir, _worker_format
+    _worker_plan = plan
+    _worker_output_dir = Path(output_dir)
+    _worker_format = image_format
+
+
+def _process_file(input_dir: str, relative_path: str) -> Tuple[str, Optional[str]]:
+    """
+    在工作进程中处理一个文件并原子地写出结果
+    
+    Args:
+        input_dir: 输入目录
+        relative_path: 相对输入目录的路径
+    
+    Returns:
+        (相对路径, 错误信息)，成功时错误信息为None
+    """
+    try:
+        image = decode_image(Path(input_dir, relative_path).read_bytes())
+        result = PipelinePlanner.execute(_worker_plan, image)
+        if _worker_plan.returns_geometry:
+            buffer = encode_geometry(result, _worker_format)
+        else:
+            buffer = encode_image(result, _worker_format)
+        
+        target = output_path(_worker_output_dir, relative_path, _worker_format)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(target.name + ".tmp")
+        temporary.write_bytes(buffer)
+        os.replace(temporary, target)
+        return relative_path, None
+    except Exception as e:
+        return relative_path, str(e)
+
+
+def run(input_dir: Path, output_dir: Path, spec: Dict[str, Any], workers: int,
+        manifest_path: Optional[Path] = None, image_format: Optional[str] = None,
+        restart: bool = False) -> Dict[str, int]:
+    """
+    批量处理输入目录
+    
+    Args:
+        input_dir: 输入目录
+        output_dir: 输出目录
+        spec: 处理器链规格
+        workers: 工作进程数
+        manifest_path: 清单文件路径，默认位于输出目录下
+        image_format: 输出格式，默认取规格文件中的 output_format；输出几何结果的链为 json 或 npz，请求图像格式时按 json
+        restart: 是否丢弃已有进度重新开始
+    
+    Returns:
+        统计信息：processed, failed, skipped
+    
+    Raises:
+        ValueError: 处理器链不合法、输出格式不支持或清单与本次处理器链不符
+    """
+    # 处理器链在主进程中验证并编译一次，编译结果交给各工作进程
+    plan = ImageService.compile_chain(spec["processor_names"], spec.get("params_list"))
+    image_format = ImageService.resolve_output_format(plan, image_format or spec.get("output_format") or DEFAULT_FORMAT)
+    spec_key = f"{chain_digest([(step.processor_name, step.params) for step in plan.steps])}:{image_format}"
+    manifest = Manifest(manifest_path or output_dir / MANIFEST_NAME, spec_key, restart)
+    
+    stats = {"processed": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(plan, str(output_dir), image_format)
+    )
+    pending: Set[Future] = set()
+    
+    def collect(block_until: str) -> None:
+        nonlocal pending
+        finished, pending = wait(pending, return_when=block_until)
+        for future in finished:
+            relative_path, error = future.result()
+            if error is None:
+                manifest.record(relative_path, "done")
+                stats["processed"] += 1
+            else:
+                manifest.record(relative_path, "failed", error)
+                stats["failed"] += 1
+                print(f"失败 {relative_path}: {error}", file=sys.stderr)
+            total = stats["processed"] + stats["failed"]
+            if total % PROGRESS_INTERVAL == 0:
+                manifest.flush()
+                rate = total / max(time.perf_counter() - started, 1e-9)
+                print(f"已处理 {total} 个文件，跳过 {stats['skipped']} 个，{rate:.1f} 个/秒", file=sys.stderr)
+    
+    try:
+        for relative_path in iter_input_files(input_dir, INPUT_EXTENSIONS):
+            if relative_path in manifest.done:
+                stats["skipped"] += 1
+                continue
+            # 只保持有限数量的任务在途，内存占用与文件总数无关
+            if len(pending) >= workers * 4:
+                collect(FIRST_COMPLETED)
+            pending.add(pool.submit(_process_file, str(input_dir), relative_path))
+        while pending:
+            collect(FIRST_COMPLETED)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        manifest.close()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线批量处理图像目录")
+    parser.add_argument("input_dir", type=Path, help="输入目录")
+    parser.add_argument("output_dir", type=Path, help="输出目录，目录结构与输入相同")
+    parser.add_argument("--spec", type=Path, required=True, help="处理器链规格文件（JSON或YAML）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="工作进程数")
+    parser.add_argument("--format", dest="image_format", default=None, help="输出格式，覆盖规格文件中的 output_format")
+    parser.add_argument("--manifest", type=Path, default=None, help=f"清单文件路径，默认为输出目录下的 {MANIFEST_NAME}")
+    parser.add_argument("--restart", action="store_true", help="丢弃已有进度，重新处理所有文件")
+    args = parser.parse_args()
+    
+    if not args.input_dir.is_dir():
+        parser.error(f"输入目录不存在: {args.input_dir}")
+    if args.workers < 1:
+        parser.error("工作进程数必须大于等于 1")
+    
+    try:
+        stats = run(
+            args.input_dir, args.output_dir, load_spec(args.spec), args.workers,
+            args.manifest, args.image_format, args.restart
+        )
+    except ValueError as e:
+        parser.exit(2, f"错误: {e}\n")
+    print(f"完成：处理 {stats['processed']} 个，失败 {stats['failed']} 个，跳过 {stats['skipped']} 个")
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
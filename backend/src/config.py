@@ -0,0 +1,70 @@
+"""
+应用配置，均可通过环境变量覆盖
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    读取整数类型的环境变量
+    
+    Args:
+        name: 环境变量名
+        default: 默认值
+        
+    Returns:
+        环境变量的整数值
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+# 图像处理执行后端，可选值：thread, process
+EXECUTOR_BACKEND = os.getenv("IMAGE_EXECUTOR_BACKEND", "thread").lower()
+
+# 并行处理的工作线程/进程数
+EXECUTOR_MAX_WORKERS = _env_int("IMAGE_EXECUTOR_MAX_WORKERS", os.cpu_count() or 4)
+
+# 所有工作者繁忙时允许排队等待的任务数，超出后直接拒绝
+EXECUTOR_MAX_QUEUE = _env_int("IMAGE_EXECUTOR_MAX_QUEUE", 32)
+
+# 进程执行后端下经共享内存传递图像时保留的空闲共享内存总字节数，0表示不使用共享内存，图像随任务pickle传递
+SHM_POOL_MAX_BYTES = _env_int("IMAGE_SHM_POOL_MAX_BYTES", 256 * 1024 * 1024)
+
+# 处理结果缓存的内存上限（字节），0表示关闭缓存
+RESULT_CACHE_MAX_BYTES = _env_int("IMAGE_RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+# 处理器链中间结果（前缀）缓存的内存上限（字节），0表示关闭缓存
+PREFIX_CACHE_MAX_BYTES = _env_int("IMAGE_PREFIX_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+# 预览模式下代理图像长边的默认最大像素数
+PREVIEW_MAX_SIZE = _env_int("IMAGE_PREVIEW_MAX_SIZE", 1024)
+
+# 局部滤波分块执行时每块的边长（像素）
+TILE_SIZE = _env_int("IMAGE_TILE_SIZE", 1024)
+
+# 像素数达到该值的图像才对局部滤波分块执行，0表示关闭分块
+TILING_MIN_PIXELS = _env_int("IMAGE_TILING_MIN_PIXELS", 16_000_000)
+
+# 分块执行的工作线程数
+TILE_WORKERS = _env_int("IMAGE_TILE_WORKERS", os.cpu_count() or 4)
+
+# 异步任务数据库文件路径
+JOB_DB_PATH = os.getenv("IMAGE_JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+
+# 同时执行的异步任务数，任务使用独立的工作池
+JOB_WORKERS = _env_int("IMAGE_JOB_WORKERS", 2)
+
+# 排队中与执行中的异步任务数上限，超出后拒绝提交
+JOB_MAX_PENDING = _env_int("IMAGE_JOB_MAX_PENDING", 1000)
+
+# 已结束的异步任务及其结果的保留时间（秒），0表示永久保留
+JOB_RESULT_TTL = _env_int("IMAGE_JOB_RESULT_TTL", 24 * 60 * 60)
+
+# 上传图像存储的内存上限（字节，按解码后的图像计），0表示关闭上传
+UPLOAD_STORE_MAX_BYTES = _env_int("IMAGE_UPLOAD_STORE_MAX_BYTES", 1024 * 1024 * 1024)
+
+# 上传的图像在最后一次使用后的保留时间（秒）
+UPLOAD_TTL = _env_int("IMAGE_UPLOAD_TTL", 30 * 60)
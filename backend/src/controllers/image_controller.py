@@ -1,26 +1,67 @@
 """
 图像处理控制器
 """
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any, List
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Body, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 from src.services.image_service import ImageService
+from src.services.pipeline_planner import ExecutionPlan
+from src.services.executor import ExecutorBusyError, get_executor
+from src.services.upload_store import UploadNotFoundError, get_upload_store
 from src.entity.response import success_response, error_response
+from src.utils.image_codec import DEFAULT_FORMAT, media_type
+from src.utils.proxy import RENDER_MODES
+from src.utils.timing import StageTimings
+
+
+# 各阶段耗时的响应头
+SERVER_TIMING_HEADER = "Server-Timing"
 
 
 # 定义请求和响应模型
 class ProcessImageRequest(BaseModel):
     """处理图像请求模型"""
     processor_name: str = Field(..., description="处理器名称")
-    image_data: str = Field(..., description="Base64编码的图像数据")
+    image_data: Optional[str] = Field(default=None, description="Base64编码的图像数据，与 image_id 二选一")
+    image_id: Optional[str] = Field(default=None, description="上传接口返回的图像ID，与 image_data 二选一")
     params: Dict[str, Any] = Field(default={}, description="处理参数")
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+    include_timings: bool = Field(default=False, description="是否在响应数据中返回各阶段耗时")
 
 
 class BatchProcessImageRequest(BaseModel):
     """批量处理图像请求模型"""
     processor_names: List[str] = Field(..., description="处理器名称列表")
-    image_data: str = Field(..., description="Base64编码的图像数据")
+    image_data: Optional[str] = Field(default=None, description="Base64编码的图像数据，与 image_id 二选一")
+    image_id: Optional[str] = Field(default=None, description="上传接口返回的图像ID，与 image_data 二选一")
+    params_list: List[Dict[str, Any]] = Field(default=None, description="处理参数列表")
+    explain: bool = Field(default=False, description="是否在响应中返回优化后的执行计划")
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+    include_timings: bool = Field(default=False, description="是否在响应数据中返回各阶段耗时")
+
+
+class BatchImagesRequest(BaseModel):
+    """多图批量处理请求模型，同一处理器链应用于多张图像"""
+    processor_names: List[str] = Field(..., description="处理器名称列表")
+    images: List[str] = Field(..., description="Base64编码的图像数据列表")
     params_list: List[Dict[str, Any]] = Field(default=None, description="处理参数列表")
+    output_format: str = Field(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz（图像格式按 json 处理）"
+    )
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+    include_timings: bool = Field(default=False, description="是否在响应数据中返回各阶段耗时")
+
+
+class UploadImageRequest(BaseModel):
+    """上传图像请求模型"""
+    image_data: str = Field(..., description="Base64编码的图像数据")
 
 
 # 创建路由
@@ -42,49 +83,437 @@ async def list_processors():
         return error_response(code=500, message=str(e))
 
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    获取处理结果缓存的统计信息
+    
+    Returns:
+        结果缓存与前缀缓存各自的条目数、占用字节数以及命中/未命中/淘汰计数
+    """
+    try:
+        return success_response(data=ImageService.cache_stats())
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
 @router.post("/process")
-async def process_image(request: ProcessImageRequest = Body(...)):
+async def process_image(response: Response, request: ProcessImageRequest = Body(...)):
     """
-    处理图像
+    处理图像，响应头 Server-Timing 中给出各阶段耗时
     
     Args:
+        response: 用于设置响应头
         request: 处理图像请求
         
     Returns:
-        处理后的图像数据
+        处理后的图像数据，链的最后一步输出几何结果时为几何结果
     """
     try:
-        processed_image = ImageService.process_image(
-            processor_name=request.processor_name,
-            image_data=request.image_data,
-            params=request.params
-        )
-        return success_response(data={"processed_image": processed_image})
+        if _uses_upload(request.image_data, request.image_id):
+            processed_image, timings = await get_executor().run_timed(
+                ImageService.batch_process_uploaded,
+                image=get_upload_store().get(request.image_id),
+                image_key=request.image_id,
+                processor_names=[request.processor_name],
+                params_list=[request.params],
+                render_mode=request.render_mode,
+                preview_max_size=request.preview_max_size
+            )
+        else:
+            processed_image, timings = await get_executor().run_timed(
+                ImageService.process_image,
+                processor_name=request.processor_name,
+                image_data=request.image_data,
+                params=request.params,
+                render_mode=request.render_mode,
+                preview_max_size=request.preview_max_size
+            )
+        data = _result_data(processed_image)
+        _attach_timings(response, data, timings, request.include_timings)
+        return success_response(data=data)
+    except UploadNotFoundError as e:
+        return error_response(code=404, message=str(e))
     except ValueError as e:
         return error_response(code=400, message=str(e))
+    except ExecutorBusyError as e:
+        return error_response(code=503, message=str(e))
     except Exception as e:
         return error_response(code=500, message=str(e))
 
 
 @router.post("/batch-process")
-async def batch_process_image(request: BatchProcessImageRequest = Body(...)):
+async def batch_process_image(response: Response, request: BatchProcessImageRequest = Body(...)):
     """
-    批量处理图像
+    批量处理图像，响应头 Server-Timing 中给出各阶段与链中每一步的耗时
     
     Args:
+        response: 用于设置响应头
         request: 批量处理图像请求
         
     Returns:
-        处理后的图像数据
+        处理后的图像数据，链的最后一步输出几何结果时为几何结果
     """
     try:
-        processed_image = ImageService.batch_process_image(
-            processor_names=request.processor_names,
-            image_data=request.image_data,
-            params_list=request.params_list
+        if _uses_upload(request.image_data, request.image_id):
+            processed_image, timings = await get_executor().run_timed(
+                ImageService.batch_process_uploaded,
+                image=get_upload_store().get(request.image_id),
+                image_key=request.image_id,
+                processor_names=request.processor_names,
+                params_list=request.params_list,
+                render_mode=request.render_mode,
+                preview_max_size=request.preview_max_size
+            )
+        else:
+            processed_image, timings = await get_executor().run_timed(
+                ImageService.batch_process_image,
+                processor_names=request.processor_names,
+                image_data=request.image_data,
+                params_list=request.params_list,
+                render_mode=request.render_mode,
+                preview_max_size=request.preview_max_size
+            )
+        data = _result_data(processed_image)
+        if request.explain:
+            data["plan"] = ImageService.explain_batch(request.processor_names, request.params_list)
+        _attach_timings(response, data, timings, request.include_timings)
+        return success_response(data=data)
+    except UploadNotFoundError as e:
+        return error_response(code=404, message=str(e))
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    except ExecutorBusyError as e:
+        return error_response(code=503, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+@router.post("/uploads")
+async def upload_image(request: UploadImageRequest = Body(...)):
+    """
+    上传图像，解码后按内容摘要保存，返回的图像ID可代替 image_data 用于处理与批量处理接口
+    
+    Args:
+        request: 上传图像请求
+        
+    Returns:
+        图像ID、形状、解码后的字节数与距过期的秒数
+    """
+    return await _store_upload(ImageService.load_image, image_data=request.image_data)
+
+
+@router.post("/uploads/binary")
+async def upload_image_binary(request: Request):
+    """
+    上传二进制图像，请求体为原始图像字节
+    
+    Args:
+        request: 原始请求，请求体为编码后的图像
+        
+    Returns:
+        图像ID、形状、解码后的字节数与距过期的秒数
+    """
+    return await _store_upload(ImageService.load_image_bytes, image_bytes=await request.body())
+
+
+@router.delete("/uploads/{image_id}")
+async def delete_upload(image_id: str):
+    """
+    删除上传的图像
+    
+    Args:
+        image_id: 图像ID
+        
+    Returns:
+        删除结果
+    """
+    if not get_upload_store().delete(image_id):
+        return error_response(code=404, message=f"图像不存在或已过期: {image_id}")
+    return success_response(data={"image_id": image_id})
+
+
+async def _store_upload(loader: Callable[..., Tuple[Any, str]], **kwargs) -> Dict[str, Any]:
+    """
+    在工作池中解码上传的图像并保存到上传存储
+    
+    Args:
+        loader: 解码函数，返回 (解码后的图像, 图像摘要)
+        **kwargs: 解码函数的参数
+        
+    Returns:
+        响应字典
+    """
+    try:
+        store = get_upload_store()
+        if not store.enabled:
+            raise ValueError("图像上传未开启")
+        image, image_key = await get_executor().run(loader, **kwargs)
+        store.put(image_key, image)
+        return success_response(data={
+            "image_id": image_key,
+            "shape": list(image.shape),
+            "size_bytes": image.nbytes,
+            "expires_in": round(store.expires_in(image_key)),
+        })
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    except ExecutorBusyError as e:
+        return error_response(code=503, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+@router.post("/batch-images")
+async def batch_process_images(request: BatchImagesRequest = Body(...)):
+    """
+    将同一处理器链应用于多张图像，处理器链只验证和编译一次，
+    图像在工作池中并行处理，每张处理完成后立即以一行NDJSON返回（按完成顺序，index为图像在请求中的序号）
+    
+    Args:
+        request: 多图批量处理请求
+        
+    Returns:
+        NDJSON流，每行为 {"index": 序号, "code": ..., "message": ..., "data": {"processed_image": ...}}，
+        输出几何结果时 json 格式的 data 为 {"geometry": ...}，npz 格式的 processed_image 为Base64编码的npz数据；
+        处理器链不合法时直接返回错误响应
+    """
+    try:
+        if request.render_mode.lower() not in RENDER_MODES:
+            raise ValueError(f"不支持的渲染模式: {request.render_mode}")
+        plan = ImageService.compile_chain(request.processor_names, request.params_list)
+        ImageService.resolve_output_format(plan, request.output_format)
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+    
+    return StreamingResponse(_stream_batch_images(plan, request), media_type="application/x-ndjson")
+
+
+async def _stream_batch_images(plan: ExecutionPlan, request: BatchImagesRequest) -> AsyncIterator[str]:
+    """
+    并行处理多张图像并按完成顺序逐行输出结果
+    
+    同时提交到工作池的图像数不超过工作者数，其余图像等待，不会因一次请求占满排队名额而让其他请求收到503。
+    客户端断开时取消尚未开始的图像。
+    
+    Args:
+        plan: 编译后的执行计划
+        request: 多图批量处理请求
+        
+    Yields:
+        每张图像结果的一行JSON
+    """
+    executor = get_executor()
+    semaphore = asyncio.Semaphore(executor.max_workers)
+    
+    async def process_one(index: int, image_data: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                processed_image, timings = await executor.run_timed(
+                    ImageService.process_planned_image,
+                    plan=plan,
+                    image_data=image_data,
+                    image_format=request.output_format,
+                    render_mode=request.render_mode,
+                    preview_max_size=request.preview_max_size
+                )
+                data = _result_data(processed_image)
+                if request.include_timings:
+                    data["timings"] = timings.as_dict()
+                return {"index": index, **success_response(data=data)}
+            except ValueError as e:
+                return {"index": index, **error_response(code=400, message=str(e))}
+            except ExecutorBusyError as e:
+                return {"index": index, **error_response(code=503, message=str(e))}
+            except Exception as e:
+                return {"index": index, **error_response(code=500, message=str(e))}
+    
+    tasks = [asyncio.create_task(process_one(index, image_data)) for index, image_data in enumerate(request.images)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield json.dumps(await completed, ensure_ascii=False) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/process/binary")
+async def process_image_binary(
+    request: Request,
+    processor_name: str = Query(..., description="处理器名称"),
+    params: Optional[str] = Query(default=None, description="JSON编码的处理参数"),
+    output_format: str = Query(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz"
+    ),
+    render_mode: str = Query(default="final", description="渲染模式，可选值：final, preview"),
+    preview_max_size: Optional[int] = Query(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+):
+    """
+    处理二进制图像，请求体为原始图像字节
+    
+    Args:
+        request: 原始请求，请求体为编码后的图像
+        processor_name: 处理器名称
+        params: JSON编码的处理参数
+        output_format: 输出格式
+        render_mode: 渲染模式
+        preview_max_size: 预览尺寸
+        
+    Returns:
+        编码后的图像字节（输出几何结果时为 json 或 npz），响应头 Server-Timing 中给出各阶段耗时
+    """
+    try:
+        parsed_params = _parse_json_query(params, "params", dict)
+        content_type = media_type(ImageService.output_format([processor_name], [parsed_params or {}], output_format))
+        processed_image, timings = await get_executor().run_timed(
+            ImageService.process_image_bytes,
+            processor_name=processor_name,
+            image_bytes=await request.body(),
+            params=parsed_params,
+            image_format=output_format,
+            render_mode=render_mode,
+            preview_max_size=preview_max_size
+        )
+        return Response(
+            content=processed_image,
+            media_type=content_type,
+            headers={SERVER_TIMING_HEADER: timings.server_timing()}
+        )
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    except ExecutorBusyError as e:
+        return error_response(code=503, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+@router.post("/batch-process/binary")
+async def batch_process_image_binary(
+    request: Request,
+    processor_names: List[str] = Query(..., description="处理器名称列表，可重复传入"),
+    params_list: Optional[str] = Query(default=None, description="JSON编码的处理参数列表"),
+    output_format: str = Query(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz"
+    ),
+    render_mode: str = Query(default="final", description="渲染模式，可选值：final, preview"),
+    preview_max_size: Optional[int] = Query(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+):
+    """
+    批量处理二进制图像，请求体为原始图像字节
+    
+    Args:
+        request: 原始请求，请求体为编码后的图像
+        processor_names: 处理器名称列表
+        params_list: JSON编码的处理参数列表
+        output_format: 输出格式
+        render_mode: 渲染模式
+        preview_max_size: 预览尺寸
+        
+    Returns:
+        编码后的图像字节（输出几何结果时为 json 或 npz），响应头 Server-Timing 中给出各阶段耗时
+    """
+    try:
+        parsed_params_list = _parse_json_query(params_list, "params_list", list)
+        content_type = media_type(ImageService.output_format(processor_names, parsed_params_list, output_format))
+        processed_image, timings = await get_executor().run_timed(
+            ImageService.batch_process_image_bytes,
+            processor_names=processor_names,
+            image_bytes=await request.body(),
+            params_list=parsed_params_list,
+            image_format=output_format,
+            render_mode=render_mode,
+            preview_max_size=preview_max_size
+        )
+        return Response(
+            content=processed_image,
+            media_type=content_type,
+            headers={SERVER_TIMING_HEADER: timings.server_timing()}
         )
-        return success_response(data={"processed_image": processed_image})
     except ValueError as e:
         return error_response(code=400, message=str(e))
+    except ExecutorBusyError as e:
+        return error_response(code=503, message=str(e))
     except Exception as e:
-        return error_response(code=500, message=str(e)) 
\ No newline at end of file
+        return error_response(code=500, message=str(e))
+
+
+def _uses_upload(image_data: Optional[str], image_id: Optional[str]) -> bool:
+    """
+    判断请求引用的是上传的图像还是直接携带的图像数据
+    
+    Args:
+        image_data: Base64编码的图像数据
+        image_id: 上传接口返回的图像ID
+        
+    Returns:
+        引用上传的图像时返回True
+        
+    Raises:
+        ValueError: 两者都未提供或同时提供
+    """
+    if (image_data is None) == (image_id is None):
+        raise ValueError("image_data 与 image_id 必须且只能提供其中之一")
+    return image_id is not None
+
+
+def _result_data(processed: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    构造响应数据：图像结果放在 processed_image 中，几何结果放在 geometry 中
+    
+    Args:
+        processed: Base64编码的图像数据或几何结果
+        
+    Returns:
+        响应数据
+    """
+    if isinstance(processed, dict):
+        return {"geometry": processed}
+    return {"processed_image": processed}
+
+
+def _attach_timings(response: Response, data: Dict[str, Any], timings: StageTimings, include_timings: bool) -> None:
+    """
+    设置 Server-Timing 响应头，请求要求时同时在响应数据中返回各阶段耗时
+    
+    Args:
+        response: 响应对象
+        data: 响应数据，原地修改
+        timings: 阶段记录
+        include_timings: 是否在响应数据中返回
+    """
+    response.headers[SERVER_TIMING_HEADER] = timings.server_timing()
+    if include_timings:
+        data["timings"] = timings.as_dict()
+
+
+def _parse_json_query(value: Optional[str], name: str, expected_type: type) -> Any:
+    """
+    解析JSON编码的查询参数
+    
+    Args:
+        value: 查询参数值
+        name: 参数名称
+        expected_type: 期望的JSON类型
+        
+    Returns:
+        解析后的值，未传入时返回None
+        
+    Raises:
+        ValueError: JSON格式错误或类型不符
+    """
+    if value is None or value == "":
+        return None
+    
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"参数 {name} 不是合法的JSON: {str(e)}")
+    
+    if not isinstance(parsed, expected_type):
+        raise ValueError(f"参数 {name} 的JSON类型错误")
+    
+    return parsed
@@ -0,0 +1,241 @@
+"""
+异步任务控制器，提交耗时较长的处理任务后立即返回任务ID，通过轮询或状态流获取进度，完成后下载结果
+"""
+import json
+from fastapi import APIRouter, Body, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+from src.controllers.image_controller import _parse_json_query
+from src.services.image_service import ImageService
+from src.services.job_manager import JobQueueFullError, get_job_manager
+from src.entity.response import success_response, error_response
+from src.utils.image_codec import DEFAULT_FORMAT, media_type
+from src.utils.proxy import RENDER_MODES
+
+
+class ProcessJobRequest(BaseModel):
+    """提交单个处理器任务的请求模型"""
+    processor_name: str = Field(..., description="处理器名称")
+    image_data: str = Field(..., description="Base64编码的图像数据")
+    params: Dict[str, Any] = Field(default={}, description="处理参数")
+    output_format: str = Field(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz（图像格式按 json 处理）"
+    )
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+
+
+class BatchProcessJobRequest(BaseModel):
+    """提交处理器链任务的请求模型"""
+    processor_names: List[str] = Field(..., description="处理器名称列表")
+    image_data: str = Field(..., description="Base64编码的图像数据")
+    params_list: List[Dict[str, Any]] = Field(default=None, description="处理参数列表")
+    output_format: str = Field(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz（图像格式按 json 处理）"
+    )
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+
+
+# 创建路由
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.post("/process")
+async def submit_process_job(request: ProcessJobRequest = Body(...)):
+    """
+    提交单个处理器的异步任务
+    
+    Args:
+        request: 任务请求
+    
+    Returns:
+        任务状态，其中 job_id 用于查询状态与下载结果
+    """
+    return await _submit(
+        [request.processor_name], [request.params], request.image_data,
+        request.output_format, request.render_mode, request.preview_max_size
+    )
+
+
+@router.post("/batch-process")
+async def submit_batch_process_job(request: BatchProcessJobRequest = Body(...)):
+    """
+    提交处理器链的异步任务
+    
+    Args:
+        request: 任务请求
+    
+    Returns:
+        任务状态，其中 job_id 用于查询状态与下载结果
+    """
+    return await _submit(
+        request.processor_names, request.params_list, request.image_data,
+        request.output_format, request.render_mode, request.preview_max_size
+    )
+
+
+@router.post("/batch-process/binary")
+async def submit_batch_process_job_binary(
+    request: Request,
+    processor_names: List[str] = Query(..., description="处理器名称列表，可重复传入"),
+    params_list: Optional[str] = Query(default=None, description="JSON编码的处理参数列表"),
+    output_format: str = Query(
+        default=DEFAULT_FORMAT,
+        description="输出格式，可选值：jpg, png, webp, bmp；输出几何结果时可选 json, npz"
+    ),
+    render_mode: str = Query(default="final", description="渲染模式，可选值：final, preview"),
+    preview_max_size: Optional[int] = Query(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+):
+    """
+    提交处理器链的异步任务，请求体为原始图像字节
+    
+    Args:
+        request: 原始请求，请求体为编码后的图像
+        processor_names: 处理器名称列表
+        params_list: JSON编码的处理参数列表
+        output_format: 输出格式
+        render_mode: 渲染模式
+        preview_max_size: 预览尺寸
+    
+    Returns:
+        任务状态，其中 job_id 用于查询状态与下载结果
+    """
+    try:
+        parsed_params_list = _parse_json_query(params_list, "params_list", list)
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    
+    return await _submit(
+        processor_names, parsed_params_list, await request.body(),
+        output_format, render_mode, preview_max_size
+    )
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """
+    查询任务状态
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        任务状态：queued, running, succeeded 或 failed，失败时 error 为失败原因，成功时 timings 为各阶段耗时
+    """
+    try:
+        job = await get_job_manager().status(job_id)
+        if job is None:
+            return error_response(code=404, message=f"任务不存在: {job_id}")
+        return success_response(data=job)
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+@router.get("/{job_id}/events")
+async def watch_job(job_id: str):
+    """
+    以NDJSON流跟踪任务状态，每次状态变化输出一行，任务结束后关闭
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        NDJSON流，每行为 {"code": ..., "message": ..., "data": 任务状态}；任务不存在时直接返回错误响应
+    """
+    manager = get_job_manager()
+    if await manager.status(job_id) is None:
+        return error_response(code=404, message=f"任务不存在: {job_id}")
+    
+    async def stream() -> AsyncIterator[str]:
+        async for job in manager.watch(job_id):
+            yield json.dumps(success_response(data=job), ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    下载任务结果
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        编码后的图像字节；任务不存在或尚未成功时返回错误响应
+    """
+    try:
+        manager = get_job_manager()
+        result = await manager.result(job_id)
+        if result is None:
+            job = await manager.status(job_id)
+            if job is None:
+                return error_response(code=404, message=f"任务不存在: {job_id}")
+            return error_response(code=409, message=f"任务尚未成功完成，当前状态: {job['status']}")
+        
+        content, image_format = result
+        return Response(content=content, media_type=media_type(image_format))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: str):
+    """
+    删除任务及其结果，排队中的任务删除后不再执行
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        删除结果
+    """
+    try:
+        if not await get_job_manager().delete(job_id):
+            return error_response(code=404, message=f"任务不存在: {job_id}")
+        return success_response(data={"job_id": job_id})
+    except ValueError as e:
+        return error_response(code=409, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
+
+
+async def _submit(processor_names: List[str], params_list: Optional[List[Dict[str, Any]]],
+                  image_data: Union[str, bytes], output_format: str, render_mode: str,
+                  preview_max_size: Optional[int]) -> Dict[str, Any]:
+    """
+    验证处理器链与输出配置并提交任务，参数错误在提交时即返回，不会进入队列
+    
+    Args:
+        processor_names: 处理器名称列表
+        params_list: 处理参数列表
+        image_data: 编码后的输入图像
+        output_format: 输出格式
+        render_mode: 渲染模式
+        preview_max_size: 预览尺寸
+    
+    Returns:
+        响应字典
+    """
+    try:
+        if render_mode.lower() not in RENDER_MODES:
+            raise ValueError(f"不支持的渲染模式: {render_mode}")
+        if not image_data:
+            raise ValueError("图像数据为空")
+        # 输出几何结果的链按几何结果格式保存结果，取结果时据此设置媒体类型
+        output_format = ImageService.output_format(processor_names, params_list, output_format)
+        
+        job = await get_job_manager().submit(
+            processor_names, params_list, image_data, output_format, render_mode, preview_max_size
+        )
+        return success_response(data=job)
+    except ValueError as e:
+        return error_response(code=400, message=str(e))
+    except JobQueueFullError as e:
+        return error_response(code=503, message=str(e))
+    except Exception as e:
+        return error_response(code=500, message=str(e))
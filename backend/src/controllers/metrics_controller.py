@@ -0,0 +1,35 @@
+"""
+指标控制器，以Prometheus文本格式导出处理指标
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.services.executor import get_executor
+from src.services.metrics import get_metrics
+from src.services.shared_memory_pool import get_shared_memory_pool
+
+
+# Prometheus文本格式的媒体类型
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 创建路由
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    导出处理指标，包括各处理器与各阶段的耗时直方图、调用与错误计数、输入输出字节数、工作池队列深度以及共享内存池占用
+    
+    Returns:
+        Prometheus文本格式的指标
+    """
+    executor = get_executor()
+    shm = get_shared_memory_pool().stats()
+    gauges = [
+        ("image_executor_queue_depth", "排队等待工作者的任务数", executor.queue_depth),
+        ("image_executor_in_flight", "已提交但未完成的任务数（运行中与排队中）", executor.pending),
+        ("image_executor_capacity", "运行与排队的任务数上限", executor.max_workers + executor.max_queue),
+        ("image_shm_in_use_bytes", "进程间传递中或被图像引用的共享内存字节数", shm["in_use_bytes"]),
+        ("image_shm_idle_bytes", "共享内存池中等待复用的空闲字节数", shm["idle_bytes"]),
+    ]
+    return PlainTextResponse(get_metrics().render(gauges), media_type=CONTENT_TYPE)
@@ -0,0 +1,136 @@
+"""
+预览控制器，通过WebSocket进行交互式参数调整
+"""
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from src.services.executor import ExecutorBusyError
+from src.services.preview_session import PreviewSession, PreviewUpdate
+from src.entity.response import success_response, error_response
+
+
+# 创建路由
+router = APIRouter(prefix="/api/image", tags=["image"])
+
+
+@router.websocket("/preview")
+async def preview(websocket: WebSocket):
+    """
+    交互式预览通道
+    
+    客户端先发送图像（二进制帧为原始图像字节，或文本帧 {"type": "image", "image_data": Base64}），
+    之后只发送参数更新文本帧 {"type": "params", "seq": 1, "processor_names": [...], "params_list": [...]}。
+    每个预览结果先发送一条 {"type": "preview", ...} 文本帧，紧接着发送编码后图像的二进制帧；
+    处理期间到达的多条更新只处理最新一条。
+    
+    Args:
+        websocket: WebSocket连接
+    """
+    await websocket.accept()
+    session = PreviewSession()
+    # 预览的文本帧与二进制帧必须连续发送，两个协程的发送需互斥
+    send_lock = asyncio.Lock()
+    renderer = asyncio.create_task(_render_loop(websocket, session, send_lock))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            await _handle_message(websocket, session, message, send_lock)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        renderer.cancel()
+        await asyncio.gather(renderer, return_exceptions=True)
+
+
+async def _handle_message(websocket: WebSocket, session: PreviewSession, message: Dict[str, Any],
+                          send_lock: asyncio.Lock) -> None:
+    """
+    处理客户端发来的一帧：上传图像或提交参数更新
+    
+    Args:
+        websocket: WebSocket连接
+        session: 预览会话
+        message: ASGI接收消息
+        send_lock: 发送锁
+    """
+    try:
+        if message.get("bytes") is not None:
+            info = await session.load_image(image_bytes=message["bytes"])
+            await _send_json(websocket, send_lock, "image", success_response(data=info))
+            return
+        
+        try:
+            payload = json.loads(message.get("text") or "")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"消息不是合法的JSON: {str(e)}")
+        if not isinstance(payload, dict):
+            raise ValueError("消息必须是JSON对象")
+        
+        message_type = payload.pop("type", "params")
+        if message_type == "image":
+            info = await session.load_image(image_data=payload.get("image_data"))
+            await _send_json(websocket, send_lock, "image", success_response(data=info))
+        elif message_type == "params":
+            try:
+                update = PreviewUpdate(**payload)
+            except ValidationError as e:
+                raise ValueError(f"参数更新格式错误: {str(e)}")
+            session.submit(update)
+        else:
+            raise ValueError(f"不支持的消息类型: {message_type}")
+    except ValueError as e:
+        await _send_json(websocket, send_lock, "error", error_response(code=400, message=str(e)))
+    except ExecutorBusyError as e:
+        await _send_json(websocket, send_lock, "error", error_response(code=503, message=str(e)))
+
+
+async def _render_loop(websocket: WebSocket, session: PreviewSession, send_lock: asyncio.Lock) -> None:
+    """
+    逐个处理最新的参数更新并推送预览，同一时刻最多只有一次计算
+    
+    Args:
+        websocket: WebSocket连接
+        session: 预览会话
+        send_lock: 发送锁
+    """
+    while True:
+        update = await session.next_update()
+        try:
+            processed_image = await session.render(update)
+        except ValueError as e:
+            await _send_json(websocket, send_lock, "error", error_response(code=400, message=str(e)), seq=update.seq)
+            continue
+        except ExecutorBusyError as e:
+            await _send_json(websocket, send_lock, "error", error_response(code=503, message=str(e)), seq=update.seq)
+            continue
+        except Exception as e:
+            await _send_json(websocket, send_lock, "error", error_response(code=500, message=str(e)), seq=update.seq)
+            continue
+        
+        data = {"seq": update.seq, "format": update.output_format, "size": len(processed_image), "dropped": session.dropped}
+        async with send_lock:
+            await _send_json(websocket, None, "preview", success_response(data=data))
+            await websocket.send_bytes(processed_image)
+
+
+async def _send_json(websocket: WebSocket, send_lock: Optional[asyncio.Lock], message_type: str,
+                     response: Dict[str, Any], **extra) -> None:
+    """
+    发送带消息类型的响应文本帧
+    
+    Args:
+        websocket: WebSocket连接
+        send_lock: 发送锁，调用方已持有锁时传入None
+        message_type: 消息类型，可选值：image, preview, error
+        response: 统一格式的响应字典
+        **extra: 附加字段
+    """
+    if send_lock is None:
+        await websocket.send_json({"type": message_type, **response, **extra})
+        return
+    async with send_lock:
+        await websocket.send_json({"type": message_type, **response, **extra})
@@ -1,10 +1,14 @@
 """
 图像处理基类模块，定义所有图像预处理操作的抽象接口
 """
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable, Hashable
 import numpy as np
 from pydantic import BaseModel, Field
+from src.models.typed_image import TypedImage
+from src.utils.lut import ChannelLUT, LUTInput
+from src.utils.roi import ROI_OUTPUTS, DEFAULT_ROI_OUTPUT, parse_roi, scale_roi
 
 
 class ProcessorParameter(BaseModel):
@@ -20,7 +24,27 @@ class ProcessorParameter(BaseModel):
 
 
 class ImageProcessor(ABC):
-    """图像处理器基类"""
+    """
+    图像处理器基类
+    
+    处理器实例由ImageProcessorManager长期持有并在多个请求（线程）间共享：
+    创建后调用一次 setup() 预计算产物，处理时通过 artifact() 复用与参数相关的产物
+    （结构元素、查找表等），process() 中不应保存其他请求相关的状态。
+    """
+    
+    # 每个实例最多缓存的产物数，超出时丢弃最早写入的产物
+    MAX_ARTIFACTS = 64
+    
+    # 以像素为单位、随图像分辨率等比缩放的参数，预览模式在缩小的代理图像上运行时按比例换算
+    SPATIAL_PARAMETERS: Tuple[str, ...] = ()
+    
+    # 逐像素、各通道独立的处理器查表所作用的视图（TypedImage.VIEWS 之一），None 表示不能表示为查找表；
+    # HSV、LAB、YCrCb 视图上查表的结果转回 BGR 输出
+    LUT_VIEW: Optional[str] = None
+    
+    def __init__(self):
+        self._artifacts: Dict[Hashable, Any] = {}
+        self._artifacts_lock = threading.Lock()
     
     @classmethod
     @abstractmethod
@@ -40,6 +64,46 @@ class ImageProcessor(ABC):
         """处理器参数列表"""
         pass
     
+    @classmethod
+    def parameter_specs(cls) -> List[ProcessorParameter]:
+        """
+        缓存的处理器参数列表（含所有处理器通用的 ROI 参数），参数定义在进程生命周期内不变，避免每次验证都重新构建参数模型
+        
+        Returns:
+            处理器参数列表
+        """
+        specs = cls.__dict__.get("_parameter_specs")
+        if specs is None:
+            specs = cls.parameters() + roi_parameters()
+            cls._parameter_specs = specs
+        return specs
+    
+    def setup(self) -> None:
+        """
+        实例创建后调用一次，用于预计算产物，默认不做任何事
+        """
+        pass
+    
+    def artifact(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        获取与参数相关的预计算产物，首次使用时调用factory创建并缓存
+        
+        Args:
+            key: 产物的键，通常由产物类型和相关参数组成
+            factory: 创建产物的函数
+            
+        Returns:
+            产物，调用方不得修改
+        """
+        value = self._artifacts.get(key)
+        if value is None:
+            value = factory()
+            with self._artifacts_lock:
+                if len(self._artifacts) >= self.MAX_ARTIFACTS:
+                    self._artifacts.pop(next(iter(self._artifacts)))
+                self._artifacts[key] = value
+        return value
+    
     @abstractmethod
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         """
@@ -54,6 +118,137 @@ class ImageProcessor(ABC):
         """
         pass
     
+    def process_typed(self, image: TypedImage, **kwargs) -> Union[np.ndarray, TypedImage]:
+        """
+        处理带色彩空间信息的图像，处理器链逐步调用此方法，默认直接处理主数据
+        
+        需要灰度、HSV 等其他表示的处理器覆盖此方法，通过 image.gray、image.hsv 等视图获取输入，
+        同一幅图像的每种转换在整条链中最多做一次；process() 则包装数组后调用此方法。
+        
+        Args:
+            image: 输入图像
+            **kwargs: 处理参数
+            
+        Returns:
+            处理后的图像数组，或附带了已知视图的 TypedImage
+        """
+        return self.process(image.data, **kwargs)
+    
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
+        """
+        将处理器表示为逐通道查找表，由设置了 LUT_VIEW 的处理器实现
+        
+        对输入图像的 LUT_VIEW 视图查表（视图不是 BGR、GRAY 时再转回 BGR）的结果必须与 process() 逐位相同。处理器链中连续的 BGR 视图
+        步骤组合为一张表，只遍历一次图像；与图像统计量有关的表应通过 source 获取均值、直方图。
+        
+        Args:
+            source: 查表的输入，提供通道数以及均值、直方图等统计量
+            **kwargs: 处理参数
+            
+        Returns:
+            查找表
+            
+        Raises:
+            ValueError: 处理器不能表示为查找表，或参数验证失败
+        """
+        raise ValueError(f"处理器 {self.name()} 不能表示为查找表")
+    
+    def detect(self, image: np.ndarray, **kwargs) -> Dict[str, np.ndarray]:
+        """
+        检测图像中的几何元素，不绘制也不编码图像，由支持几何结果输出的检测类处理器实现
+        
+        Args:
+            image: 输入图像
+            **kwargs: 处理参数
+            
+        Returns:
+            几何结果，键为元素名称（如 lines、circles），值为坐标数组
+            
+        Raises:
+            ValueError: 处理器不支持几何结果输出
+        """
+        raise ValueError(f"处理器 {self.name()} 不支持几何结果输出")
+    
+    def detect_typed(self, image: TypedImage, **kwargs) -> Dict[str, np.ndarray]:
+        """
+        检测带色彩空间信息的图像中的几何元素，默认直接检测主数据
+        
+        Args:
+            image: 输入图像
+            **kwargs: 处理参数
+            
+        Returns:
+            几何结果
+            
+        Raises:
+            ValueError: 处理器不支持几何结果输出
+        """
+        return self.detect(image.data, **kwargs)
+    
+    @classmethod
+    def returns_geometry(cls, validated_params: Dict[str, Any]) -> bool:
+        """
+        按已验证的参数判断处理器是否输出几何结果而非图像
+        
+        Args:
+            validated_params: 已验证的参数
+            
+        Returns:
+            输出几何结果时返回True
+        """
+        return validated_params.get("return") == "geometry"
+    
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        """
+        局部处理器每个输出像素所依赖的邻域半径（像素），用于分块执行时确定块间重叠
+        
+        只有输出像素仅取决于其邻域、且在图像边界处的处理方式与块边界无关的处理器才可分块执行。
+        
+        Args:
+            validated_params: 已验证的参数
+            
+        Returns:
+            邻域半径，不支持分块执行时返回None
+        """
+        return None
+    
+    @classmethod
+    def scale_parameters(cls, validated_params: Dict[str, Any], factor: float) -> Dict[str, Any]:
+        """
+        按图像缩放比例换算空间参数，换算结果对齐到参数的步长并限制在取值范围内
+        
+        Args:
+            validated_params: 已验证的参数
+            factor: 图像缩放比例
+            
+        Returns:
+            换算后的参数
+        """
+        scaled_params = dict(validated_params)
+        specs = {param.name: param for param in cls.parameter_specs()}
+        for name in cls.SPATIAL_PARAMETERS:
+            if name not in scaled_params:
+                continue
+            spec = specs[name]
+            value = scaled_params[name] * factor
+            
+            if spec.type == "int":
+                # 有步长的整数参数（如奇数核大小）对齐到从最小值开始的步长网格
+                if spec.step and spec.min_value is not None:
+                    value = spec.min_value + round((value - spec.min_value) / spec.step) * spec.step
+                value = int(round(value))
+            
+            if spec.min_value is not None:
+                value = max(value, spec.min_value)
+            if spec.max_value is not None:
+                value = min(value, spec.max_value)
+            scaled_params[name] = value
+        
+        if "roi" in scaled_params:
+            scaled_params["roi"] = scale_roi(scaled_params["roi"], factor)
+        return scaled_params
+    
     @classmethod
     def validate_parameters(cls, **kwargs) -> Dict[str, Any]:
         """
@@ -68,7 +263,7 @@ class ImageProcessor(ABC):
         Raises:
             ValueError: 参数验证失败
         """
-        params = cls.parameters()
+        params = cls.parameter_specs()
         validated_params = {}
         
         # 检查必填参数
@@ -105,4 +300,40 @@ class ImageProcessor(ABC):
                 if param.default is not None:
                     validated_params[param.name] = param.default
         
-        return validated_params 
\ No newline at end of file
+        # ROI 参数统一规范化，未指定 ROI 时不保留输出方式，参数（以及缓存键）与不支持 ROI 时相同；
+        # 前端对未填写的可选字符串参数会传空字符串，与不指定 ROI 同等对待
+        roi = validated_params.get("roi")
+        if roi is None or (isinstance(roi, str) and not roi.strip()):
+            validated_params.pop("roi", None)
+        if "roi" in validated_params:
+            validated_params["roi"] = parse_roi(validated_params["roi"])
+            if validated_params["roi_output"] not in ROI_OUTPUTS:
+                raise ValueError(f"不支持的ROI输出方式: {validated_params['roi_output']}")
+        else:
+            validated_params.pop("roi_output", None)
+        
+        return validated_params
+
+
+def roi_parameters() -> List[ProcessorParameter]:
+    """
+    所有处理器通用的 ROI 参数，由 ImageProcessorManager 统一处理，不传给处理器
+    
+    Returns:
+        ROI 参数列表
+    """
+    return [
+        ProcessorParameter(
+            name="roi",
+            type="str",
+            description="只处理的矩形区域，格式为'x,y,w,h'（像素），不填则处理整幅图像",
+            required=False
+        ),
+        ProcessorParameter(
+            name="roi_output",
+            type="str",
+            description="ROI 的输出方式：paste 将结果贴回原图，crop 只返回 ROI 区域",
+            required=False,
+            default=DEFAULT_ROI_OUTPUT
+        )
+    ] 
\ No newline at end of file
@@ -1,14 +1,22 @@
 """
 图像处理器管理模块，负责注册和获取图像处理器
 """
-from typing import Dict, Type, List, Any, Optional
+import threading
+from typing import Dict, Type, List, Any, Optional, Tuple
+import cv2
 import numpy as np
 from src.models.image_processor import ImageProcessor
+from src.models.typed_image import TO_BGR, TypedImage
+from src.utils.geometry import translate_geometry
+from src.utils.lut import ChannelLUT, LUTInput
+from src.utils.roi import Box, clip_roi, expand_box, paste_roi
 
 
 class ImageProcessorManager:
     """图像处理器管理器"""
     _processors: Dict[str, Type[ImageProcessor]] = {}
+    _instances: Dict[str, ImageProcessor] = {}
+    _lock = threading.Lock()
     
     @classmethod
     def register(cls, processor_class: Type[ImageProcessor]) -> None:
@@ -20,6 +28,7 @@ class ImageProcessorManager:
         """
         processor_name = processor_class.name()
         cls._processors[processor_name] = processor_class
+        cls._instances.pop(processor_name, None)
     
     @classmethod
     def get_processor(cls, name: str) -> Optional[Type[ImageProcessor]]:
@@ -34,6 +43,33 @@ class ImageProcessorManager:
         """
         return cls._processors.get(name)
     
+    @classmethod
+    def get_instance(cls, name: str) -> Optional[ImageProcessor]:
+        """
+        获取长期持有的处理器实例，首次使用时创建并调用 setup()
+        
+        Args:
+            name: 处理器名称
+            
+        Returns:
+            处理器实例，若处理器不存在则返回None
+        """
+        processor = cls._instances.get(name)
+        if processor is not None:
+            return processor
+        
+        processor_class = cls.get_processor(name)
+        if not processor_class:
+            return None
+        
+        with cls._lock:
+            processor = cls._instances.get(name)
+            if processor is None:
+                processor = processor_class()
+                processor.setup()
+                cls._instances[name] = processor
+        return processor
+    
     @classmethod
     def list_processors(cls) -> List[Dict[str, Any]]:
         """
@@ -46,7 +82,7 @@ class ImageProcessorManager:
             {
                 "name": processor.name(),
                 "description": processor.description(),
-                "parameters": [param.dict() for param in processor.parameters()]
+                "parameters": [param.dict() for param in processor.parameter_specs()]
             }
             for processor in cls._processors.values()
         ]
@@ -74,6 +110,160 @@ class ImageProcessorManager:
         # 验证参数
         validated_params = processor_class.validate_parameters(**kwargs)
         
-        # 创建处理器实例并处理图像
-        processor = processor_class()
-        return processor.process(image, **validated_params) 
\ No newline at end of file
+        return cls.execute(name, image, validated_params)
+    
+    @classmethod
+    def execute(cls, name: str, image: np.ndarray, validated_params: Dict[str, Any]) -> np.ndarray:
+        """
+        使用已验证的参数处理图像，不再重复验证
+        
+        Args:
+            name: 处理器名称
+            image: 输入图像
+            validated_params: 已验证的处理参数
+            
+        Returns:
+            处理后的图像
+            
+        Raises:
+            ValueError: 处理器不存在，或 ROI 不合法
+        """
+        return cls.execute_typed(name, TypedImage(image), validated_params).data
+    
+    @classmethod
+    def execute_typed(cls, name: str, image: TypedImage, validated_params: Dict[str, Any]) -> TypedImage:
+        """
+        使用已验证的参数处理带色彩空间信息的图像，处理器按需获取并复用图像已缓存的视图
+        
+        指定了 ROI 时只处理 ROI 及其四周 halo 个像素的区域：局部处理器（halo 不为None）的结果
+        在 ROI 内与整幅处理逐像素相同；其他处理器（直方图均衡化、轮廓检测等）只看到 ROI 内的像素。
+        
+        Args:
+            name: 处理器名称
+            image: 输入图像
+            validated_params: 已验证的处理参数
+            
+        Returns:
+            处理后的图像，ROI 输出方式为 crop 时只包含 ROI 区域
+            
+        Raises:
+            ValueError: 处理器不存在，或改变图像尺寸的处理器要求将 ROI 结果贴回原图
+        """
+        processor = cls.get_instance(name)
+        if processor is None:
+            raise ValueError(f"处理器不存在: {name}")
+        
+        if "roi" not in validated_params:
+            return TypedImage.wrap(processor.process_typed(image, **validated_params))
+        
+        params, box, region_box, output = cls._roi_region(processor, image.data, validated_params)
+        x0, y0, x1, y1 = region_box
+        result = TypedImage.wrap(processor.process_typed(image.crop(*region_box), **params))
+        
+        if result.shape[:2] == (y1 - y0, x1 - x0):
+            # 裁掉为邻域多读取的边
+            result = result.crop(box[0] - x0, box[1] - y0, box[2] - x0, box[3] - y0)
+        elif output == "paste":
+            raise ValueError(f"处理器 {name} 会改变图像尺寸，ROI 结果无法贴回原图，请使用 roi_output=crop")
+        
+        if output == "crop":
+            return result
+        return TypedImage(paste_roi(image.data, result.data, box))
+    
+    @classmethod
+    def execute_lookup_tables(cls, steps: List[Tuple[str, Dict[str, Any]]], image: TypedImage) -> TypedImage:
+        """
+        将连续的逐像素步骤组合为一张查找表，只遍历一次图像，结果与依次执行各步骤逐位相同
+        
+        每一步的查找表由前一步输出的统计量计算，中间结果的统计量由输入的直方图经查找表换算，不生成中间图像。
+        在 HSV、YCrCb 等视图上查表时，查表结果转回 BGR。
+        
+        Args:
+            steps: (处理器名称, 已验证的处理参数) 列表，处理器的 LUT_VIEW 必须相同，参数不含 ROI
+            image: 输入图像
+            
+        Returns:
+            处理后的图像
+            
+        Raises:
+            ValueError: 处理器不存在、不能表示为查找表，或查表的视图不同
+        """
+        view: Optional[str] = None
+        lut: Optional[ChannelLUT] = None
+        for name, params in steps:
+            processor = cls.get_instance(name)
+            if processor is None:
+                raise ValueError(f"处理器不存在: {name}")
+            if processor.LUT_VIEW is None or (view is not None and processor.LUT_VIEW != view):
+                raise ValueError(f"处理器 {name} 不能与前面的步骤组合为查找表")
+            
+            if lut is None:
+                view = processor.LUT_VIEW
+                source = LUTInput(image.view(view))
+                lut = step_lut = processor.lookup_table(source, **params)
+            else:
+                step_lut = processor.lookup_table(source, **params)
+                lut = lut.then(step_lut)
+            source = source.mapped(step_lut)
+        
+        if lut is None:
+            return image
+        result = lut.apply(image.view(view))
+        if view in TO_BGR:
+            result = cv2.cvtColor(result, TO_BGR[view])
+        return TypedImage(result)
+    
+    @classmethod
+    def detect_typed(cls, name: str, image: TypedImage, validated_params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        使用已验证的参数检测带色彩空间信息的图像中的几何元素
+        
+        Args:
+            name: 处理器名称
+            image: 输入图像
+            validated_params: 已验证的处理参数
+            
+        Returns:
+            几何结果，指定了 ROI 时输出方式为 paste 的坐标为原图坐标，crop 的坐标相对于 ROI 左上角
+            
+        Raises:
+            ValueError: 处理器不存在或不支持几何结果输出
+        """
+        processor = cls.get_instance(name)
+        if processor is None:
+            raise ValueError(f"处理器不存在: {name}")
+        
+        if "roi" not in validated_params:
+            return processor.detect_typed(image, **validated_params)
+        
+        params, box, region_box, output = cls._roi_region(processor, image.data, validated_params)
+        x0, y0 = region_box[:2]
+        geometry = processor.detect_typed(image.crop(*region_box), **params)
+        if output == "crop":
+            return translate_geometry(geometry, x0 - box[0], y0 - box[1])
+        return translate_geometry(geometry, x0, y0)
+    
+    @staticmethod
+    def _roi_region(processor: ImageProcessor, image: np.ndarray,
+                    validated_params: Dict[str, Any]) -> Tuple[Dict[str, Any], Box, Box, str]:
+        """
+        确定 ROI 处理需要读取的区域
+        
+        Args:
+            processor: 处理器实例
+            image: 输入图像
+            validated_params: 含 ROI 的已验证参数
+            
+        Returns:
+            (去掉 ROI 参数后传给处理器的参数, 限制在图像内的 ROI, 按 halo 扩展后读取的区域, 输出方式)
+            
+        Raises:
+            ValueError: ROI 超出图像范围
+        """
+        params = dict(validated_params)
+        roi = params.pop("roi")
+        output = params.pop("roi_output")
+        box = clip_roi(roi, image.shape)
+        # 非局部处理器的结果取决于整块输入，只在 ROI 本身上运行
+        halo = type(processor).halo(params) or 0
+        return params, box, expand_box(box, halo, image.shape), output
@@ -7,8 +7,7 @@ from src.models.processors.color_processors import (
     HSVFixedChannelProcessor,
     WhiteBalanceProcessor,
     GreyWorldProcessor,
-    HistogramEqualizationProcessor,
-    AutomaticWhiteBalanceProcessor
+    HistogramEqualizationProcessor
 )
 from src.models.processors.filter_processors import (
     MeanFilterProcessor,
@@ -5,6 +5,8 @@ import cv2
 import numpy as np
 from typing import List
 from src.models.image_processor import ImageProcessor, ProcessorParameter
+from src.models.typed_image import TypedImage
+from src.utils.lut import IDENTITY, ChannelLUT, LUTInput
 
 
 class HSVSplitProcessor(ImageProcessor):
@@ -30,13 +32,13 @@ class HSVSplitProcessor(ImageProcessor):
         ]
     
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
         channel = kwargs.get("channel", "h").lower()
         
-        # 转换成HSV色彩空间
-        hsv = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2HSV)
-        
-        # 分离通道
-        h, s, v = cv2.split(hsv)
+        # 分离HSV视图的通道
+        h, s, v = cv2.split(image.hsv)
         
         # 根据参数返回相应通道
         if channel == "h":
@@ -52,6 +54,9 @@ class HSVSplitProcessor(ImageProcessor):
 class HSVFixedChannelProcessor(ImageProcessor):
     """HSV固定通道处理器"""
     
+    # 固定通道即HSV视图上的常数查找表，查表后转回BGR；前后的色彩空间往返有损，不与其他步骤组合
+    LUT_VIEW = "HSV"
+    
     @classmethod
     def name(cls) -> str:
         return "hsv_fixed_channel"
@@ -113,7 +118,7 @@ class HSVFixedChannelProcessor(ImageProcessor):
             )
         ]
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
         fix_h = kwargs.get("fix_h", False)
         fix_s = kwargs.get("fix_s", False)
         fix_v = kwargs.get("fix_v", False)
@@ -121,24 +126,29 @@ class HSVFixedChannelProcessor(ImageProcessor):
         s_value = kwargs.get("s_value", 255)
         v_value = kwargs.get("v_value", 255)
         
-        # 转换成HSV色彩空间
-        hsv = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2HSV)
-        
-        # 分离通道
-        h, s, v = cv2.split(hsv)
-        
-        # 固定通道
-        if fix_h:
-            h = np.full_like(a=h, fill_value=h_value)
-        
-        if fix_s:
-            s = np.full_like(a=s, fill_value=s_value)
-        
-        if fix_v:
-            v = np.full_like(a=v, fill_value=v_value)
+        # 固定的通道为常数查找表，其余通道不变
+        tables = [
+            np.full(256, value, dtype=np.uint8) if fix else IDENTITY
+            for fix, value in ((fix_h, h_value), (fix_s, s_value), (fix_v, v_value))
+        ]
+        return ChannelLUT.per_channel(tables)
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
+        fix_h = kwargs.get("fix_h", False)
+        fix_s = kwargs.get("fix_s", False)
+        fix_v = kwargs.get("fix_v", False)
+        h_value = kwargs.get("h_value", 255)
+        s_value = kwargs.get("s_value", 255)
+        v_value = kwargs.get("v_value", 255)
         
-        # 合并通道
-        merge = cv2.merge([h, s, v])
+        # 固定的通道等价于常数查找表，在HSV视图的拷贝上直接填充（比查表更快），不必分离与合并通道
+        merge = image.hsv.copy()
+        for channel, (fix, value) in enumerate(((fix_h, h_value), (fix_s, s_value), (fix_v, v_value))):
+            if fix:
+                merge[:, :, channel] = value
         
         # 转回BGR
         return cv2.cvtColor(src=merge, code=cv2.COLOR_HSV2BGR)
@@ -147,6 +157,9 @@ class HSVFixedChannelProcessor(ImageProcessor):
 class WhiteBalanceProcessor(ImageProcessor):
     """白平衡处理器"""
     
+    # 逐像素的通道增益，以BGR视图上的查找表实现
+    LUT_VIEW = "BGR"
+    
     @classmethod
     def name(cls) -> str:
         return "white_balance"
@@ -159,28 +172,31 @@ class WhiteBalanceProcessor(ImageProcessor):
     def parameters(cls) -> List[ProcessorParameter]:
         return []
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
-        r, g, b = cv2.split(image)
-        r_avg = cv2.mean(r)[0]
-        g_avg = cv2.mean(g)[0]
-        b_avg = cv2.mean(b)[0]
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
+        # 沿用原实现：r, g, b 依次为 B、G、R 通道，按 [b, g, r] 合并，输出的通道顺序与输入相反
+        r_avg, g_avg, b_avg = source.mean()
         
         # 求各个通道所占增益
         k = (r_avg + g_avg + b_avg) / 3
-        kr = k / r_avg
-        kg = k / g_avg
-        kb = k / b_avg
-        
-        r = cv2.addWeighted(src1=r, alpha=kr, src2=0, beta=0, gamma=0)
-        g = cv2.addWeighted(src1=g, alpha=kg, src2=0, beta=0, gamma=0)
-        b = cv2.addWeighted(src1=b, alpha=kb, src2=0, beta=0, gamma=0)
-        
-        return cv2.merge([b, g, r])
+        tables = [
+            cv2.addWeighted(src1=IDENTITY, alpha=k / avg, src2=0, beta=0, gamma=0)
+            for avg in (b_avg, g_avg, r_avg)
+        ]
+        return ChannelLUT.per_channel(tables, source=(2, 1, 0))
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
+        return self.lookup_table(LUTInput(image.bgr), **kwargs).apply(image.bgr)
 
 
 class GreyWorldProcessor(ImageProcessor):
     """灰度世界算法处理器"""
     
+    # 各通道按均值缩放并截断，同样是逐像素的映射
+    LUT_VIEW = "BGR"
+    
     @classmethod
     def name(cls) -> str:
         return "grey_world"
@@ -193,24 +209,32 @@ class GreyWorldProcessor(ImageProcessor):
     def parameters(cls) -> List[ProcessorParameter]:
         return []
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
-        nimg = image.transpose(2, 0, 1).astype(np.uint32)
-        avg_b = np.average(nimg[0])
-        avg_g = np.average(nimg[1])
-        avg_r = np.average(nimg[2])
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
+        avg_b, avg_g, avg_r = source.sums() / source.pixels
         
         avg = (avg_b + avg_g + avg_r) / 3
         
-        nimg[0] = np.minimum(nimg[0] * (avg / avg_b), 255)
-        nimg[1] = np.minimum(nimg[1] * (avg / avg_g), 255)
-        nimg[2] = np.minimum(nimg[2] * (avg / avg_r), 255)
-        
-        return nimg.transpose(1, 2, 0).astype(np.uint8)
+        # 与逐像素计算相同：按uint32乘以增益，截断到255后取整
+        values = IDENTITY.astype(np.uint32)
+        tables = [
+            np.minimum(values * (avg / channel_avg), 255).astype(np.uint32).astype(np.uint8)
+            for channel_avg in (avg_b, avg_g, avg_r)
+        ]
+        return ChannelLUT.per_channel(tables)
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
+        return self.lookup_table(LUTInput(image.bgr), **kwargs).apply(image.bgr)
 
 
 class HistogramEqualizationProcessor(ImageProcessor):
     """直方图均衡化处理器"""
     
+    # 均衡化是由亮度直方图得到的映射，即YCrCb视图上的查找表；前后的色彩空间往返有损，不与其他步骤组合
+    LUT_VIEW = "YCrCb"
+    
     @classmethod
     def name(cls) -> str:
         return "histogram_equalization"
@@ -224,39 +248,28 @@ class HistogramEqualizationProcessor(ImageProcessor):
         return []
     
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
-        ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCR_CB)
-        channels = cv2.split(ycrcb)
-        cv2.equalizeHist(channels[0], channels[0])
-        cv2.merge(channels, ycrcb)
-        return cv2.cvtColor(ycrcb, cv2.COLOR_YCR_CB2BGR)
-
-
-class AutomaticWhiteBalanceProcessor(ImageProcessor):
-    """自动白平衡处理器"""
+        return self.process_typed(TypedImage(image), **kwargs)
     
-    @classmethod
-    def name(cls) -> str:
-        return "automatic_white_balance"
-    
-    @classmethod
-    def description(cls) -> str:
-        return "对图像进行自动白平衡处理"
-    
-    @classmethod
-    def parameters(cls) -> List[ProcessorParameter]:
-        return []
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
+        # 与 cv2.equalizeHist 相同：亮度直方图中第一个非零的灰度级映射为0，其后按累积计数乘以
+        # 255/(像素数-该灰度级计数) 的单精度结果舍入到最近的偶数；只有一个灰度级时全部映射为该灰度级。
+        # 查表作用于YCrCb视图，Cr、Cb通道不变
+        histogram = source.histogram()[0]
+        table = np.zeros(256, dtype=np.uint8)
+        levels = np.flatnonzero(histogram)
+        if len(levels):
+            first = levels[0]
+            if histogram[first] == source.pixels:
+                table[:] = first
+            else:
+                scale = np.float32(255.0) / np.float32(source.pixels - histogram[first])
+                cumulative = np.cumsum(histogram[first + 1:]).astype(np.float32)
+                table[first + 1:] = np.clip(np.rint(cumulative * scale), 0, 255)
+        return ChannelLUT.per_channel([table, IDENTITY, IDENTITY])
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
-        result = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        avg_a = np.average(result[:, :, 1])
-        avg_b = np.average(result[:, :, 2])
-        
-        for x in range(result.shape[0]):
-            for y in range(result.shape[1]):
-                l, a, b = result[x, y, :]
-                # fix for CV correction
-                l *= 100 / 255.0
-                result[x, y, 1] = a - ((avg_a - 128) * (l / 100.0) * 1.1)
-                result[x, y, 2] = b - ((avg_b - 128) * (l / 100.0) * 1.1)
-        
-        return cv2.cvtColor(result, cv2.COLOR_LAB2BGR) 
\ No newline at end of file
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
+        # 单独执行时 cv2.equalizeHist 只统计亮度通道，比查表更快
+        # YCrCb视图只读，分离出的通道是拷贝，可以原地均衡化
+        channels = cv2.split(image.ycrcb)
+        cv2.equalizeHist(channels[0], channels[0])
+        return cv2.cvtColor(cv2.merge(channels), cv2.COLOR_YCR_CB2BGR)
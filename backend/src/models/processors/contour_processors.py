@@ -3,13 +3,163 @@
 """
 import cv2
 import numpy as np
-from typing import List, Tuple
+from typing import Any, Callable, Dict, List, Tuple
 from src.models.image_processor import ImageProcessor, ProcessorParameter
+from src.models.typed_image import TypedImage
+from src.utils import hough
+from src.utils.geometry import pack_contours
+
+
+# 输出内容：绘制检测结果的图像，或只返回几何坐标
+RETURN_MODES = ("image", "geometry")
+
+# 霍夫检测策略：全分辨率检测，或先在金字塔层上检测候选再在全分辨率窗口中精化
+HOUGH_STRATEGIES = ("exact", "pyramid")
+
+
+def _return_parameter() -> ProcessorParameter:
+    """检测类处理器共用的输出内容参数"""
+    return ProcessorParameter(
+        name="return",
+        type="str",
+        description="输出内容，可选值：image（绘制检测结果的图像）, geometry（只返回几何坐标，不绘制也不编码图像）",
+        required=False,
+        default="image"
+    )
+
+
+def _strategy_parameters() -> List[ProcessorParameter]:
+    """霍夫检测类处理器共用的检测策略参数"""
+    return [
+        ProcessorParameter(
+            name="strategy",
+            type="str",
+            description="检测策略，可选值：exact（全分辨率检测）, pyramid（在缩小的金字塔层上检测候选，再在全分辨率小窗口中精化，适合大图）",
+            required=False,
+            default="exact"
+        ),
+        ProcessorParameter(
+            name="pyramid_levels",
+            type="int",
+            description="pyramid 策略的金字塔层数，每层缩小一半，最粗层过小时自动减少",
+            required=False,
+            min_value=1,
+            max_value=4,
+            default=2
+        ),
+    ]
+
+
+def _pyramid_levels(kwargs: Dict[str, Any], shape: Tuple[int, ...], min_feature: float) -> int:
+    """
+    确定霍夫检测使用的金字塔层数
+    
+    Args:
+        kwargs: 处理参数
+        shape: 图像形状
+        min_feature: 以像素计的最小特征尺寸（最小半径或最小线长）
+        
+    Returns:
+        层数，0表示全分辨率检测
+        
+    Raises:
+        ValueError: 检测策略不支持
+    """
+    strategy = kwargs.get("strategy", "exact")
+    if strategy not in HOUGH_STRATEGIES:
+        raise ValueError(f"不支持的检测策略: {strategy}")
+    if strategy == "exact":
+        return 0
+    return hough.pyramid_levels(kwargs.get("pyramid_levels", 2), shape, min_feature)
+
+
+def _check_return(kwargs: Dict[str, Any]) -> None:
+    """校验输出内容参数"""
+    mode = kwargs.get("return", "image")
+    if mode not in RETURN_MODES:
+        raise ValueError(f"不支持的输出内容: {mode}")
+
+
+def _parse_color(color_str: str) -> Tuple[int, int, int]:
+    """
+    解析'R,G,B'颜色
+    
+    Args:
+        color_str: 颜色字符串
+        
+    Returns:
+        OpenCV使用的BGR颜色
+        
+    Raises:
+        ValueError: 颜色格式错误
+    """
+    try:
+        r, g, b = map(int, color_str.split(","))
+    except (ValueError, AttributeError):
+        raise ValueError(f"颜色格式错误，应为'R,G,B': {color_str}")
+    return (b, g, r)
+
+
+def _draw(image: TypedImage, draw: Callable[[np.ndarray, Tuple[int, int, int]], None],
+          color: Tuple[int, int, int], keep_gray: bool = False) -> TypedImage:
+    """
+    在输入图像的副本上绘制检测结果，并附带输出的灰度视图
+    
+    BGR2GRAY 是逐像素的转换，绘制又不做抗锯齿：未绘制的像素灰度与输入相同，绘制的像素灰度即颜色的灰度。
+    因此在输入灰度视图的副本上用颜色的灰度重绘一遍，结果与由输出转换得到的灰度图逐位相同，
+    下一步需要灰度图时（如轮廓检测后接霍夫检测）省去一次整幅的 BGR2GRAY。
+    
+    Args:
+        image: 输入图像
+        draw: 在画布上绘制的函数，参数为画布与颜色
+        color: BGR颜色
+        keep_gray: 灰度输入时是否直接在灰度图上绘制，仅在绘制颜色为灰度色时由处理器链规划器开启
+        
+    Returns:
+        绘制了检测结果的图像
+    """
+    if image.color_space == "BGR" or keep_gray:
+        canvas = image.data.copy()
+    else:
+        canvas = cv2.cvtColor(image.data, cv2.COLOR_GRAY2BGR)
+    draw(canvas, color)
+    if canvas.ndim == 2:
+        return TypedImage(canvas)
+    
+    # 检测时已经取得了输入的灰度视图
+    source_gray = image.gray
+    gray_color = int(cv2.cvtColor(np.array([[color]], dtype=np.uint8), cv2.COLOR_BGR2GRAY)[0, 0])
+    
+    def gray_view() -> np.ndarray:
+        gray = source_gray.copy()
+        draw(gray, (gray_color,) * 3)
+        return gray
+    
+    return TypedImage(canvas, {"GRAY": gray_view})
 
 
 class ContourDetectionProcessor(ImageProcessor):
     """轮廓检测处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("thickness",)
+    
+    # 轮廓检索模式映射
+    MODES = {
+        "external": cv2.RETR_EXTERNAL,
+        "list": cv2.RETR_LIST,
+        "ccomp": cv2.RETR_CCOMP,
+        "tree": cv2.RETR_TREE
+    }
+    
+    # 轮廓近似方法映射
+    METHODS = {
+        "none": cv2.CHAIN_APPROX_NONE,
+        "simple": cv2.CHAIN_APPROX_SIMPLE,
+        "tc89_l1": cv2.CHAIN_APPROX_TC89_L1,
+        "tc89_kcos": cv2.CHAIN_APPROX_TC89_KCOS
+    }
+    
     @classmethod
     def name(cls) -> str:
         return "contour_detection"
@@ -50,73 +200,68 @@ class ContourDetectionProcessor(ImageProcessor):
                 min_value=1,
                 max_value=10,
                 default=2
-            )
+            ),
+            _return_parameter()
         ]
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+    def _find_contours(self, image_gray: np.ndarray, **kwargs) -> Tuple[Tuple[np.ndarray, ...], np.ndarray]:
+        """
+        检测轮廓
+        
+        Returns:
+            (轮廓列表, 轮廓层级)
+        """
         mode_str = kwargs.get("mode", "list").lower()
         method_str = kwargs.get("method", "none").lower()
-        color_str = kwargs.get("color", "255,255,255")
-        thickness = kwargs.get("thickness", 2)
-        
-        # 定义模式映射
-        mode_map = {
-            "external": cv2.RETR_EXTERNAL,
-            "list": cv2.RETR_LIST,
-            "ccomp": cv2.RETR_CCOMP,
-            "tree": cv2.RETR_TREE
-        }
         
-        # 定义方法映射
-        method_map = {
-            "none": cv2.CHAIN_APPROX_NONE,
-            "simple": cv2.CHAIN_APPROX_SIMPLE,
-            "tc89_l1": cv2.CHAIN_APPROX_TC89_L1,
-            "tc89_kcos": cv2.CHAIN_APPROX_TC89_KCOS
-        }
-        
-        if mode_str not in mode_map:
+        if mode_str not in self.MODES:
             raise ValueError(f"不支持的轮廓检索模式: {mode_str}")
         
-        if method_str not in method_map:
+        if method_str not in self.METHODS:
             raise ValueError(f"不支持的轮廓近似方法: {method_str}")
         
-        # 解析颜色
-        try:
-            r, g, b = map(int, color_str.split(","))
-            color = (b, g, r)  # OpenCV使用BGR顺序
-        except (ValueError, AttributeError):
-            raise ValueError(f"颜色格式错误，应为'R,G,B': {color_str}")
-        
-        # 转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-        else:
-            image_gray = image
-        
-        # 检测轮廓
-        contours, _ = cv2.findContours(
+        return cv2.findContours(
             image=image_gray, 
-            mode=mode_map[mode_str], 
-            method=method_map[method_str]
+            mode=self.MODES[mode_str], 
+            method=self.METHODS[method_str]
         )
+    
+    def detect(self, image: np.ndarray, **kwargs) -> Dict[str, np.ndarray]:
+        return self.detect_typed(TypedImage(image), **kwargs)
+    
+    def detect_typed(self, image: TypedImage, **kwargs) -> Dict[str, np.ndarray]:
+        contours, hierarchy = self._find_contours(image.gray, **kwargs)
+        return pack_contours(contours, hierarchy)
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs).data
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> TypedImage:
+        _check_return(kwargs)
+        color = _parse_color(kwargs.get("color", "255,255,255"))
+        thickness = kwargs.get("thickness", 2)
+        
+        contours, _ = self._find_contours(image.gray, **kwargs)
         
         # 绘制轮廓
-        result = image.copy() if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-        cv2.drawContours(
-            image=result, 
-            contours=contours, 
-            contourIdx=-1,  # 绘制所有轮廓
-            color=color, 
-            thickness=thickness
-        )
+        def draw(canvas: np.ndarray, draw_color: Tuple[int, int, int]) -> None:
+            cv2.drawContours(
+                image=canvas, 
+                contours=contours, 
+                contourIdx=-1,
+                color=draw_color, 
+                thickness=thickness
+            )
         
-        return result
+        return _draw(image, draw, color, kwargs.get("keep_gray", False))
 
 
 class HoughLinesProcessor(ImageProcessor):
     """霍夫线变换处理器"""
     
+    # 预览模式下随分辨率缩放的参数，投票阈值与线上的边缘像素数成正比，也随之缩放
+    SPATIAL_PARAMETERS = ("threshold", "min_line_length", "max_line_gap", "thickness")
+    
     @classmethod
     def name(cls) -> str:
         return "hough_lines"
@@ -170,57 +315,74 @@ class HoughLinesProcessor(ImageProcessor):
                 min_value=1,
                 max_value=10,
                 default=2
-            )
+            ),
+            *_strategy_parameters(),
+            _return_parameter()
         ]
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+    def _find_lines(self, image_gray: np.ndarray, **kwargs) -> np.ndarray:
+        """
+        检测线段
+        
+        Returns:
+            线段端点 (n, 4) int32，每行为 [x1, y1, x2, y2]
+        """
         threshold = kwargs.get("threshold", 50)
         min_line_length = kwargs.get("min_line_length", 20)
         max_line_gap = kwargs.get("max_line_gap", 10)
-        color_str = kwargs.get("color", "0,255,0")
-        thickness = kwargs.get("thickness", 2)
-        
-        # 解析颜色
-        try:
-            r, g, b = map(int, color_str.split(","))
-            color = (b, g, r)  # OpenCV使用BGR顺序
-        except (ValueError, AttributeError):
-            raise ValueError(f"颜色格式错误，应为'R,G,B': {color_str}")
         
-        # 转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-        else:
-            image_gray = image
+        levels = _pyramid_levels(kwargs, image_gray.shape, min_line_length)
+        if levels:
+            return hough.hough_lines(image_gray, levels, threshold, min_line_length, max_line_gap)
         
         # 边缘检测
         edges = cv2.Canny(image=image_gray, threshold1=50, threshold2=150)
         
         # 霍夫线变换
-        theta = np.pi / 180
         lines = cv2.HoughLinesP(
             image=edges, 
             rho=1, 
-            theta=theta, 
+            theta=np.pi / 180, 
             threshold=threshold,
             minLineLength=min_line_length,
             maxLineGap=max_line_gap
         )
+        if lines is None:
+            return np.empty((0, 4), dtype=np.int32)
+        # 不同OpenCV版本返回 (N, 1, 4) 或 (N, 4)
+        return lines.reshape(-1, 4).astype(np.int32, copy=False)
+    
+    def detect(self, image: np.ndarray, **kwargs) -> Dict[str, np.ndarray]:
+        return self.detect_typed(TypedImage(image), **kwargs)
+    
+    def detect_typed(self, image: TypedImage, **kwargs) -> Dict[str, np.ndarray]:
+        return {"lines": self._find_lines(image.gray, **kwargs)}
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs).data
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> TypedImage:
+        _check_return(kwargs)
+        color = _parse_color(kwargs.get("color", "0,255,0"))
+        thickness = kwargs.get("thickness", 2)
         
-        # 绘制直线
-        result = image.copy() if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        lines = self._find_lines(image.gray, **kwargs)
         
-        if lines is not None:
-            for line in lines:
-                for x1, y1, x2, y2 in line:
-                    cv2.line(img=result, pt1=(x1, y1), pt2=(x2, y2), color=color, thickness=thickness)
+        # 每条线段作为两个顶点的折线，一次调用绘制所有线段
+        def draw(canvas: np.ndarray, draw_color: Tuple[int, int, int]) -> None:
+            if len(lines):
+                cv2.polylines(img=canvas, pts=list(lines.reshape(-1, 2, 2)), isClosed=False, color=draw_color,
+                              thickness=thickness)
         
-        return result
+        return _draw(image, draw, color, kwargs.get("keep_gray", False))
 
 
 class HoughCirclesProcessor(ImageProcessor):
     """霍夫圆变换处理器"""
     
+    # 预览模式下随分辨率缩放的参数，累加器阈值与圆周长成正比，也随之缩放
+    SPATIAL_PARAMETERS = ("min_dist", "param2", "min_radius", "max_radius", "thickness")
+    
     @classmethod
     def name(cls) -> str:
         return "hough_circles"
@@ -302,33 +464,29 @@ class HoughCirclesProcessor(ImageProcessor):
                 min_value=1,
                 max_value=10,
                 default=2
-            )
+            ),
+            *_strategy_parameters(),
+            _return_parameter()
         ]
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+    def _find_circles(self, image_gray: np.ndarray, **kwargs) -> np.ndarray:
+        """
+        检测圆
+        
+        Returns:
+            圆 (n, 3) float32，每行为 [x, y, r]
+        """
         dp = kwargs.get("dp", 2.0)
         min_dist = kwargs.get("min_dist", 20)
         param1 = kwargs.get("param1", 200)
         param2 = kwargs.get("param2", 100)
         min_radius = kwargs.get("min_radius", 15)
         max_radius = kwargs.get("max_radius", 50)
-        color_str = kwargs.get("color", "0,255,0")
-        thickness = kwargs.get("thickness", 2)
         
-        # 解析颜色
-        try:
-            r, g, b = map(int, color_str.split(","))
-            color = (b, g, r)  # OpenCV使用BGR顺序
-        except (ValueError, AttributeError):
-            raise ValueError(f"颜色格式错误，应为'R,G,B': {color_str}")
+        levels = _pyramid_levels(kwargs, image_gray.shape, min_radius)
+        if levels:
+            return hough.hough_circles(image_gray, levels, dp, min_dist, param1, param2, min_radius, max_radius)
         
-        # 转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-        else:
-            image_gray = image
-        
-        # 霍夫圆变换
         circles = cv2.HoughCircles(
             image=image_gray, 
             method=cv2.HOUGH_GRADIENT, 
@@ -339,19 +497,32 @@ class HoughCirclesProcessor(ImageProcessor):
             minRadius=min_radius, 
             maxRadius=max_radius
         )
+        if circles is None:
+            return np.empty((0, 3), dtype=np.float32)
+        return circles.reshape(-1, 3).astype(np.float32, copy=False)
+    
+    def detect(self, image: np.ndarray, **kwargs) -> Dict[str, np.ndarray]:
+        return self.detect_typed(TypedImage(image), **kwargs)
+    
+    def detect_typed(self, image: TypedImage, **kwargs) -> Dict[str, np.ndarray]:
+        return {"circles": self._find_circles(image.gray, **kwargs)}
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs).data
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> TypedImage:
+        _check_return(kwargs)
+        color = _parse_color(kwargs.get("color", "0,255,0"))
+        thickness = kwargs.get("thickness", 2)
         
-        # 绘制圆
-        result = image.copy() if len(image.shape) == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        circles = np.rint(self._find_circles(image.gray, **kwargs)).astype(np.int32).tolist()
         
-        if circles is not None:
-            circles = np.uint16(np.around(circles))
-            for i in circles[0, :]:
-                center = (i[0], i[1])
-                radius = i[2]
-                
+        # 绘制圆
+        def draw(canvas: np.ndarray, draw_color: Tuple[int, int, int]) -> None:
+            for x, y, radius in circles:
                 # 绘制圆心
-                cv2.circle(img=result, center=center, radius=2, color=color, thickness=3)
+                cv2.circle(img=canvas, center=(x, y), radius=2, color=draw_color, thickness=3)
                 # 绘制圆轮廓
-                cv2.circle(img=result, center=center, radius=radius, color=color, thickness=thickness)
+                cv2.circle(img=canvas, center=(x, y), radius=radius, color=draw_color, thickness=thickness)
         
-        return result 
\ No newline at end of file
+        return _draw(image, draw, color, kwargs.get("keep_gray", False)) 
\ No newline at end of file
@@ -5,11 +5,15 @@ import cv2
 import numpy as np
 from typing import List
 from src.models.image_processor import ImageProcessor, ProcessorParameter
+from src.utils.retinex import multi_scale_retinex
 
 
 class RetinexSingleScaleProcessor(ImageProcessor):
     """单尺度Retinex处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("sigma",)
+    
     @classmethod
     def name(cls) -> str:
         return "retinex_single_scale"
@@ -36,28 +40,15 @@ class RetinexSingleScaleProcessor(ImageProcessor):
         sigma = kwargs.get("sigma", 300)
         
         # 单尺度Retinex
-        img = np.float64(image) + 1.0
-        
-        # 高斯模糊
-        gaussian = cv2.GaussianBlur(img, (0, 0), sigma)
-        gaussian = np.where(gaussian == 0, 0.01, gaussian)
-        
-        # 计算对数差
-        retinex = np.log10(img) - np.log10(gaussian)
-        
-        # 转换到0-255范围
-        for i in range(retinex.shape[2]):
-            retinex[:, :, i] = (retinex[:, :, i] - np.min(retinex[:, :, i])) / \
-                              (np.max(retinex[:, :, i]) - np.min(retinex[:, :, i])) * 255
-        
-        retinex = np.uint8(np.minimum(np.maximum(retinex, 0), 255))
-        
-        return retinex
+        return multi_scale_retinex(image, [sigma])
 
 
 class RetinexMultiScaleProcessor(ImageProcessor):
     """多尺度Retinex处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("sigma_small", "sigma_medium", "sigma_large")
+    
     @classmethod
     def name(cls) -> str:
         return "retinex_multi_scale"
@@ -105,29 +96,8 @@ class RetinexMultiScaleProcessor(ImageProcessor):
         
         sigma_list = [sigma_small, sigma_medium, sigma_large]
         
-        # 多尺度Retinex
-        img = np.float64(image) + 1.0
-        retinex = np.zeros_like(img)
-        
-        for sigma in sigma_list:
-            # 高斯模糊
-            gaussian = cv2.GaussianBlur(img, (0, 0), sigma)
-            gaussian = np.where(gaussian == 0, 0.01, gaussian)
-            
-            # 计算对数差
-            retinex += np.log10(img) - np.log10(gaussian)
-        
-        # 平均
-        retinex = retinex / len(sigma_list)
-        
-        # 转换到0-255范围
-        for i in range(retinex.shape[2]):
-            retinex[:, :, i] = (retinex[:, :, i] - np.min(retinex[:, :, i])) / \
-                              (np.max(retinex[:, :, i]) - np.min(retinex[:, :, i])) * 255
-        
-        retinex = np.uint8(np.minimum(np.maximum(retinex, 0), 255))
-        
-        return retinex
+        # 多尺度Retinex，对数图像在各尺度间共享
+        return multi_scale_retinex(image, sigma_list)
 
 
 class AutomaticWhiteBalanceProcessor(ImageProcessor):
@@ -150,12 +120,13 @@ class AutomaticWhiteBalanceProcessor(ImageProcessor):
         avg_a = np.average(result[:, :, 1])
         avg_b = np.average(result[:, :, 2])
         
-        for x in range(result.shape[0]):
-            for y in range(result.shape[1]):
-                l, a, b = result[x, y, :]
-                # fix for CV correction
-                l *= 100 / 255.0
-                result[x, y, 1] = a - ((avg_a - 128) * (l / 100.0) * 1.1)
-                result[x, y, 2] = b - ((avg_b - 128) * (l / 100.0) * 1.1)
+        # 按亮度加权的偏移量：(avg - 128) * (L * 100 / 255 / 100) * 1.1，整幅图一次计算
+        weight = result[:, :, 0].astype(np.float32) * np.float32(1.1 / 255.0)
+        
+        for channel, avg in ((1, avg_a), (2, avg_b)):
+            corrected = result[:, :, channel] - weight * np.float32(avg - 128)
+            # 截断取整与逐像素赋值一致，越界值饱和到[0, 255]而不是回绕
+            np.clip(corrected, 0, 255, out=corrected)
+            result[:, :, channel] = corrected
         
         return cv2.cvtColor(result, cv2.COLOR_LAB2BGR) 
\ No newline at end of file
@@ -3,13 +3,17 @@
 """
 import cv2
 import numpy as np
-from typing import List
+from typing import Any, Dict, List, Optional
 from src.models.image_processor import ImageProcessor, ProcessorParameter
+from src.models.typed_image import TypedImage
 
 
 class MeanFilterProcessor(ImageProcessor):
     """均值滤波处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size",)
+    
     @classmethod
     def name(cls) -> str:
         return "mean_filter"
@@ -33,6 +37,10 @@ class MeanFilterProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         kernel_size = kwargs.get("kernel_size", 5)
         return cv2.blur(src=image, ksize=(kernel_size, kernel_size))
@@ -41,6 +49,9 @@ class MeanFilterProcessor(ImageProcessor):
 class GaussianFilterProcessor(ImageProcessor):
     """高斯滤波处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size", "sigma")
+    
     @classmethod
     def name(cls) -> str:
         return "gaussian_filter"
@@ -74,6 +85,10 @@ class GaussianFilterProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         kernel_size = kwargs.get("kernel_size", 9)
         sigma = kwargs.get("sigma", 1.5)
@@ -83,6 +98,9 @@ class GaussianFilterProcessor(ImageProcessor):
 class MedianFilterProcessor(ImageProcessor):
     """中值滤波处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size",)
+    
     @classmethod
     def name(cls) -> str:
         return "median_filter"
@@ -106,6 +124,10 @@ class MedianFilterProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         kernel_size = kwargs.get("kernel_size", 5)
         return cv2.medianBlur(src=image, ksize=kernel_size)
@@ -174,18 +196,22 @@ class SobelFilterProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
         dx = kwargs.get("dx", 1)
         dy = kwargs.get("dy", 0)
         kernel_size = kwargs.get("kernel_size", 3)
         scale = kwargs.get("scale", 0.4)
         delta = kwargs.get("delta", 128)
         
-        # 转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-        else:
-            image_gray = image
+        # 灰度视图，灰度输入即为输入本身
+        image_gray = image.gray
         
         return cv2.Sobel(
             src=image_gray, 
@@ -241,15 +267,15 @@ class CannyEdgeProcessor(ImageProcessor):
         ]
     
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
         threshold1 = kwargs.get("threshold1", 125)
         threshold2 = kwargs.get("threshold2", 350)
         invert = kwargs.get("invert", True)
         
-        # 转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-        else:
-            image_gray = image
+        # 灰度视图，灰度输入即为输入本身
+        image_gray = image.gray
         
         edges = cv2.Canny(image=image_gray, threshold1=threshold1, threshold2=threshold2)
         
@@ -299,6 +325,13 @@ class PyramidFilterProcessor(ImageProcessor):
 class ResizeProcessor(ImageProcessor):
     """图像缩放处理器"""
     
+    # 插值方法映射
+    INTERPOLATIONS = {
+        "nearest": cv2.INTER_NEAREST,
+        "linear": cv2.INTER_LINEAR,
+        "cubic": cv2.INTER_CUBIC
+    }
+    
     @classmethod
     def name(cls) -> str:
         return "resize"
@@ -333,12 +366,6 @@ class ResizeProcessor(ImageProcessor):
         scale = kwargs.get("scale", 0.5)
         interpolation_str = kwargs.get("interpolation", "cubic").lower()
         
-        interpolation_map = {
-            "nearest": cv2.INTER_NEAREST,
-            "linear": cv2.INTER_LINEAR,
-            "cubic": cv2.INTER_CUBIC
-        }
-        
-        interpolation = interpolation_map.get(interpolation_str, cv2.INTER_CUBIC)
+        interpolation = self.INTERPOLATIONS.get(interpolation_str, cv2.INTER_CUBIC)
         
         return cv2.resize(src=image, dsize=(0, 0), fx=scale, fy=scale, interpolation=interpolation) 
\ No newline at end of file
@@ -3,13 +3,39 @@
 """
 import cv2
 import numpy as np
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from src.models.image_processor import ImageProcessor, ProcessorParameter
+from src.models.typed_image import TypedImage
+from src.utils.lut import IDENTITY, ChannelLUT, LUTInput
+
+
+# 结构元素大小的取值（与参数的范围和步长一致），setup时预先生成
+KERNEL_SIZES = range(3, 22, 2)
+
+
+def _rect_kernel(processor: ImageProcessor, kernel_size: int) -> np.ndarray:
+    """
+    获取处理器缓存的矩形结构元素
+    
+    Args:
+        processor: 处理器实例
+        kernel_size: 结构元素大小
+        
+    Returns:
+        矩形结构元素
+    """
+    return processor.artifact(
+        ("rect_kernel", kernel_size),
+        lambda: cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+    )
 
 
 class ErosionProcessor(ImageProcessor):
     """腐蚀处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size",)
+    
     @classmethod
     def name(cls) -> str:
         return "erosion"
@@ -42,17 +68,28 @@ class ErosionProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2 * validated_params["iterations"]
+    
+    def setup(self) -> None:
+        for kernel_size in KERNEL_SIZES:
+            _rect_kernel(self, kernel_size)
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         kernel_size = kwargs.get("kernel_size", 3)
         iterations = kwargs.get("iterations", 1)
         
-        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        kernel = _rect_kernel(self, kernel_size)
         return cv2.erode(src=image, kernel=kernel, iterations=iterations)
 
 
 class DilationProcessor(ImageProcessor):
     """膨胀处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size",)
+    
     @classmethod
     def name(cls) -> str:
         return "dilation"
@@ -85,17 +122,37 @@ class DilationProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        return validated_params["kernel_size"] // 2 * validated_params["iterations"]
+    
+    def setup(self) -> None:
+        for kernel_size in KERNEL_SIZES:
+            _rect_kernel(self, kernel_size)
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
         kernel_size = kwargs.get("kernel_size", 3)
         iterations = kwargs.get("iterations", 1)
         
-        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        kernel = _rect_kernel(self, kernel_size)
         return cv2.dilate(src=image, kernel=kernel, iterations=iterations)
 
 
 class MorphologyExProcessor(ImageProcessor):
     """形态学操作处理器"""
     
+    # 预览模式下随分辨率缩放的参数
+    SPATIAL_PARAMETERS = ("kernel_size",)
+    
+    # 操作类型映射
+    OPERATIONS = {
+        "open": cv2.MORPH_OPEN,
+        "close": cv2.MORPH_CLOSE,
+        "gradient": cv2.MORPH_GRADIENT,
+        "tophat": cv2.MORPH_TOPHAT,
+        "blackhat": cv2.MORPH_BLACKHAT
+    }
+    
     @classmethod
     def name(cls) -> str:
         return "morphology_ex"
@@ -123,6 +180,15 @@ class MorphologyExProcessor(ImageProcessor):
                 step=2,
                 default=5
             ),
+            ProcessorParameter(
+                name="iterations",
+                type="int",
+                description="迭代次数",
+                required=False,
+                min_value=1,
+                max_value=10,
+                default=1
+            ),
             ProcessorParameter(
                 name="convert_to_gray",
                 type="bool",
@@ -132,39 +198,52 @@ class MorphologyExProcessor(ImageProcessor):
             )
         ]
     
+    @classmethod
+    def halo(cls, validated_params: Dict[str, Any]) -> Optional[int]:
+        # 开、闭、顶帽、黑帽均为腐蚀与膨胀的组合，邻域半径叠加两次
+        return validated_params["kernel_size"] // 2 * validated_params["iterations"] * 2
+    
+    def setup(self) -> None:
+        for kernel_size in KERNEL_SIZES:
+            _rect_kernel(self, kernel_size)
+    
     def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
         operation_str = kwargs.get("operation", "open").lower()
         kernel_size = kwargs.get("kernel_size", 5)
+        iterations = kwargs.get("iterations", 1)
         convert_to_gray = kwargs.get("convert_to_gray", False)
         
-        # 定义操作类型映射
-        operation_map = {
-            "open": cv2.MORPH_OPEN,
-            "close": cv2.MORPH_CLOSE,
-            "gradient": cv2.MORPH_GRADIENT,
-            "tophat": cv2.MORPH_TOPHAT,
-            "blackhat": cv2.MORPH_BLACKHAT
-        }
-        
-        if operation_str not in operation_map:
+        if operation_str not in self.OPERATIONS:
             raise ValueError(f"不支持的操作: {operation_str}")
         
-        operation = operation_map[operation_str]
+        operation = self.OPERATIONS[operation_str]
         
-        # 创建结构元素
-        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        # 获取结构元素
+        kernel = _rect_kernel(self, kernel_size)
         
-        # 如果需要转换为灰度图
-        if convert_to_gray and len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-            return cv2.morphologyEx(src=image_gray, op=operation, kernel=kernel)
-        else:
-            return cv2.morphologyEx(src=image, op=operation, kernel=kernel)
+        # 如果需要转换为灰度图，使用灰度视图
+        source = image.gray if convert_to_gray else image.data
+        return cv2.morphologyEx(src=source, op=operation, kernel=kernel, iterations=iterations)
 
 
 class ThresholdProcessor(ImageProcessor):
     """阈值处理器"""
     
+    # 逐像素的阈值映射，即灰度视图上的查找表；cv2.threshold 比查表快得多，执行计划不组合阈值步骤
+    LUT_VIEW = "GRAY"
+    
+    # 阈值类型映射
+    THRESHOLD_TYPES = {
+        "binary": cv2.THRESH_BINARY,
+        "binary_inv": cv2.THRESH_BINARY_INV,
+        "trunc": cv2.THRESH_TRUNC,
+        "tozero": cv2.THRESH_TOZERO,
+        "tozero_inv": cv2.THRESH_TOZERO_INV
+    }
+    
     @classmethod
     def name(cls) -> str:
         return "threshold"
@@ -203,30 +282,33 @@ class ThresholdProcessor(ImageProcessor):
             )
         ]
     
-    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+    def _threshold_args(self, **kwargs) -> Tuple[int, int, int]:
+        """解析阈值、最大值与 OpenCV 阈值类型"""
         threshold = kwargs.get("threshold", 128)
         max_value = kwargs.get("max_value", 255)
         threshold_type_str = kwargs.get("threshold_type", "binary").lower()
         
-        # 定义阈值类型映射
-        threshold_type_map = {
-            "binary": cv2.THRESH_BINARY,
-            "binary_inv": cv2.THRESH_BINARY_INV,
-            "trunc": cv2.THRESH_TRUNC,
-            "tozero": cv2.THRESH_TOZERO,
-            "tozero_inv": cv2.THRESH_TOZERO_INV
-        }
-        
-        if threshold_type_str not in threshold_type_map:
+        if threshold_type_str not in self.THRESHOLD_TYPES:
             raise ValueError(f"不支持的阈值类型: {threshold_type_str}")
         
-        threshold_type = threshold_type_map[threshold_type_str]
+        return threshold, max_value, self.THRESHOLD_TYPES[threshold_type_str]
+    
+    def lookup_table(self, source: LUTInput, **kwargs) -> ChannelLUT:
+        # 对0~255逐个取阈值即得到查找表
+        threshold, max_value, threshold_type = self._threshold_args(**kwargs)
+        
+        def build() -> ChannelLUT:
+            _, table = cv2.threshold(src=IDENTITY, thresh=threshold, maxval=max_value, type=threshold_type)
+            return ChannelLUT(table)
+        
+        return self.artifact(("lut", threshold, max_value, threshold_type), build)
+    
+    def process(self, image: np.ndarray, **kwargs) -> np.ndarray:
+        return self.process_typed(TypedImage(image), **kwargs)
+    
+    def process_typed(self, image: TypedImage, **kwargs) -> np.ndarray:
+        threshold, max_value, threshold_type = self._threshold_args(**kwargs)
         
-        # 如果是彩色图像，转换为灰度图
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_gray = cv2.cvtColor(src=image, code=cv2.COLOR_BGR2GRAY)
-            _, thresh = cv2.threshold(src=image_gray, thresh=threshold, maxval=max_value, type=threshold_type)
-            return thresh
-        else:
-            _, thresh = cv2.threshold(src=image, thresh=threshold, maxval=max_value, type=threshold_type)
-            return thresh 
\ No newline at end of file
+        # 彩色图像使用灰度视图；单独执行时 cv2.threshold 比查表更快
+        _, thresh = cv2.threshold(src=image.gray, thresh=threshold, maxval=max_value, type=threshold_type)
+        return thresh 
\ No newline at end of file
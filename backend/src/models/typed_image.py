@@ -0,0 +1,168 @@
+"""
+带色彩空间信息的图像容器，在处理器链中传递并缓存各色彩空间的派生视图
+"""
+from typing import Callable, Dict, Optional, Tuple, Union
+import cv2
+import numpy as np
+
+
+# 由 BGR 派生各色彩空间视图的转换码，GRAY 主数据先派生 BGR 视图再转换
+_FROM_BGR = {
+    "GRAY": cv2.COLOR_BGR2GRAY,
+    "HSV": cv2.COLOR_BGR2HSV,
+    "LAB": cv2.COLOR_BGR2LAB,
+    "YCrCb": cv2.COLOR_BGR2YCR_CB,
+}
+
+# 由各色彩空间转回 BGR 的转换码
+TO_BGR = {
+    "HSV": cv2.COLOR_HSV2BGR,
+    "LAB": cv2.COLOR_LAB2BGR,
+    "YCrCb": cv2.COLOR_YCR_CB2BGR,
+}
+
+# 可获取的视图
+VIEWS = ("BGR",) + tuple(_FROM_BGR)
+
+# 已知的视图可直接给出数组，或给出首次使用时调用的函数
+ViewSource = Union[np.ndarray, Callable[[], np.ndarray]]
+
+
+class TypedImage:
+    """
+    带色彩空间与数据类型信息的图像
+    
+    主数据 data 即处理器输出的数组，色彩空间由形状推断（单通道为 GRAY，三通道为 BGR）。
+    灰度、HSV、LAB、YCrCb 等派生视图首次使用时才转换并缓存，同一幅图像的每种转换最多做一次；
+    派生视图只是主数据的确定性函数，缓存不会改变处理结果。缓存的视图为只读，处理器不得原地修改。
+    
+    处理器也可以在输出时附带已知的视图（如绘制类处理器可以不经转换得到输出的灰度视图），
+    视图可以是数组，也可以是首次使用时才调用的函数，但必须与由主数据转换的结果逐位相同。
+    """
+    
+    __slots__ = ("data", "color_space", "_views")
+    
+    def __init__(self, data: np.ndarray, views: Optional[Dict[str, ViewSource]] = None):
+        """
+        包装图像数组
+        
+        Args:
+            data: 图像数组
+            views: 已知的派生视图，键为 VIEWS 中的名称
+        """
+        self.data = data
+        self.color_space = self._infer_color_space(data)
+        self._views: Dict[str, ViewSource] = dict(views) if views else {}
+    
+    @classmethod
+    def wrap(cls, image: Union[np.ndarray, "TypedImage"]) -> "TypedImage":
+        """
+        将数组包装为 TypedImage，已经是 TypedImage 时原样返回
+        
+        Args:
+            image: 图像数组或 TypedImage
+            
+        Returns:
+            TypedImage
+        """
+        return image if isinstance(image, TypedImage) else cls(image)
+    
+    @staticmethod
+    def _infer_color_space(data: np.ndarray) -> Optional[str]:
+        """按形状推断色彩空间，无法识别时为None"""
+        if data.ndim == 2:
+            return "GRAY"
+        if data.ndim == 3 and data.shape[2] == 3:
+            return "BGR"
+        return None
+    
+    @property
+    def dtype(self) -> np.dtype:
+        """主数据的数据类型"""
+        return self.data.dtype
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """主数据的形状"""
+        return self.data.shape
+    
+    def view(self, space: str) -> np.ndarray:
+        """
+        获取指定色彩空间的视图，首次使用时转换并缓存
+        
+        Args:
+            space: 视图名称，VIEWS 之一
+            
+        Returns:
+            视图数组，与主数据色彩空间相同时为主数据本身，否则为只读数组
+            
+        Raises:
+            ValueError: 视图名称不支持，或主数据不是单通道或三通道图像
+        """
+        if space == self.color_space:
+            return self.data
+        if space not in VIEWS:
+            raise ValueError(f"不支持的色彩空间: {space}")
+        if self.color_space is None:
+            raise ValueError(f"无法将形状为 {self.data.shape} 的图像转换为 {space}")
+        
+        view = self._views.get(space)
+        if isinstance(view, np.ndarray):
+            return view
+        if view is not None:
+            view = view()
+        elif space == "BGR":
+            view = cv2.cvtColor(self.data, cv2.COLOR_GRAY2BGR)
+        else:
+            view = cv2.cvtColor(self.view("BGR"), _FROM_BGR[space])
+        
+        # 并发读取时可能重复转换，结果相同，后写入的覆盖先写入的即可
+        view.flags.writeable = False
+        self._views[space] = view
+        return view
+    
+    @property
+    def bgr(self) -> np.ndarray:
+        """BGR 视图"""
+        return self.view("BGR")
+    
+    @property
+    def gray(self) -> np.ndarray:
+        """灰度视图"""
+        return self.view("GRAY")
+    
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV 视图"""
+        return self.view("HSV")
+    
+    @property
+    def lab(self) -> np.ndarray:
+        """LAB 视图"""
+        return self.view("LAB")
+    
+    @property
+    def ycrcb(self) -> np.ndarray:
+        """YCrCb 视图"""
+        return self.view("YCrCb")
+    
+    def crop(self, x0: int, y0: int, x1: int, y1: int) -> "TypedImage":
+        """
+        裁剪图像，已缓存的视图一并裁剪，不拷贝数据
+        
+        Args:
+            x0: 左边界
+            y0: 上边界
+            x1: 右边界（不含）
+            y1: 下边界（不含）
+            
+        Returns:
+            裁剪后的 TypedImage
+        """
+        views: Dict[str, ViewSource] = {}
+        for space, view in self._views.items():
+            if callable(view):
+                views[space] = lambda view=view: view()[y0:y1, x0:x1]
+            else:
+                views[space] = view[y0:y1, x0:x1]
+        return TypedImage(self.data[y0:y1, x0:x1], views)
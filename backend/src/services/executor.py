@@ -0,0 +1,301 @@
+"""
+图像处理执行器，将CPU密集的处理任务移出asyncio事件循环
+"""
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple
+import numpy as np
+from src import config
+from src.services.metrics import get_metrics
+from src.services.prefix_cache import init_prefix_cache
+from src.services.result_cache import init_result_cache
+from src.services.shared_memory_pool import MIN_SHARED_BYTES, SharedResult, call_shared, get_shared_memory_pool
+from src.utils.timing import StageTimings, collect_timings
+
+
+class ExecutorBusyError(Exception):
+    """执行器已满，拒绝新的任务"""
+    pass
+
+
+def _init_worker_process(workers: int) -> None:
+    """
+    工作进程初始化：导入处理器包以确保处理器注册，并为本进程创建结果缓存与前缀缓存
+    
+    每个工作进程各有一份缓存，各自只使用配置的内存上限的 1/workers，所有进程合计不超过配置值。
+    
+    Args:
+        workers: 工作进程数
+    """
+    import src.models.processors
+    init_result_cache(config.RESULT_CACHE_MAX_BYTES // workers)
+    init_prefix_cache(config.PREFIX_CACHE_MAX_BYTES // workers)
+
+
+def _call_in_process(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在工作进程中执行函数，memoryview 不能pickle，返回的字节视图在此转为bytes随结果传回
+    
+    Args:
+        func: 要执行的函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+    
+    Returns:
+        函数返回值
+    """
+    result = func(*args, **kwargs)
+    if isinstance(result, memoryview):
+        return result.tobytes()
+    return result
+
+
+class ProcessingExecutor:
+    """
+    有界的处理执行器
+    
+    同时最多运行 max_workers 个任务，另有 max_queue 个任务可以排队，
+    超出部分立即抛出 ExecutorBusyError，由调用方返回繁忙响应，实现背压。
+    进程后端下参数与返回值中的图像经共享内存传递，跨进程只传递图像描述。
+    """
+    
+    BACKENDS = ("thread", "process")
+    
+    def __init__(self, backend: str = "thread", max_workers: int = 4, max_queue: int = 32,
+                 shared_memory: bool = True):
+        """
+        初始化执行器
+        
+        Args:
+            backend: 执行后端，可选值：thread, process
+            max_workers: 工作线程/进程数
+            max_queue: 最大排队任务数
+            shared_memory: 进程后端下是否经共享内存传递图像，共享内存池关闭时不生效
+            
+        Raises:
+            ValueError: 后端或数量配置不合法
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的执行后端: {backend}")
+        if max_workers < 1:
+            raise ValueError("工作者数量必须大于等于 1")
+        if max_queue < 0:
+            raise ValueError("排队数量必须大于等于 0")
+        
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.shared_memory = shared_memory
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+    
+    @property
+    def pending(self) -> int:
+        """已提交但未完成的任务数（运行中与排队中）"""
+        return self._pending
+    
+    @property
+    def queue_depth(self) -> int:
+        """排队等待工作者的任务数"""
+        return max(self._pending - self.max_workers, 0)
+    
+    def _get_pool(self) -> Executor:
+        """惰性创建底层线程池或进程池，进程池损坏被丢弃后重新创建"""
+        with self._pool_lock:
+            if self._pool is None:
+                if self.backend == "process":
+                    # 使用spawn避免在多线程的服务进程中fork
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker_process,
+                        initargs=(self.max_workers,)
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="image-worker"
+                    )
+            return self._pool
+    
+    def _reset_pool(self, broken: Executor) -> None:
+        """
+        丢弃已损坏的进程池，下一个任务提交时重新创建
+        
+        工作进程异常退出（被OOM终止、OpenCV段错误等）后进程池不再可用，其中运行与排队的任务都以
+        BrokenProcessPool 失败；并发的多个任务只有第一个会替换进程池。
+        
+        Args:
+            broken: 已损坏的进程池
+        """
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            self._pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+    
+    def _acquire(self) -> None:
+        """占用一个任务名额，已满时抛出 ExecutorBusyError"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ExecutorBusyError("服务繁忙，请稍后重试")
+            self._pending += 1
+    
+    def _release(self) -> None:
+        """释放任务名额"""
+        with self._lock:
+            self._pending -= 1
+    
+    @property
+    def shares_memory(self) -> bool:
+        """是否经共享内存传递图像"""
+        return self.backend == "process" and self.shared_memory and get_shared_memory_pool().enabled
+    
+    def _share(self, value: Any, pinned: List[np.ndarray]) -> Any:
+        """
+        将参数中较大的图像换为共享内存描述，共享内存不足时仍随任务pickle传递
+        
+        Args:
+            value: 参数值
+            pinned: 共享内存中的图像，任务结束前保持引用，防止其所在的段被复用
+            
+        Returns:
+            替换后的参数值
+        """
+        if not isinstance(value, np.ndarray) or value.nbytes < MIN_SHARED_BYTES:
+            return value
+        try:
+            descriptor, shared = get_shared_memory_pool().share(value)
+        except OSError:
+            return value
+        pinned.append(shared)
+        return descriptor
+    
+    def _finish(self, future: Future, pinned: Optional[List[np.ndarray]] = None) -> None:
+        """任务结束：释放名额与输入图像，接管结果中的共享内存段，并将工作者内收集的阶段耗时汇入处理指标"""
+        self._release()
+        if pinned:
+            pinned.clear()
+        if not future.cancelled() and future.exception() is None:
+            result, timings, error = future.result()
+            # 即使调用方已不再等待，结果所在的段也在此接管，随结果释放回到共享内存池
+            if isinstance(result, SharedResult):
+                result.adopt(get_shared_memory_pool())
+            get_metrics().record(timings, failed=error is not None)
+    
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在工作池中执行函数并等待结果
+        
+        Args:
+            func: 要执行的函数，进程后端下必须可被pickle
+            *args: 位置参数
+            **kwargs: 关键字参数
+            
+        Returns:
+            函数返回值
+            
+        Raises:
+            ExecutorBusyError: 运行与排队的任务数已达上限
+        """
+        result, _ = await self.run_timed(func, *args, **kwargs)
+        return result
+    
+    async def run_timed(self, func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, StageTimings]:
+        """
+        在工作池中执行函数，同时返回各阶段的耗时
+        
+        Args:
+            func: 要执行的函数，进程后端下必须可被pickle
+            *args: 位置参数
+            **kwargs: 关键字参数
+            
+        Returns:
+            (函数返回值, 阶段记录)，阶段记录中含排队耗时
+            
+        Raises:
+            ExecutorBusyError: 运行与排队的任务数已达上限
+            BrokenProcessPool: 工作进程在执行本任务期间异常退出，进程池已重建
+        """
+        self._acquire()
+        submitted = time.perf_counter()
+        pinned: List[np.ndarray] = []
+        try:
+            if self.backend == "process":
+                func, args = _call_in_process, (func,) + args
+            if self.shares_memory:
+                args = tuple(self._share(value, pinned) for value in args)
+                kwargs = {key: self._share(value, pinned) for key, value in kwargs.items()}
+                func, args = call_shared, (func,) + args
+            # 各阶段耗时在工作者内收集，随结果传回后汇入处理指标
+            task = functools.partial(collect_timings, func, *args, **kwargs)
+            pool = self._get_pool()
+            try:
+                future = pool.submit(task)
+            except BrokenProcessPool:
+                # 此前的任务使工作进程异常退出，换新的进程池重新提交
+                self._reset_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(task)
+        except BaseException:
+            pinned.clear()
+            self._release()
+            raise
+        
+        # 名额在任务真正结束时释放、指标在此时记录，客户端断开导致的取消不会让计数提前归还或遗漏
+        future.add_done_callback(functools.partial(self._finish, pinned=pinned))
+        try:
+            result, timings, error = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # 输入图像的共享内存段已由 _finish 释放；只有本任务失败，之后的任务在新的进程池中执行
+            self._reset_pool(pool)
+            raise
+        if error is not None:
+            raise error
+        if isinstance(result, SharedResult):
+            result = result.adopt(get_shared_memory_pool())
+        # 往返耗时减去工作者内的耗时即为排队与传输的耗时，不依赖跨进程可比的时钟
+        timings.queue = max(time.perf_counter() - submitted - timings.total, 0.0)
+        return result, timings
+    
+    def shutdown(self) -> None:
+        """关闭底层工作池"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: Optional[ProcessingExecutor] = None
+
+
+def get_executor() -> ProcessingExecutor:
+    """
+    获取全局处理执行器，首次调用时按配置创建
+    
+    Returns:
+        处理执行器
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessingExecutor(
+            backend=config.EXECUTOR_BACKEND,
+            max_workers=config.EXECUTOR_MAX_WORKERS,
+            max_queue=config.EXECUTOR_MAX_QUEUE
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """关闭全局处理执行器"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
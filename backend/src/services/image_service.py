@@ -1,13 +1,29 @@
 """
 图像处理服务
 """
-import cv2
-import numpy as np
-import os
 import base64
-from typing import Dict, Any, List, Optional, Union, Tuple
-import tempfile
+import json
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional, Union, Tuple, Callable
 from src.models.image_processor_manager import ImageProcessorManager
+from src.models.typed_image import TypedImage
+from src.services.pipeline_planner import ExecutionPlan, PipelinePlanner, PlanStep
+from src.services.prefix_cache import get_prefix_cache
+from src.services.result_cache import get_result_cache
+from src.services.upload_store import get_upload_store
+from src import config
+from src.utils.digest import chain_digest, data_digest, image_digest
+from src.utils.geometry import DEFAULT_GEOMETRY_FORMAT, GEOMETRY_FORMATS, encode_geometry, scale_geometry
+from src.utils.image_codec import (
+    DEFAULT_FORMAT,
+    decode_base64_image,
+    decode_image,
+    encode_image,
+    media_type
+)
+from src.utils.proxy import RENDER_MODES, make_proxy, proxy_factor
+from src.utils.timing import record_size, stage
 # 确保处理器被注册
 import src.models.processors
 
@@ -26,7 +42,9 @@ class ImageService:
         return ImageProcessorManager.list_processors()
     
     @staticmethod
-    def process_image(processor_name: str, image_data: str, params: Dict[str, Any] = None) -> str:
+    def process_image(processor_name: str, image_data: str, params: Dict[str, Any] = None,
+                      render_mode: str = "final",
+                      preview_max_size: Optional[int] = None) -> Union[str, Dict[str, Any]]:
         """
         处理图像
         
@@ -34,9 +52,11 @@ class ImageService:
             processor_name: 处理器名称
             image_data: Base64编码的图像数据
             params: 处理参数
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
             
         Returns:
-            Base64编码的处理后图像数据
+            Base64编码的处理后图像数据，处理器输出几何结果时为几何结果字典
             
         Raises:
             ValueError: 处理器不存在或处理失败
@@ -44,118 +64,775 @@ class ImageService:
         if params is None:
             params = {}
         
-        # 解码图像
-        try:
-            # 移除Base64前缀（如果有）
-            if "base64," in image_data:
-                image_data = image_data.split("base64,")[1]
+        plan = PipelinePlanner.compile([processor_name], [params])
+        return ImageService.process_planned_image(plan, image_data, DEFAULT_FORMAT, render_mode, preview_max_size)
+    
+    @staticmethod
+    def batch_process_image(processor_names: List[str], image_data: str, params_list: List[Dict[str, Any]] = None,
+                            render_mode: str = "final",
+                            preview_max_size: Optional[int] = None) -> Union[str, Dict[str, Any]]:
+        """
+        批量处理图像
+        
+        Args:
+            processor_names: 处理器名称列表
+            image_data: Base64编码的图像数据
+            params_list: 处理参数列表
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
+            
+        Returns:
+            Base64编码的处理后图像数据，链的最后一步输出几何结果时为几何结果字典
             
-            # 解码Base64
-            image_bytes = base64.b64decode(image_data)
+        Raises:
+            ValueError: 处理器不存在或处理失败
+        """
+        plan = ImageService.compile_chain(processor_names, params_list)
+        return ImageService.process_planned_image(plan, image_data, DEFAULT_FORMAT, render_mode, preview_max_size)
+    
+    @staticmethod
+    def process_image_bytes(processor_name: str, image_bytes: bytes, params: Dict[str, Any] = None,
+                            image_format: str = DEFAULT_FORMAT, render_mode: str = "final",
+                            preview_max_size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        处理二进制图像
+        
+        Args:
+            processor_name: 处理器名称
+            image_bytes: 编码后的图像字节
+            params: 处理参数
+            image_format: 输出格式，链的最后一步输出几何结果时为几何结果格式（图像格式按 json 处理）
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
             
-            # 创建临时文件保存图像
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                temp_file.write(image_bytes)
-                temp_file_path = temp_file.name
+        Returns:
+            编码后的处理结果字节
             
-            # 读取图像
-            image = cv2.imread(temp_file_path)
+        Raises:
+            ValueError: 处理器不存在或处理失败
+        """
+        if params is None:
+            params = {}
+        
+        return ImageService._process_cached(
+            image_bytes, ImageService._decode_image_bytes, [processor_name], [params], image_format,
+            render_mode, preview_max_size
+        )
+    
+    @staticmethod
+    def batch_process_image_bytes(processor_names: List[str], image_bytes: bytes,
+                                  params_list: List[Dict[str, Any]] = None,
+                                  image_format: str = DEFAULT_FORMAT, render_mode: str = "final",
+                                  preview_max_size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        批量处理二进制图像
+        
+        Args:
+            processor_names: 处理器名称列表
+            image_bytes: 编码后的图像字节
+            params_list: 处理参数列表
+            image_format: 输出格式，链的最后一步输出几何结果时为几何结果格式（图像格式按 json 处理）
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
             
-            # 删除临时文件
-            os.unlink(temp_file_path)
+        Returns:
+            编码后的处理结果字节
             
-            if image is None:
-                raise ValueError("无法解码图像数据")
-        except Exception as e:
-            raise ValueError(f"图像数据解析失败: {str(e)}")
+        Raises:
+            ValueError: 处理器不存在或处理失败
+        """
+        params_list = ImageService._normalize_params_list(processor_names, params_list)
         
-        # 处理图像
-        processed_image = ImageProcessorManager.process_image(processor_name, image, **params)
+        return ImageService._process_cached(
+            image_bytes, ImageService._decode_image_bytes, processor_names, params_list, image_format,
+            render_mode, preview_max_size
+        )
+    
+    @staticmethod
+    def process_encoded(processor_names: List[str], image_data: Union[str, bytes],
+                        params_list: List[Dict[str, Any]] = None, image_format: str = DEFAULT_FORMAT,
+                        render_mode: str = "final", preview_max_size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        批量处理Base64或二进制图像，返回编码后的结果字节，供异步任务使用
         
-        # 编码处理后的图像
-        try:
-            # 创建临时文件保存处理后的图像
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                cv2.imwrite(temp_file.name, processed_image)
-                temp_file_path = temp_file.name
+        Args:
+            processor_names: 处理器名称列表
+            image_data: Base64编码的图像数据或编码后的图像字节
+            params_list: 处理参数列表
+            image_format: 输出格式，链的最后一步输出几何结果时为几何结果格式（图像格式按 json 处理）
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
             
-            # 读取处理后的图像并进行Base64编码
-            with open(temp_file_path, "rb") as image_file:
-                encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
+        Returns:
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 处理器不存在或处理失败
+        """
+        params_list = ImageService._normalize_params_list(processor_names, params_list)
+        decoder = ImageService._decode_image if isinstance(image_data, str) else ImageService._decode_image_bytes
+        
+        return ImageService._process_cached(
+            image_data, decoder, processor_names, params_list, image_format, render_mode, preview_max_size
+        )
+    
+    @staticmethod
+    def load_image_bytes(image_bytes: bytes) -> Tuple[np.ndarray, str]:
+        """
+        解码二进制图像并计算其摘要，供预览会话等需要多次处理同一图像的场景只解码一次
+        
+        Args:
+            image_bytes: 编码后的图像字节
             
-            # 删除临时文件
-            os.unlink(temp_file_path)
+        Returns:
+            (解码后的图像, 图像摘要)
             
-            return encoded_image
-        except Exception as e:
-            raise ValueError(f"图像编码失败: {str(e)}")
+        Raises:
+            ValueError: 图像数据解析失败
+        """
+        record_size("input", len(image_bytes))
+        image = ImageService._decode_image_bytes(image_bytes)
+        image_key = image_digest(image)
+        # 会话内的图像会被多次读取，设为只读防止被意外修改
+        image.flags.writeable = False
+        return image, image_key
     
     @staticmethod
-    def batch_process_image(processor_names: List[str], image_data: str, params_list: List[Dict[str, Any]] = None) -> str:
+    def load_image(image_data: str) -> Tuple[np.ndarray, str]:
         """
-        批量处理图像
+        解码Base64图像数据并计算其摘要
         
         Args:
-            processor_names: 处理器名称列表
             image_data: Base64编码的图像数据
+            
+        Returns:
+            (解码后的图像, 图像摘要)
+            
+        Raises:
+            ValueError: 图像数据解析失败
+        """
+        record_size("input", len(image_data))
+        image = ImageService._decode_image(image_data)
+        image_key = image_digest(image)
+        image.flags.writeable = False
+        return image, image_key
+    
+    @staticmethod
+    def batch_process_decoded(image: np.ndarray, image_key: str, processor_names: List[str],
+                              params_list: List[Dict[str, Any]] = None,
+                              image_format: str = DEFAULT_FORMAT, render_mode: str = "final",
+                              preview_max_size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        批量处理已解码的图像，同样经过结果缓存与前缀缓存
+        
+        Args:
+            image: 解码后的图像
+            image_key: 图像摘要，由 load_image/load_image_bytes 返回
+            processor_names: 处理器名称列表
             params_list: 处理参数列表
+            image_format: 输出格式，链的最后一步输出几何结果时为几何结果格式（图像格式按 json 处理）
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
             
         Returns:
-            Base64编码的处理后图像数据
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 处理器不存在、参数验证失败或图像编码失败
+        """
+        plan = ImageService.compile_chain(processor_names, params_list)
+        return ImageService._process_decoded_plan(plan, image, image_key, image_format, render_mode, preview_max_size)
+    
+    @staticmethod
+    def batch_process_uploaded(image: np.ndarray, image_key: str, processor_names: List[str],
+                               params_list: List[Dict[str, Any]] = None, render_mode: str = "final",
+                               preview_max_size: Optional[int] = None) -> Union[str, Dict[str, Any]]:
+        """
+        批量处理已上传的图像，无需传输与解码
+        
+        Args:
+            image: 上传存储中的解码后图像
+            image_key: 图像ID（解码后图像的摘要）
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
+            
+        Returns:
+            Base64编码的处理后图像数据，链的最后一步输出几何结果时为几何结果字典
             
         Raises:
             ValueError: 处理器不存在或处理失败
         """
+        plan = ImageService.compile_chain(processor_names, params_list)
+        processed_bytes = ImageService._process_decoded_plan(
+            plan, image, image_key, DEFAULT_FORMAT, render_mode, preview_max_size
+        )
+        return ImageService._payload(plan, processed_bytes)
+    
+    @staticmethod
+    def _process_decoded_plan(plan: ExecutionPlan, image: np.ndarray, image_key: str, image_format: str,
+                              render_mode: str, preview_max_size: Optional[int]) -> Union[bytes, memoryview]:
+        """
+        按已编译的计划处理已解码的图像，经过结果缓存与前缀缓存
+        
+        Args:
+            plan: 执行计划
+            image: 解码后的图像
+            image_key: 图像摘要
+            image_format: 请求的输出格式
+            render_mode: 渲染模式
+            preview_max_size: 预览尺寸
+            
+        Returns:
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 渲染模式或输出格式不合法、图像编码失败
+        """
+        image_format = ImageService.resolve_output_format(plan, image_format)
+        preview_size = ImageService._preview_size(render_mode, preview_max_size)
+        processed_bytes = ImageService._render_cached(
+            plan, image_key, image.shape, image, lambda: image, image_format, preview_size
+        )
+        record_size("output", len(processed_bytes))
+        return processed_bytes
+    
+    @staticmethod
+    def _normalize_params_list(processor_names: List[str],
+                               params_list: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        补全并校验参数列表
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            
+        Returns:
+            与处理器一一对应的参数列表
+            
+        Raises:
+            ValueError: 长度不匹配
+        """
         if params_list is None:
             params_list = [{}] * len(processor_names)
         
         if len(processor_names) != len(params_list):
             raise ValueError("处理器名称列表与参数列表长度不匹配")
         
-        # 解码图像
-        try:
-            # 移除Base64前缀（如果有）
-            if "base64," in image_data:
-                image_data = image_data.split("base64,")[1]
-            
-            # 解码Base64
-            image_bytes = base64.b64decode(image_data)
-            
-            # 创建临时文件保存图像
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                temp_file.write(image_bytes)
-                temp_file_path = temp_file.name
-            
-            # 读取图像
-            image = cv2.imread(temp_file_path)
-            
-            # 删除临时文件
-            os.unlink(temp_file_path)
-            
-            if image is None:
-                raise ValueError("无法解码图像数据")
-        except Exception as e:
-            raise ValueError(f"图像数据解析失败: {str(e)}")
-        
-        # 依次处理图像
-        processed_image = image.copy()
-        for processor_name, params in zip(processor_names, params_list):
-            processed_image = ImageProcessorManager.process_image(processor_name, processed_image, **params)
-        
-        # 编码处理后的图像
-        try:
-            # 创建临时文件保存处理后的图像
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                cv2.imwrite(temp_file.name, processed_image)
-                temp_file_path = temp_file.name
-            
-            # 读取处理后的图像并进行Base64编码
-            with open(temp_file_path, "rb") as image_file:
-                encoded_image = base64.b64encode(image_file.read()).decode("utf-8")
-            
-            # 删除临时文件
-            os.unlink(temp_file_path)
-            
-            return encoded_image
-        except Exception as e:
-            raise ValueError(f"图像编码失败: {str(e)}") 
\ No newline at end of file
+        return params_list
+    
+    @staticmethod
+    def compile_chain(processor_names: List[str], params_list: List[Dict[str, Any]] = None) -> ExecutionPlan:
+        """
+        验证参数并编译处理器链，编译结果可用于处理多张图像
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            
+        Returns:
+            执行计划
+            
+        Raises:
+            ValueError: 处理器不存在或参数验证失败
+        """
+        params_list = ImageService._normalize_params_list(processor_names, params_list)
+        return PipelinePlanner.compile(processor_names, params_list)
+    
+    @staticmethod
+    def resolve_output_format(plan: ExecutionPlan, image_format: str) -> str:
+        """
+        确定处理结果的输出格式：输出几何结果的链使用几何结果格式，请求的是图像格式时按 json 输出
+        
+        Args:
+            plan: 执行计划
+            image_format: 请求的输出格式
+            
+        Returns:
+            小写的输出格式
+            
+        Raises:
+            ValueError: 格式不支持，或为输出图像的链请求了几何结果格式
+        """
+        image_format = image_format.lower()
+        if plan.returns_geometry:
+            return image_format if image_format in GEOMETRY_FORMATS else DEFAULT_GEOMETRY_FORMAT
+        if image_format in GEOMETRY_FORMATS:
+            raise ValueError(f"输出格式 {image_format} 只适用于输出几何结果的处理器链")
+        media_type(image_format)
+        return image_format
+    
+    @staticmethod
+    def output_format(processor_names: List[str], params_list: List[Dict[str, Any]] = None,
+                      image_format: str = DEFAULT_FORMAT) -> str:
+        """
+        编译处理器链并确定输出格式，供二进制接口设置响应的媒体类型
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            image_format: 请求的输出格式
+            
+        Returns:
+            小写的输出格式
+            
+        Raises:
+            ValueError: 处理器不存在、参数验证失败或格式不支持
+        """
+        plan = ImageService.compile_chain(processor_names, params_list)
+        return ImageService.resolve_output_format(plan, image_format)
+    
+    @staticmethod
+    def process_planned_image(plan: ExecutionPlan, image_data: str, image_format: str = DEFAULT_FORMAT,
+                              render_mode: str = "final",
+                              preview_max_size: Optional[int] = None) -> Union[str, Dict[str, Any]]:
+        """
+        按已编译的处理器链处理一张图像，多图批量处理时链只需验证和编译一次
+        
+        Args:
+            plan: 由 compile_chain 返回的执行计划
+            image_data: Base64编码的图像数据
+            image_format: 输出格式
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
+            
+        Returns:
+            Base64编码的处理后图像数据；链的最后一步输出几何结果时，json 格式为几何结果字典，npz 格式为Base64编码的npz数据
+            
+        Raises:
+            ValueError: 渲染模式不合法或图像编解码失败
+        """
+        preview_size = ImageService._preview_size(render_mode, preview_max_size)
+        processed_bytes = ImageService._process_plan(
+            plan, image_data, ImageService._decode_image, image_format, preview_size
+        )
+        if ImageService.resolve_output_format(plan, image_format) == "json":
+            return ImageService._payload(plan, processed_bytes)
+        return ImageService._encode_base64(processed_bytes)
+    
+    @staticmethod
+    def explain_batch(processor_names: List[str], params_list: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        编译处理器链并返回优化后的执行计划，不处理图像
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            
+        Returns:
+            执行计划
+            
+        Raises:
+            ValueError: 处理器不存在或参数验证失败
+        """
+        return ImageService.compile_chain(processor_names, params_list).explain()
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """
+        获取处理结果缓存、前缀缓存与上传图像存储的统计信息
+        
+        进程执行后端下结果缓存与前缀缓存在各工作进程中，服务进程无法读取其计数，
+        只返回每个工作进程的内存上限，per_worker 为True。
+        
+        Returns:
+            统计信息字典
+        """
+        stats = {
+            "backend": config.EXECUTOR_BACKEND,
+            "per_worker": config.EXECUTOR_BACKEND == "process",
+            "uploads": get_upload_store().stats(),
+        }
+        if not stats["per_worker"]:
+            stats["results"] = get_result_cache().stats()
+            stats["prefixes"] = get_prefix_cache().stats()
+            return stats
+        
+        workers = config.EXECUTOR_MAX_WORKERS
+        stats["workers"] = workers
+        for name, max_bytes in (("results", config.RESULT_CACHE_MAX_BYTES), ("prefixes", config.PREFIX_CACHE_MAX_BYTES)):
+            stats[name] = {"enabled": max_bytes // workers > 0, "max_bytes": max_bytes // workers}
+        return stats
+    
+    @staticmethod
+    def _process_cached(image_data: Union[str, bytes], decoder: Callable[[Any], np.ndarray],
+                        processor_names: List[str], params_list: List[Dict[str, Any]],
+                        image_format: str, render_mode: str = "final",
+                        preview_max_size: Optional[int] = None) -> Union[bytes, memoryview]:
+        """
+        编译处理器链，查询结果缓存，未命中时从最长的已缓存前缀继续执行并编码，再写入缓存
+        
+        缓存键由解码后图像的摘要、编译后的处理器链（含已验证参数）和输出格式组成。
+        编码后输入数据的摘要与图像摘要、形状的对应关系也会被记录，重复请求命中结果缓存或前缀缓存时无需解码。
+        
+        Args:
+            image_data: 编码后的图像数据（Base64字符串或二进制字节）
+            decoder: 图像数据的解码函数
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            image_format: 输出格式，链的最后一步输出几何结果时为几何结果格式（图像格式按 json 处理）
+            render_mode: 渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）
+            preview_max_size: 预览模式下代理图像长边的最大像素数，默认取配置值
+            
+        Returns:
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 处理器不存在、参数验证失败或图像编解码失败
+        """
+        plan = PipelinePlanner.compile(processor_names, params_list)
+        preview_size = ImageService._preview_size(render_mode, preview_max_size)
+        return ImageService._process_plan(plan, image_data, decoder, image_format, preview_size)
+    
+    @staticmethod
+    def _process_plan(plan: ExecutionPlan, image_data: Union[str, bytes], decoder: Callable[[Any], np.ndarray],
+                      image_format: str, preview_size: Optional[int]) -> Union[bytes, memoryview]:
+        """
+        按已编译的计划处理编码后的图像数据，经过结果缓存与前缀缓存
+        
+        Args:
+            plan: 执行计划
+            image_data: 编码后的图像数据（Base64字符串或二进制字节）
+            decoder: 图像数据的解码函数
+            image_format: 输出格式
+            preview_size: 代理图像长边的最大像素数，全分辨率渲染时为None
+            
+        Returns:
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 图像编解码失败或输出格式不支持
+        """
+        image_format = ImageService.resolve_output_format(plan, image_format)
+        record_size("input", len(image_data))
+        cache = get_result_cache()
+        if not cache.enabled and not get_prefix_cache().enabled:
+            image = decoder(image_data)
+            factor = 1.0
+            if preview_size is not None:
+                factor = proxy_factor(image.shape, preview_size)
+                if factor < 1.0:
+                    plan = PipelinePlanner.scale(plan, factor)
+                    with stage("proxy"):
+                        image = make_proxy(image, factor)
+            processed_bytes = ImageService._encode_result(PipelinePlanner.execute(plan, image), image_format, factor)
+            record_size("output", len(processed_bytes))
+            return processed_bytes
+        
+        source_key = data_digest(image_data)
+        alias = cache.resolve_alias(source_key)
+        image = None
+        if alias is None:
+            # 不同的编码数据可能解码出相同的图像，缓存统一按解码后图像的摘要查询
+            image = decoder(image_data)
+            image_key, shape = image_digest(image), image.shape
+            cache.add_alias(source_key, image_key, shape)
+        else:
+            image_key, shape = alias
+        
+        processed_bytes = ImageService._render_cached(
+            plan, image_key, shape, image, lambda: decoder(image_data), image_format, preview_size
+        )
+        record_size("output", len(processed_bytes))
+        return processed_bytes
+    
+    @staticmethod
+    def _render_cached(plan: ExecutionPlan, image_key: str, shape: Tuple[int, ...], image: Optional[np.ndarray],
+                       load_image: Callable[[], np.ndarray], image_format: str,
+                       preview_size: Optional[int]) -> Union[bytes, memoryview]:
+        """
+        查询结果缓存，未命中时从最长的已缓存前缀继续执行计划并编码，再写入缓存
+        
+        预览模式下在代理图像上执行按比例换算后的计划，代理图像以"图像摘要@预览尺寸"为键，
+        与全分辨率的结果和前缀分开缓存，代理图像本身也作为长度为0的前缀缓存，调整第一步时无需重新解码原图。
+        几何结果在代理图像上检测后换算回原图坐标。
+        
+        Args:
+            plan: 执行计划
+            image_key: 解码后图像的摘要
+            shape: 解码后图像的形状
+            image: 解码后的图像，尚未解码时为None
+            load_image: 解码图像的函数
+            image_format: 已确定的输出格式
+            preview_size: 代理图像长边的最大像素数，全分辨率渲染时为None
+            
+        Returns:
+            编码后的处理结果字节
+        """
+        factor = 1.0
+        if preview_size is not None:
+            factor = proxy_factor(shape, preview_size)
+            if factor < 1.0:
+                plan = PipelinePlanner.scale(plan, factor)
+                image_key = f"{image_key}@{preview_size}"
+                load_image = ImageService._proxy_loader(image_key, image, load_image, factor)
+                image = None
+        
+        cache = get_result_cache()
+        result_key = f"{image_key}:{ImageService._chain_key(plan, image_format)}"
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached
+        
+        processed_image = ImageService._execute_from_prefix(plan, image_key, image, load_image)
+        processed_bytes = ImageService._encode_result(processed_image, image_format, factor)
+        cache.put(result_key, processed_bytes)
+        return processed_bytes
+    
+    @staticmethod
+    def _proxy_loader(proxy_key: str, image: Optional[np.ndarray], load_image: Callable[[], np.ndarray],
+                      factor: float) -> Callable[[], np.ndarray]:
+        """
+        构造获取代理图像的函数，优先从前缀缓存读取，未命中时缩小原图并写入前缀缓存
+        
+        Args:
+            proxy_key: 代理图像的键
+            image: 解码后的原图，尚未解码时为None
+            load_image: 解码原图的函数
+            factor: 缩放比例
+            
+        Returns:
+            获取代理图像的函数
+        """
+        def load_proxy() -> np.ndarray:
+            prefix_cache = get_prefix_cache()
+            cached = prefix_cache.get(proxy_key) if prefix_cache.enabled else None
+            if cached is not None:
+                return cached[0]
+            
+            source = image if image is not None else load_image()
+            began = time.perf_counter()
+            with stage("proxy"):
+                proxy = make_proxy(source, factor)
+            if prefix_cache.enabled:
+                prefix_cache.put(proxy_key, proxy, time.perf_counter() - began)
+            return proxy
+        
+        return load_proxy
+    
+    @staticmethod
+    def _preview_size(render_mode: str, preview_max_size: Optional[int]) -> Optional[int]:
+        """
+        校验渲染模式并确定代理图像长边的最大像素数
+        
+        Args:
+            render_mode: 渲染模式
+            preview_max_size: 请求指定的预览尺寸
+            
+        Returns:
+            预览尺寸，全分辨率渲染时返回None
+            
+        Raises:
+            ValueError: 渲染模式或预览尺寸不合法
+        """
+        render_mode = (render_mode or "final").lower()
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"不支持的渲染模式: {render_mode}")
+        if render_mode == "final":
+            return None
+        
+        preview_size = preview_max_size or config.PREVIEW_MAX_SIZE
+        if preview_size < 1:
+            raise ValueError("预览尺寸必须大于等于 1")
+        return preview_size
+    
+    @staticmethod
+    def _execute_from_prefix(plan: ExecutionPlan, image_key: str, image: Optional[np.ndarray],
+                             load_image: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        从最长的已缓存前缀继续执行计划，并缓存新计算出的各前缀（不含完整的链）的中间结果
+        
+        前缀以原处理器链（改写前）的前k步为键：修改靠后的步骤可能改变前面步骤的改写方式（如与后一步融合），
+        但合并、融合与组合查找表的结果与逐步执行逐位相同，未修改的前缀仍可命中。前缀结束在计划中某个
+        融合步骤的中间时，该融合步骤剩余的原步骤逐步执行，之后继续执行计划。
+        
+        Args:
+            plan: 执行计划
+            image_key: 解码后图像的摘要
+            image: 解码后的图像，尚未解码时为None
+            load_image: 解码图像的函数，没有可用前缀且图像尚未解码时调用
+            
+        Returns:
+            处理后的图像
+        """
+        prefix_cache = get_prefix_cache()
+        prefix_keys = ImageService._prefix_keys(plan, image_key) if prefix_cache.enabled else []
+        
+        start = 0
+        cost = 0.0
+        cached = prefix_cache.lookup_longest(prefix_keys)
+        if cached is not None:
+            start, image, cost = cached
+        if start == 0 and image is None:
+            image = load_image()
+        
+        def run(step: PlanStep, result: TypedImage, length: int) -> TypedImage:
+            nonlocal cost
+            began = time.perf_counter()
+            result = PipelinePlanner.execute_step(step, result)
+            cost += time.perf_counter() - began
+            # length 为执行到原链第几步，完整的链只写入结果缓存
+            if length <= len(prefix_keys):
+                prefix_cache.put(prefix_keys[length - 1], result.data, cost)
+            return result
+        
+        result = TypedImage(image)
+        for step in plan.steps:
+            end = max(step.source_steps) + 1
+            if end <= start:
+                continue
+            if min(step.source_steps) < start:
+                # 前缀结束在融合步骤的中间，剩余的原步骤逐步执行
+                for length in range(start + 1, end + 1):
+                    result = run(plan.source_chain[length - 1], result, length)
+            else:
+                result = run(step, result, end)
+        return result.data if isinstance(result, TypedImage) else result
+    
+    @staticmethod
+    def _prefix_keys(plan: ExecutionPlan, image_key: str) -> List[str]:
+        """
+        原处理器链前k步（不含完整的链）输出的前缀缓存键
+        
+        在灰度图上直接绘制的步骤输出与原链不同（灰度而非BGR），以该步结束的前缀在键中单独标记。
+        
+        Args:
+            plan: 执行计划
+            image_key: 解码后图像的摘要
+            
+        Returns:
+            依次为原链前1、2、…、n-1步输出的缓存键
+        """
+        source_keys = ImageService._step_keys(plan.source_chain)
+        gray_ends = {max(step.source_steps) + 1 for step in plan.steps if step.params.get("keep_gray")}
+        return [
+            f"{image_key}:{chain_digest(source_keys[:length])}" + (":gray" if length in gray_ends else "")
+            for length in range(1, len(source_keys))
+        ]
+    
+    @staticmethod
+    def _chain_key(plan: ExecutionPlan, image_format: str) -> str:
+        """结果缓存键中与处理器链和输出格式相关的部分"""
+        return f"{chain_digest(ImageService._step_keys(plan.steps))}:{image_format.lower()}"
+    
+    @staticmethod
+    def _step_keys(steps: List[PlanStep]) -> List[Tuple[str, Dict[str, Any]]]:
+        """计划步骤中参与缓存键计算的部分"""
+        return [(step.processor_name, step.params) for step in steps]
+    
+    @staticmethod
+    def _decode_image(image_data: str) -> np.ndarray:
+        """
+        在内存中解码Base64图像数据
+        
+        Args:
+            image_data: Base64编码的图像数据
+            
+        Returns:
+            解码后的图像
+            
+        Raises:
+            ValueError: 图像数据解析失败
+        """
+        with stage("decode"):
+            try:
+                return decode_base64_image(image_data)
+            except Exception as e:
+                raise ValueError(f"图像数据解析失败: {str(e)}")
+    
+    @staticmethod
+    def _decode_image_bytes(image_bytes: bytes) -> np.ndarray:
+        """
+        在内存中解码二进制图像数据
+        
+        Args:
+            image_bytes: 编码后的图像字节
+            
+        Returns:
+            解码后的图像
+            
+        Raises:
+            ValueError: 图像数据解析失败
+        """
+        with stage("decode"):
+            try:
+                return decode_image(image_bytes)
+            except Exception as e:
+                raise ValueError(f"图像数据解析失败: {str(e)}")
+    
+    @staticmethod
+    def _encode_base64(processed_bytes: Union[bytes, memoryview]) -> str:
+        """
+        将编码后的结果字节转换为Base64字符串
+        
+        Args:
+            processed_bytes: 编码后的图像字节
+            
+        Returns:
+            Base64编码的图像数据
+        """
+        with stage("b64encode"):
+            return base64.b64encode(processed_bytes).decode("ascii")
+    
+    @staticmethod
+    def _payload(plan: ExecutionPlan, processed_bytes: Union[bytes, memoryview]) -> Union[str, Dict[str, Any]]:
+        """
+        JSON接口返回的处理结果：图像为Base64字符串，几何结果为 json 格式编码结果解析出的字典
+        
+        Args:
+            plan: 执行计划
+            processed_bytes: 编码后的处理结果字节
+            
+        Returns:
+            Base64编码的图像数据或几何结果字典
+        """
+        if plan.returns_geometry:
+            return json.loads(processed_bytes)
+        return ImageService._encode_base64(processed_bytes)
+    
+    @staticmethod
+    def _encode_result(result: Union[np.ndarray, Dict[str, np.ndarray]], output_format: str,
+                       factor: float = 1.0) -> Union[bytes, memoryview]:
+        """
+        编码处理结果，几何结果先按代理图像的缩放比例换算回原图坐标
+        
+        Args:
+            result: 处理后的图像或几何结果
+            output_format: 已确定的输出格式
+            factor: 代理图像相对原图的缩放比例，全分辨率渲染时为1
+            
+        Returns:
+            编码后的处理结果字节
+            
+        Raises:
+            ValueError: 编码失败
+        """
+        if not isinstance(result, dict):
+            return ImageService._encode_image_bytes(result, output_format)
+        
+        if factor < 1.0:
+            result = scale_geometry(result, 1.0 / factor)
+        with stage("encode"):
+            return encode_geometry(result, output_format)
+    
+    @staticmethod
+    def _encode_image_bytes(image: np.ndarray, image_format: str = DEFAULT_FORMAT) -> memoryview:
+        """
+        在内存中将图像编码为指定格式的字节
+        
+        Args:
+            image: 处理后的图像
+            image_format: 输出格式
+            
+        Returns:
+            编码后图像的字节视图，直接引用 imencode 返回的缓冲区，不再拷贝为bytes
+            
+        Raises:
+            ValueError: 图像编码失败
+        """
+        with stage("encode"):
+            try:
+                return memoryview(encode_image(image, image_format)).cast("B")
+            except Exception as e:
+                raise ValueError(f"图像编码失败: {str(e)}")
@@ -0,0 +1,267 @@
+"""
+异步任务管理器，在独立的工作池中按提交顺序执行持久化的处理任务
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from src import config
+from src.services.executor import ProcessingExecutor
+from src.services.image_service import ImageService
+from src.services.job_store import TERMINAL_STATUSES, JobStore
+
+
+# 清理过期任务的间隔（秒）
+PURGE_INTERVAL = 60
+
+
+class JobQueueFullError(Exception):
+    """排队中的任务数已达上限"""
+    pass
+
+
+class JobManager:
+    """
+    异步任务管理器
+    
+    任务提交后写入存储并立即返回任务ID，后台的调度协程按提交顺序取出任务，
+    同时最多执行 max_workers 个，任务在独立的工作池中执行，不占用同步接口的工作者与排队名额。
+    状态与结果保存在存储中，服务重启后执行中的任务重新排队。
+    """
+    
+    def __init__(self, store: JobStore, executor: ProcessingExecutor, max_pending: int = 1000,
+                 result_ttl: int = 86400):
+        """
+        初始化任务管理器
+        
+        Args:
+            store: 任务存储
+            executor: 执行任务的工作池，同时执行的任务数等于其工作者数
+            max_pending: 排队中与执行中的任务数上限
+            result_ttl: 结束的任务及其结果的保留时间（秒），0表示永久保留
+        """
+        self.store = store
+        self.executor = executor
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._slots = asyncio.Semaphore(executor.max_workers)
+        self._wake = asyncio.Event()
+        self._changed = asyncio.Condition()
+        self._version = 0
+        self._task: Optional[asyncio.Task] = None
+        self._purge_task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+    
+    async def start(self) -> None:
+        """恢复上次退出时被中断的任务并启动调度协程与定期清理协程"""
+        await asyncio.to_thread(self.store.requeue_running)
+        self._task = asyncio.create_task(self._dispatch())
+        if self.result_ttl > 0:
+            self._purge_task = asyncio.create_task(self._purge_periodically())
+    
+    async def submit(self, processor_names: List[str], params_list: Optional[List[Dict[str, Any]]],
+                     image_data: Union[str, bytes], output_format: str, render_mode: str = "final",
+                     preview_max_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        提交任务，处理器链应已由调用方验证
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            image_data: 编码后的输入图像，Base64字符串或二进制字节
+            output_format: 输出格式
+            render_mode: 渲染模式
+            preview_max_size: 预览尺寸
+        
+        Returns:
+            任务状态
+        
+        Raises:
+            JobQueueFullError: 排队中的任务数已达上限
+        """
+        if await asyncio.to_thread(self.store.count_pending) >= self.max_pending:
+            raise JobQueueFullError("排队中的任务过多，请稍后重试")
+        
+        spec = {
+            "processor_names": processor_names,
+            "params_list": params_list,
+            "output_format": output_format.lower(),
+            "render_mode": render_mode,
+            "preview_max_size": preview_max_size,
+        }
+        job = await asyncio.to_thread(self.store.create, uuid.uuid4().hex, spec, image_data)
+        self._wake.set()
+        return job
+    
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务状态
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            任务状态，任务不存在时返回None
+        """
+        return await asyncio.to_thread(self.store.get, job_id)
+    
+    async def result(self, job_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        读取成功任务的结果
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            (编码后的结果图像, 输出格式)，任务不存在或尚未成功时返回None
+        """
+        return await asyncio.to_thread(self.store.get_result, job_id)
+    
+    async def delete(self, job_id: str) -> bool:
+        """
+        删除任务及其结果
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            是否删除
+        
+        Raises:
+            ValueError: 任务正在执行
+        """
+        deleted = await asyncio.to_thread(self.store.delete, job_id)
+        if deleted:
+            await self._notify()
+        return deleted
+    
+    async def watch(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        跟踪任务状态，每次变化时产出一次，任务结束或被删除后停止
+        
+        Args:
+            job_id: 任务ID
+        
+        Yields:
+            任务状态
+        """
+        last = None
+        while True:
+            version = self._version
+            job = await self.status(job_id)
+            if job is None:
+                return
+            if job != last:
+                yield job
+                last = job
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._version != version)
+    
+    async def _notify(self) -> None:
+        """通知跟踪者任务状态有变化"""
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+    
+    async def _dispatch(self) -> None:
+        """调度协程：有空闲名额时取出最早的排队中任务执行，没有任务时等待提交"""
+        while True:
+            await self._slots.acquire()
+            # 先清除唤醒标记再查询，查询之后提交的任务一定会再次唤醒
+            self._wake.clear()
+            job_id = await asyncio.to_thread(self.store.claim_next)
+            if job_id is None:
+                self._slots.release()
+                await self._wake.wait()
+                continue
+            
+            await self._notify()
+            self._running[job_id] = asyncio.create_task(self._run(job_id))
+    
+    async def _run(self, job_id: str) -> None:
+        """执行一个任务并保存结果或失败原因"""
+        try:
+            loaded = await asyncio.to_thread(self.store.load_input, job_id)
+            if loaded is None:
+                return
+            spec, image_data = loaded
+            result, timings = await self.executor.run_timed(
+                ImageService.process_encoded,
+                processor_names=spec["processor_names"],
+                image_data=image_data,
+                params_list=spec["params_list"],
+                image_format=spec["output_format"],
+                render_mode=spec["render_mode"],
+                preview_max_size=spec["preview_max_size"]
+            )
+            await asyncio.to_thread(self.store.finish, job_id, result, timings.as_dict())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.fail, job_id, str(e))
+        finally:
+            self._running.pop(job_id, None)
+            self._slots.release()
+            await self._notify()
+    
+    async def _purge_periodically(self) -> None:
+        """清理协程：独立于调度，每隔 PURGE_INTERVAL 秒删除超过保留时间的已结束任务，持续有任务时同样生效"""
+        while True:
+            await asyncio.sleep(PURGE_INTERVAL)
+            try:
+                await self._purge()
+            except Exception:
+                # 存储暂时不可用（如数据库被锁）时等下一轮再清理，不让清理协程退出
+                pass
+    
+    async def _purge(self) -> None:
+        """删除超过保留时间的已结束任务"""
+        if self.result_ttl > 0:
+            await asyncio.to_thread(self.store.purge, time.time() - self.result_ttl)
+    
+    def shutdown(self) -> None:
+        """停止调度并关闭工作池与存储，执行中的任务在下次启动时重新排队"""
+        for task in (self._task, self._purge_task):
+            if task is not None:
+                task.cancel()
+        self._task = self._purge_task = None
+        for task in self._running.values():
+            task.cancel()
+        self._running.clear()
+        self.executor.shutdown()
+        self.store.close()
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """
+    获取全局任务管理器，首次调用时按配置创建；需在事件循环中调用 start() 后才会执行任务
+    
+    Returns:
+        任务管理器
+    """
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            store=JobStore(config.JOB_DB_PATH),
+            executor=ProcessingExecutor(
+                backend=config.EXECUTOR_BACKEND,
+                max_workers=config.JOB_WORKERS,
+                max_queue=0
+            ),
+            max_pending=config.JOB_MAX_PENDING,
+            result_ttl=config.JOB_RESULT_TTL
+        )
+    return _job_manager
+
+
+def shutdown_job_manager() -> None:
+    """关闭全局任务管理器"""
+    global _job_manager
+    if _job_manager is not None:
+        _job_manager.shutdown()
+        _job_manager = None
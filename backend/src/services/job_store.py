@@ -0,0 +1,274 @@
+"""
+异步任务存储，基于SQLite持久化任务的参数、输入、状态与结果，服务重启后未完成的任务会重新执行
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+# 任务状态：排队中、执行中、成功、失败
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+# 不会再变化的状态
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    input BLOB,
+    input_encoding TEXT NOT NULL,
+    result BLOB,
+    error TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# 查询任务状态时读取的列，不含输入与结果
+_STATUS_COLUMNS = "id, status, spec, error, timings, created_at, started_at, finished_at"
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """将Unix时间戳转换为ISO 8601字符串"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class JobStore:
+    """
+    异步任务存储
+    
+    所有方法都是同步的并由一把锁串行化，调用方应在线程中调用（如 asyncio.to_thread），避免大块的输入与结果读写阻塞事件循环。
+    输入图像在任务结束后即被清除，只保留结果。
+    """
+    
+    def __init__(self, path: str):
+        """
+        打开（或创建）任务数据库
+        
+        Args:
+            path: SQLite数据库文件路径，":memory:" 表示只保存在内存中
+        """
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            # WAL模式下读不阻塞写，synchronous=NORMAL 在WAL模式下仍能保证崩溃后数据库一致
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+    
+    def create(self, job_id: str, spec: Dict[str, Any], image_data: Union[str, bytes]) -> Dict[str, Any]:
+        """
+        创建排队中的任务
+        
+        Args:
+            job_id: 任务ID
+            spec: 处理参数（处理器链、输出格式、渲染模式等）
+            image_data: 编码后的输入图像，Base64字符串或二进制字节
+        
+        Returns:
+            任务状态
+        """
+        if isinstance(image_data, str):
+            image_input, encoding = image_data.encode("ascii"), "base64"
+        else:
+            image_input, encoding = bytes(image_data), "binary"
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, spec, input, input_encoding, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(spec, ensure_ascii=False), image_input, encoding, time.time())
+            )
+        return self.get(job_id)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务状态
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            任务状态，任务不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_STATUS_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._status(row) if row is not None else None
+    
+    def count_pending(self) -> int:
+        """排队中与执行中的任务数"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+    
+    def claim_next(self) -> Optional[str]:
+        """
+        取出最早提交的排队中任务并标记为执行中
+        
+        Returns:
+            任务ID，没有排队中的任务时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"])
+            )
+            return row["id"]
+    
+    def load_input(self, job_id: str) -> Optional[Tuple[Dict[str, Any], Union[str, bytes]]]:
+        """
+        读取任务的处理参数与输入图像
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            (处理参数, 输入图像)，Base64输入返回字符串，二进制输入返回字节；任务不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT spec, input, input_encoding FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row["input"] is None:
+            return None
+        image_data = row["input"].decode("ascii") if row["input_encoding"] == "base64" else row["input"]
+        return json.loads(row["spec"]), image_data
+    
+    def finish(self, job_id: str, result: Union[bytes, memoryview], timings: Optional[Dict[str, Any]] = None) -> None:
+        """
+        记录任务成功并保存结果，同时清除输入图像
+        
+        Args:
+            job_id: 任务ID
+            result: 编码后的结果图像
+            timings: 各阶段耗时
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, timings = ?, input = NULL, finished_at = ? "
+                "WHERE id = ?",
+                (result, json.dumps(timings) if timings is not None else None, time.time(), job_id)
+            )
+    
+    def fail(self, job_id: str, error: str) -> None:
+        """
+        记录任务失败，同时清除输入图像
+        
+        Args:
+            job_id: 任务ID
+            error: 失败原因
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, input = NULL, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+    
+    def get_result(self, job_id: str) -> Optional[Tuple[bytes, str]]:
+        """
+        读取成功任务的结果
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            (编码后的结果图像, 输出格式)，任务不存在或尚未成功时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT spec, result FROM jobs WHERE id = ? AND status = 'succeeded'", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row["result"], json.loads(row["spec"])["output_format"]
+    
+    def delete(self, job_id: str) -> bool:
+        """
+        删除任务，执行中的任务不能删除
+        
+        Args:
+            job_id: 任务ID
+        
+        Returns:
+            是否删除
+        
+        Raises:
+            ValueError: 任务正在执行
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            if row["status"] == "running":
+                raise ValueError("任务正在执行，无法删除")
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            return True
+    
+    def requeue_running(self) -> int:
+        """
+        将执行中的任务重新标记为排队中，服务启动时调用，恢复上次退出时被中断的任务
+        
+        Returns:
+            重新排队的任务数
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+    
+    def purge(self, finished_before: float) -> int:
+        """
+        删除在指定时间之前结束的任务及其结果
+        
+        Args:
+            finished_before: Unix时间戳
+        
+        Returns:
+            删除的任务数
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (finished_before,)
+            ).rowcount
+    
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    @staticmethod
+    def _status(row: sqlite3.Row) -> Dict[str, Any]:
+        """将数据库行转换为任务状态"""
+        spec = json.loads(row["spec"])
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "processor_names": spec["processor_names"],
+            "output_format": spec["output_format"],
+            "error": row["error"],
+            "timings": json.loads(row["timings"]) if row["timings"] else None,
+            "created_at": _isoformat(row["created_at"]),
+            "started_at": _isoformat(row["started_at"]),
+            "finished_at": _isoformat(row["finished_at"]),
+        }
@@ -0,0 +1,189 @@
+"""
+处理指标，按Prometheus文本格式导出各处理器与各阶段的耗时分布、调用与错误计数、输入输出字节数
+"""
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from src.utils.timing import StageTimings
+
+
+# 耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 字节数直方图的桶上界，从1KB到256MB按4倍递增
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(10))
+
+# 标签值，按标签名的顺序排列
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """格式化标签，如 {processor="median_filter"}，没有标签时返回空字符串"""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值，整数不带小数点"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """单调递增的计数器，调用方负责加锁"""
+    
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Labels, float] = defaultdict(float)
+    
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        """计数器增加 amount"""
+        self._values[labels] += amount
+    
+    def render(self) -> List[str]:
+        """导出为Prometheus文本格式的若干行"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """固定桶的直方图，每个样本只更新一个桶，导出时再累加，调用方负责加锁"""
+    
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        # 标签 -> [各桶计数..., 超过最大桶的计数]、样本和
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = defaultdict(float)
+    
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        """记录一个样本"""
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+    
+    def render(self) -> List[str]:
+        """导出为Prometheus文本格式的若干行，桶计数为累计值"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        bucket_labels = self.label_names + ("le",)
+        for labels, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, labels + (le,))} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(self._sums[labels])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class ProcessingMetrics:
+    """
+    处理指标
+    
+    各阶段耗时在工作线程/进程内由 src.utils.timing 记录，任务结束后在服务进程中通过 record() 一次性汇入，
+    每个任务只加一次锁，热路径上的开销只有几次 perf_counter 调用。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tasks = Counter("image_tasks_total", "图像处理任务数", ("status",))
+        self.task_duration = Histogram(
+            "image_task_duration_seconds", "图像处理任务在工作池中的总耗时", LATENCY_BUCKETS
+        )
+        self.stage_duration = Histogram(
+            "image_stage_duration_seconds", "每个任务在各阶段（b64decode, decode, validate, proxy, process, encode, b64encode）的耗时",
+            LATENCY_BUCKETS, ("stage",)
+        )
+        self.processor_duration = Histogram(
+            "image_processor_duration_seconds", "各处理器单次执行的耗时", LATENCY_BUCKETS, ("processor",)
+        )
+        self.processor_calls = Counter("image_processor_calls_total", "各处理器的执行次数", ("processor",))
+        self.processor_errors = Counter(
+            "image_processor_errors_total", "各处理器参数验证或执行失败的次数", ("processor", "stage")
+        )
+        self.input_bytes = Histogram("image_input_bytes", "编码后输入图像的字节数", SIZE_BUCKETS)
+        self.output_bytes = Histogram("image_output_bytes", "编码后输出图像的字节数", SIZE_BUCKETS)
+    
+    def record(self, timings: StageTimings, failed: bool = False) -> None:
+        """
+        汇入一个任务的阶段记录
+        
+        Args:
+            timings: 任务的阶段记录
+            failed: 任务是否失败
+        """
+        stage_totals: Dict[str, float] = defaultdict(float)
+        for stage_name, _, seconds, _ in timings.stages:
+            stage_totals[stage_name] += seconds
+        
+        with self._lock:
+            self.tasks.inc(("error" if failed else "ok",))
+            self.task_duration.observe(timings.total)
+            for stage_name, seconds in stage_totals.items():
+                self.stage_duration.observe(seconds, (stage_name,))
+            for stage_name, processor_name, seconds, stage_failed in timings.stages:
+                if processor_name is None:
+                    continue
+                if stage_failed:
+                    self.processor_errors.inc((processor_name, stage_name))
+                if stage_name == "process":
+                    self.processor_calls.inc((processor_name,))
+                    self.processor_duration.observe(seconds, (processor_name,))
+            if "input" in timings.sizes:
+                self.input_bytes.observe(timings.sizes["input"])
+            if "output" in timings.sizes:
+                self.output_bytes.observe(timings.sizes["output"])
+    
+    def render(self, gauges: Optional[Iterable[Tuple[str, str, float]]] = None) -> str:
+        """
+        导出全部指标
+        
+        Args:
+            gauges: 导出时采样的瞬时值，(指标名, 说明, 值)
+        
+        Returns:
+            Prometheus文本格式
+        """
+        with self._lock:
+            lines = []
+            for metric in (
+                self.tasks, self.task_duration, self.stage_duration, self.processor_duration,
+                self.processor_calls, self.processor_errors, self.input_bytes, self.output_bytes
+            ):
+                lines.extend(metric.render())
+        
+        for name, help_text, value in gauges or ():
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+_metrics: Optional[ProcessingMetrics] = None
+
+
+def get_metrics() -> ProcessingMetrics:
+    """
+    获取全局处理指标
+    
+    Returns:
+        处理指标
+    """
+    global _metrics
+    if _metrics is None:
+        _metrics = ProcessingMetrics()
+    return _metrics
@@ -0,0 +1,354 @@
+"""
+处理器链规划器，将处理器链编译为优化后的执行计划
+"""
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
+from pydantic import BaseModel, Field
+from src.models.image_processor_manager import ImageProcessorManager
+from src.models.typed_image import TypedImage
+from src.services.tiled_executor import get_tiled_executor
+from src.utils.timing import stage
+
+
+# 需要灰度输入的处理器，彩色输入时会先自行转换为灰度图
+GRAY_CONSUMERS = {
+    "sobel_filter",
+    "canny_edge",
+    "threshold",
+    "contour_detection",
+    "hough_lines",
+    "hough_circles",
+}
+
+# 在输入图像上绘制结果的处理器，灰度输入时默认会转换为BGR后再绘制
+DRAWING_PROCESSORS = {
+    "contour_detection",
+    "hough_lines",
+    "hough_circles",
+}
+
+# 连续的逐像素步骤融合后的步骤名称，由查找表执行，不是注册的处理器
+LOOKUP_TABLE_STEP = "lookup_table"
+
+# 融合为查找表的最少连续步骤数，单独一步直接执行处理器即可
+MIN_LOOKUP_TABLE_STEPS = 2
+
+# 组合为查找表的视图。HSV、YCrCb 等视图查表后要转回 BGR，逐步执行时两步之间的色彩空间往返有损，
+# 组合后不能逐位相同；GRAY 视图上只有 threshold，cv2.threshold 比 cv2.LUT 快一个数量级，组合反而更慢
+FUSIBLE_LUT_VIEWS = ("BGR",)
+
+
+class PlanStep(BaseModel):
+    """执行计划中的一步"""
+    processor_name: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    source_steps: List[int] = Field(default_factory=list, description="对应原处理器链中的步骤序号")
+    note: Optional[str] = None
+
+
+class ExecutionPlan(BaseModel):
+    """执行计划"""
+    steps: List[PlanStep]
+    optimizations: List[str] = Field(default_factory=list)
+    source_chain: List[PlanStep] = Field(default_factory=list, description="改写前的原处理器链（已验证参数）")
+    
+    @property
+    def returns_geometry(self) -> bool:
+        """最后一步是否输出几何结果而非图像"""
+        if not self.steps:
+            return False
+        last = self.steps[-1]
+        if last.processor_name == LOOKUP_TABLE_STEP:
+            return False
+        return ImageProcessorManager.get_processor(last.processor_name).returns_geometry(last.params)
+    
+    def explain(self) -> Dict[str, Any]:
+        """
+        导出可读的执行计划
+        
+        Returns:
+            执行计划字典
+        """
+        return self.dict(exclude={"source_chain"})
+
+
+class PipelinePlanner:
+    """处理器链规划器"""
+    
+    @classmethod
+    def compile(cls, processor_names: List[str], params_list: List[Dict[str, Any]]) -> ExecutionPlan:
+        """
+        编译处理器链：先验证全部参数，再依次应用改写规则
+        
+        Args:
+            processor_names: 处理器名称列表
+            params_list: 处理参数列表
+            
+        Returns:
+            执行计划
+            
+        Raises:
+            ValueError: 处理器不存在或参数验证失败
+        """
+        steps = []
+        for index, (processor_name, params) in enumerate(zip(processor_names, params_list)):
+            processor_class = ImageProcessorManager.get_processor(processor_name)
+            if not processor_class:
+                raise ValueError(f"处理器不存在: {processor_name}")
+            with stage("validate", processor_name):
+                validated_params = processor_class.validate_parameters(**params)
+            steps.append(PlanStep(
+                processor_name=processor_name,
+                params=validated_params,
+                source_steps=[index]
+            ))
+        
+        # 几何结果不是图像，无法作为下一步的输入
+        for step in steps[:-1]:
+            processor_class = ImageProcessorManager.get_processor(step.processor_name)
+            if processor_class.returns_geometry(step.params):
+                raise ValueError(f"只有处理器链的最后一步可以输出几何结果: 第{cls._describe(step)}步 {step.processor_name}")
+        
+        # 处理器都不会修改输入图像，解码得到的图像可直接作为链的输入
+        # 改写规则会原地修改步骤参数，原处理器链单独保留一份
+        plan = ExecutionPlan(
+            steps=steps,
+            optimizations=["跳过输入图像的整幅拷贝"],
+            source_chain=[step.copy(deep=True) for step in steps]
+        )
+        
+        cls._fold_repeated_morphology(plan)
+        cls._fuse_open_close(plan)
+        cls._keep_gray_drawing(plan)
+        cls._fuse_lookup_tables(plan)
+        
+        return plan
+    
+    @staticmethod
+    def scale(plan: ExecutionPlan, factor: float) -> ExecutionPlan:
+        """
+        按图像缩放比例换算计划中各步骤的空间参数，用于在缩小的代理图像上预览
+        
+        Args:
+            plan: 执行计划
+            factor: 代理图像相对原图的缩放比例
+            
+        Returns:
+            换算后的新执行计划，原计划不变
+        """
+        def scale_step(step: PlanStep) -> PlanStep:
+            # 查找表步骤都是逐像素处理，没有空间参数
+            if step.processor_name == LOOKUP_TABLE_STEP:
+                return step.copy(deep=True)
+            processor_class = ImageProcessorManager.get_processor(step.processor_name)
+            return step.copy(update={"params": processor_class.scale_parameters(step.params, factor)})
+        
+        return ExecutionPlan(
+            steps=[scale_step(step) for step in plan.steps],
+            optimizations=plan.optimizations + [f"预览模式：在缩放比例为 {factor:.4g} 的代理图像上执行，空间参数按比例换算"],
+            source_chain=[scale_step(step) for step in plan.source_chain]
+        )
+    
+    @staticmethod
+    def execute(plan: ExecutionPlan, image: np.ndarray) -> Union[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        执行计划
+        
+        Args:
+            plan: 执行计划
+            image: 输入图像
+            
+        Returns:
+            处理后的图像，最后一步输出几何结果时为几何结果
+        """
+        # 各步骤之间传递 TypedImage，每种色彩空间转换在整条链中最多做一次
+        result: Union[TypedImage, Dict[str, np.ndarray]] = TypedImage(image)
+        for step in plan.steps:
+            result = PipelinePlanner.execute_step(step, result)
+        return result.data if isinstance(result, TypedImage) else result
+    
+    @staticmethod
+    def execute_step(step: PlanStep, image: TypedImage) -> Union[TypedImage, Dict[str, np.ndarray]]:
+        """
+        执行计划中的一步，大图上的局部滤波分块并行执行，输出几何结果的步骤只检测不绘制
+        
+        Args:
+            step: 计划步骤
+            image: 输入图像
+            
+        Returns:
+            处理后的图像，或几何结果
+        """
+        tiled_executor = get_tiled_executor()
+        with stage("process", step.processor_name):
+            if step.processor_name == LOOKUP_TABLE_STEP:
+                sub_steps = [(sub["processor_name"], sub["params"]) for sub in step.params["steps"]]
+                return ImageProcessorManager.execute_lookup_tables(sub_steps, image)
+            processor_class = ImageProcessorManager.get_processor(step.processor_name)
+            if processor_class.returns_geometry(step.params):
+                return ImageProcessorManager.detect_typed(step.processor_name, image, step.params)
+            if tiled_executor.should_tile(step.processor_name, step.params, image.data):
+                return TypedImage(tiled_executor.run(step.processor_name, step.params, image.data))
+            return ImageProcessorManager.execute_typed(step.processor_name, image, step.params)
+    
+    @staticmethod
+    def _describe(step: PlanStep) -> str:
+        """步骤的可读描述，序号从1开始"""
+        return "、".join(str(index + 1) for index in step.source_steps)
+    
+    @staticmethod
+    def _has_roi(step: PlanStep) -> bool:
+        """
+        步骤是否只处理 ROI：ROI 外保留原像素，与相邻步骤合并后的结果不同，不参与合并与融合
+        
+        Args:
+            step: 计划步骤
+            
+        Returns:
+            指定了 ROI 时返回True
+        """
+        return "roi" in step.params
+    
+    @classmethod
+    def _fold_repeated_morphology(cls, plan: ExecutionPlan) -> None:
+        """
+        合并相邻且结构元素相同的腐蚀（或膨胀）：连续k次与迭代k次结果相同
+        
+        Args:
+            plan: 执行计划，原地修改
+        """
+        folded: List[PlanStep] = []
+        for step in plan.steps:
+            previous = folded[-1] if folded else None
+            if (
+                previous is not None
+                and not cls._has_roi(previous)
+                and not cls._has_roi(step)
+                and step.processor_name in ("erosion", "dilation")
+                and previous.processor_name == step.processor_name
+                and previous.params["kernel_size"] == step.params["kernel_size"]
+            ):
+                previous.params["iterations"] += step.params["iterations"]
+                previous.source_steps.extend(step.source_steps)
+                previous.note = f"合并为 iterations={previous.params['iterations']}"
+                plan.optimizations.append(
+                    f"第{cls._describe(previous)}步的{step.processor_name}合并为一次迭代调用"
+                )
+                continue
+            folded.append(step)
+        plan.steps = folded
+    
+    @classmethod
+    def _fuse_open_close(cls, plan: ExecutionPlan) -> None:
+        """
+        将结构元素和迭代次数相同的腐蚀+膨胀融合为开运算，膨胀+腐蚀融合为闭运算
+        
+        Args:
+            plan: 执行计划，原地修改
+        """
+        operations = {
+            ("erosion", "dilation"): "open",
+            ("dilation", "erosion"): "close",
+        }
+        fused: List[PlanStep] = []
+        for step in plan.steps:
+            previous = fused[-1] if fused else None
+            operation = operations.get((previous.processor_name, step.processor_name)) if previous else None
+            if (
+                operation is not None
+                and not cls._has_roi(previous)
+                and not cls._has_roi(step)
+                and previous.params["kernel_size"] == step.params["kernel_size"]
+                and previous.params["iterations"] == step.params["iterations"]
+            ):
+                fused[-1] = PlanStep(
+                    processor_name="morphology_ex",
+                    params={
+                        "operation": operation,
+                        "kernel_size": step.params["kernel_size"],
+                        "iterations": step.params["iterations"],
+                        "convert_to_gray": False,
+                    },
+                    source_steps=previous.source_steps + step.source_steps,
+                    note=f"{previous.processor_name}+{step.processor_name} 融合为 morphologyEx({operation})"
+                )
+                plan.optimizations.append(
+                    f"第{cls._describe(fused[-1])}步融合为一次 morphologyEx({operation}) 调用"
+                )
+                continue
+            fused.append(step)
+        plan.steps = fused
+    
+    @classmethod
+    def _keep_gray_drawing(cls, plan: ExecutionPlan) -> None:
+        """
+        绘制类处理器使用灰度颜色且下一步只需要灰度图时，直接在灰度图上绘制，
+        省去GRAY2BGR以及下一步的BGR2GRAY两次转换（灰度颜色的BGR图转灰度结果逐位相同）
+        
+        Args:
+            plan: 执行计划，原地修改
+        """
+        for step, next_step in zip(plan.steps, plan.steps[1:]):
+            if step.processor_name not in DRAWING_PROCESSORS or next_step.processor_name not in GRAY_CONSUMERS:
+                continue
+            # 下一步只处理 ROI 时，ROI 外保留本步的输出，本步仍须输出BGR
+            if cls._has_roi(step) or cls._has_roi(next_step):
+                continue
+            if not cls._is_gray_color(step.params.get("color")):
+                continue
+            step.params["keep_gray"] = True
+            step.note = "灰度输入时直接在灰度图上绘制"
+            plan.optimizations.append(
+                f"第{cls._describe(step)}步与下一步之间省去灰度与BGR之间的往返转换"
+            )
+    
+    @classmethod
+    def _fuse_lookup_tables(cls, plan: ExecutionPlan) -> None:
+        """
+        将连续的逐像素步骤（在 BGR 视图上查表、未指定 ROI）融合为一次查表：
+        各步骤的查找表组合为一张表，整条链只遍历一次图像
+        
+        Args:
+            plan: 执行计划，原地修改
+        """
+        fused: List[PlanStep] = []
+        run: List[PlanStep] = []
+        
+        def flush() -> None:
+            if len(run) < MIN_LOOKUP_TABLE_STEPS:
+                fused.extend(run)
+            else:
+                step = PlanStep(
+                    processor_name=LOOKUP_TABLE_STEP,
+                    params={"steps": [{"processor_name": sub.processor_name, "params": sub.params} for sub in run]},
+                    source_steps=[index for sub in run for index in sub.source_steps],
+                    note="+".join(sub.processor_name for sub in run) + " 组合为一张查找表"
+                )
+                fused.append(step)
+                plan.optimizations.append(f"第{cls._describe(step)}步组合为一张查找表，只遍历一次图像")
+            run.clear()
+        
+        run_view: Optional[str] = None
+        for step in plan.steps:
+            processor_class = ImageProcessorManager.get_processor(step.processor_name)
+            view = processor_class.LUT_VIEW if processor_class is not None and not cls._has_roi(step) else None
+            if view not in FUSIBLE_LUT_VIEWS:
+                view = None
+            if view != run_view:
+                flush()
+                run_view = view
+            if view is None:
+                fused.append(step)
+            else:
+                run.append(step)
+        flush()
+        plan.steps = fused
+    
+    @staticmethod
+    def _is_gray_color(color: Optional[str]) -> bool:
+        """判断'R,G,B'颜色是否为灰度色"""
+        try:
+            r, g, b = map(int, color.split(","))
+        except (ValueError, AttributeError):
+            return False
+        return r == g == b
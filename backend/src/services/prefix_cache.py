@@ -0,0 +1,175 @@
+"""
+处理器链前缀缓存，缓存链中各前缀的中间结果，调整后续步骤时从最长的已缓存前缀继续执行
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src import config
+
+
+class PrefixCache:
+    """
+    处理器链前缀缓存
+    
+    键由解码后图像的摘要和原处理器链的前k步（改写前的步骤与参数）组成，值为执行计划中
+    在原链第k步结束处的输出图像。
+    淘汰采用GreedyDual-Size策略：每个条目的优先级为 L + 重算耗时 / 字节数，
+    淘汰优先级最低的条目并将全局基准L提高到该优先级，命中时按当前L刷新优先级。
+    重算代价高而占用小的前缀保留得更久，久未使用的条目随L的增长逐渐被淘汰。
+    
+    缓存的数组会被设为只读，处理器不得原地修改输入图像。
+    """
+    
+    def __init__(self, max_bytes: int):
+        """
+        初始化缓存
+        
+        Args:
+            max_bytes: 缓存数组的总字节数上限，0表示关闭缓存
+        """
+        self.max_bytes = max(max_bytes, 0)
+        # 键 -> (数组, 重算耗时（秒）, 优先级)
+        self._entries: Dict[str, Tuple[np.ndarray, float, float]] = {}
+        self._size = 0
+        self._inflation = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """缓存是否开启"""
+        return self.max_bytes > 0
+    
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        查询缓存，命中时刷新条目的优先级
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            (只读的中间结果, 重算耗时)，未命中时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            image, cost, _ = entry
+            self._entries[key] = (image, cost, self._priority(image, cost))
+            self._hits += 1
+            return image, cost
+    
+    def lookup_longest(self, keys: List[str]) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        按从长到短的顺序查询一组前缀，返回最长的已缓存前缀，整次查询只计一次命中或未命中
+        
+        Args:
+            keys: 依次为前1、2、…、k步的前缀键
+            
+        Returns:
+            (前缀的步骤数, 只读的中间结果, 重算耗时)，没有已缓存的前缀时返回None
+        """
+        if not keys:
+            return None
+        with self._lock:
+            for length in range(len(keys), 0, -1):
+                key = keys[length - 1]
+                entry = self._entries.get(key)
+                if entry is not None:
+                    image, cost, _ = entry
+                    self._entries[key] = (image, cost, self._priority(image, cost))
+                    self._hits += 1
+                    return length, image, cost
+            self._misses += 1
+            return None
+    
+    def put(self, key: str, image: np.ndarray, cost: float) -> None:
+        """
+        写入缓存，并按优先级淘汰条目直到总字节数不超过上限
+        
+        Args:
+            key: 缓存键
+            image: 中间结果，写入后被设为只读
+            cost: 从原图计算出该中间结果的耗时（秒）
+        """
+        if image.nbytes > self.max_bytes:
+            return
+        image.flags.writeable = False
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[0].nbytes
+            self._entries[key] = (image, cost, self._priority(image, cost))
+            self._size += image.nbytes
+            while self._size > self.max_bytes:
+                victim = min(self._entries, key=lambda entry_key: self._entries[entry_key][2])
+                evicted, _, priority = self._entries.pop(victim)
+                self._size -= evicted.nbytes
+                self._inflation = priority
+                self._evictions += 1
+    
+    def clear(self) -> None:
+        """清空缓存，统计计数保留"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._inflation = 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+    
+    def _priority(self, image: np.ndarray, cost: float) -> float:
+        """GreedyDual-Size优先级：当前基准加上每字节的重算耗时（按每MB秒数计）"""
+        return self._inflation + cost * 1e6 / max(image.nbytes, 1)
+
+
+_prefix_cache: Optional[PrefixCache] = None
+
+
+def get_prefix_cache() -> PrefixCache:
+    """
+    获取全局前缀缓存，首次调用时按配置创建；使用进程执行后端时每个工作进程各有一份，由 init_prefix_cache 创建
+    
+    Returns:
+        前缀缓存
+    """
+    global _prefix_cache
+    if _prefix_cache is None:
+        _prefix_cache = PrefixCache(max_bytes=config.PREFIX_CACHE_MAX_BYTES)
+    return _prefix_cache
+
+
+def init_prefix_cache(max_bytes: int) -> PrefixCache:
+    """
+    按指定的内存上限创建全局前缀缓存，替换已有的缓存
+    
+    Args:
+        max_bytes: 内存上限（字节），0表示关闭缓存
+        
+    Returns:
+        新的前缀缓存
+    """
+    global _prefix_cache
+    _prefix_cache = PrefixCache(max_bytes=max_bytes)
+    return _prefix_cache
@@ -0,0 +1,124 @@
+"""
+交互式预览会话，客户端只上传一次图像，之后只发送参数更新；同一会话内只处理最新的待处理更新
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+from pydantic import BaseModel, Field
+from src.services.executor import get_executor
+from src.services.image_service import ImageService
+from src.utils.image_codec import DEFAULT_FORMAT, media_type
+
+
+class PreviewUpdate(BaseModel):
+    """预览参数更新"""
+    seq: int = Field(default=0, description="客户端序号，随预览结果原样返回")
+    processor_names: List[str] = Field(..., description="处理器名称列表")
+    params_list: List[Dict[str, Any]] = Field(default=None, description="处理参数列表")
+    output_format: str = Field(default=DEFAULT_FORMAT, description="输出格式，可选值：jpg, png, webp, bmp")
+    render_mode: str = Field(default="final", description="渲染模式，可选值：final（全分辨率）, preview（缩小的代理图像）")
+    preview_max_size: Optional[int] = Field(default=None, ge=1, description="预览模式下代理图像长边的最大像素数")
+
+
+class PreviewSession:
+    """
+    预览会话
+    
+    保存解码后的图像和一个只容纳一条更新的待处理槽位：新的更新直接覆盖槽位中尚未开始处理的更新，
+    因此无论客户端发送多快，每个会话同时最多只有一次计算在进行，被覆盖的更新计入 dropped。
+    """
+    
+    def __init__(self):
+        self.image: Optional[np.ndarray] = None
+        self.image_key: Optional[str] = None
+        self.dropped = 0
+        self._pending: Optional[PreviewUpdate] = None
+        self._ready = asyncio.Event()
+    
+    @property
+    def has_image(self) -> bool:
+        """是否已上传图像"""
+        return self.image is not None
+    
+    async def load_image(self, image_bytes: Optional[bytes] = None, image_data: Optional[str] = None) -> Dict[str, Any]:
+        """
+        在工作池中解码并替换会话图像，二进制字节与Base64数据二选一
+        
+        Args:
+            image_bytes: 编码后的图像字节
+            image_data: Base64编码的图像数据
+        
+        Returns:
+            图像信息
+        
+        Raises:
+            ValueError: 图像数据解析失败
+            ExecutorBusyError: 工作池已满
+        """
+        if image_bytes is not None:
+            image, image_key = await get_executor().run(ImageService.load_image_bytes, image_bytes)
+        elif image_data:
+            image, image_key = await get_executor().run(ImageService.load_image, image_data)
+        else:
+            raise ValueError("缺少图像数据")
+        
+        self.image = image
+        self.image_key = image_key
+        return {"width": image.shape[1], "height": image.shape[0], "channels": image.shape[2] if image.ndim == 3 else 1}
+    
+    def submit(self, update: PreviewUpdate) -> None:
+        """
+        提交参数更新，覆盖尚未开始处理的更新
+        
+        Args:
+            update: 参数更新
+        
+        Raises:
+            ValueError: 输出格式不支持
+        """
+        media_type(update.output_format)
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = update
+        self._ready.set()
+    
+    async def next_update(self) -> PreviewUpdate:
+        """
+        等待并取出最新的待处理更新
+        
+        Returns:
+            参数更新
+        """
+        while self._pending is None:
+            self._ready.clear()
+            await self._ready.wait()
+        update, self._pending = self._pending, None
+        return update
+    
+    async def render(self, update: PreviewUpdate) -> Union[bytes, memoryview]:
+        """
+        在工作池中按参数更新处理会话图像
+        
+        Args:
+            update: 参数更新
+        
+        Returns:
+            编码后的预览图像字节
+        
+        Raises:
+            ValueError: 尚未上传图像、处理器不存在或处理失败
+            ExecutorBusyError: 工作池已满
+        """
+        if not self.has_image:
+            raise ValueError("请先上传图像")
+        
+        return await get_executor().run(
+            ImageService.batch_process_decoded,
+            image=self.image,
+            image_key=self.image_key,
+            processor_names=update.processor_names,
+            params_list=update.params_list,
+            image_format=update.output_format,
+            render_mode=update.render_mode,
+            preview_max_size=update.preview_max_size
+        )
@@ -0,0 +1,174 @@
+"""
+处理结果缓存，按字节数限制内存占用的LRU缓存
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+from src import config
+
+
+class ResultCache:
+    """
+    处理结果缓存
+    
+    键由解码后图像的内容摘要、编译后的处理器链（含已验证参数）和输出格式组成，值为编码后的结果字节。
+    所有条目的字节数之和不超过 max_bytes，超出时按最近最少使用的顺序淘汰；
+    单个结果超过上限时不缓存。
+    
+    另维护一张有界的别名表：编码后输入数据的摘要 -> (解码后图像的摘要, 图像形状)，
+    重复请求命中时无需解码输入图像；预览模式依据记录的形状计算代理图像的缩放比例。
+    """
+    
+    def __init__(self, max_bytes: int, max_aliases: int = 4096):
+        """
+        初始化缓存
+        
+        Args:
+            max_bytes: 缓存结果的总字节数上限，0表示关闭缓存
+            max_aliases: 别名表的最大条目数
+        """
+        self.max_bytes = max(max_bytes, 0)
+        self.max_aliases = max_aliases
+        self._entries: "OrderedDict[str, Union[bytes, memoryview]]" = OrderedDict()
+        self._aliases: "OrderedDict[str, Tuple[str, Tuple[int, ...]]]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """缓存是否开启"""
+        return self.max_bytes > 0
+    
+    def get(self, key: str) -> Optional[Union[bytes, memoryview]]:
+        """
+        查询缓存，命中时将条目移到最近使用的位置
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            缓存的结果字节，未命中时返回None
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+    
+    def put(self, key: str, value: Union[bytes, memoryview]) -> None:
+        """
+        写入缓存，并淘汰最近最少使用的条目直到总字节数不超过上限
+        
+        Args:
+            key: 缓存键
+            value: 结果字节
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._evictions += 1
+    
+    def resolve_alias(self, source_key: str) -> Optional[Tuple[str, Tuple[int, ...]]]:
+        """
+        根据编码后输入数据的摘要查询解码后图像的摘要和形状
+        
+        Args:
+            source_key: 编码后输入数据的摘要
+            
+        Returns:
+            (解码后图像的摘要, 图像形状)，未知时返回None
+        """
+        with self._lock:
+            alias = self._aliases.get(source_key)
+            if alias is not None:
+                self._aliases.move_to_end(source_key)
+            return alias
+    
+    def add_alias(self, source_key: str, image_key: str, shape: Tuple[int, ...]) -> None:
+        """
+        记录编码后输入数据与解码后图像的摘要、形状的对应关系
+        
+        Args:
+            source_key: 编码后输入数据的摘要
+            image_key: 解码后图像的摘要
+            shape: 解码后图像的形状
+        """
+        with self._lock:
+            self._aliases[source_key] = (image_key, tuple(shape))
+            self._aliases.move_to_end(source_key)
+            while len(self._aliases) > self.max_aliases:
+                self._aliases.popitem(last=False)
+    
+    def clear(self) -> None:
+        """清空缓存，统计计数保留"""
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._size = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """
+    获取全局处理结果缓存，首次调用时按配置创建；使用进程执行后端时每个工作进程各有一份，由 init_result_cache 创建
+    
+    Returns:
+        处理结果缓存
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(max_bytes=config.RESULT_CACHE_MAX_BYTES)
+    return _result_cache
+
+
+def init_result_cache(max_bytes: int) -> ResultCache:
+    """
+    按指定的内存上限创建全局处理结果缓存，替换已有的缓存
+    
+    Args:
+        max_bytes: 内存上限（字节），0表示关闭缓存
+        
+    Returns:
+        新的处理结果缓存
+    """
+    global _result_cache
+    _result_cache = ResultCache(max_bytes=max_bytes)
+    return _result_cache
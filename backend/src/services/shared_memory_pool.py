@@ -0,0 +1,382 @@
+"""
+共享内存图像传递，进程执行后端下图像经共享内存段在服务进程与工作进程之间传递，跨进程只传递段名、形状等描述
+"""
+import ctypes
+import shutil
+import threading
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from src import config
+
+
+# 小于该字节数的图像直接随任务pickle传递，创建与映射共享内存段的固定开销高于复制
+MIN_SHARED_BYTES = 64 * 1024
+
+# 共享内存段的最小尺寸，段尺寸向上取整为2的幂，便于复用
+_MIN_SEGMENT_BYTES = 64 * 1024
+
+# 工作进程中保持映射的共享内存段数上限，段被复用时无需重新映射
+_ATTACHED_MAX = 32
+
+# 共享内存所在的文件系统，写入超过其容量的段会导致进程收到SIGBUS，创建前需检查剩余空间
+_SHM_DIR = "/dev/shm"
+
+
+def _segment_size(nbytes: int) -> int:
+    """数据字节数对应的段尺寸"""
+    return max(1 << (max(nbytes, 1) - 1).bit_length(), _MIN_SEGMENT_BYTES)
+
+
+def _has_room(nbytes: int) -> bool:
+    """共享内存文件系统是否有足够的剩余空间"""
+    try:
+        return shutil.disk_usage(_SHM_DIR).free >= nbytes
+    except OSError:
+        # 没有 /dev/shm 的平台上共享内存不占用文件系统空间
+        return True
+
+
+def _close(segment: shared_memory.SharedMemory) -> None:
+    """关闭共享内存段的映射，仍有视图引用时交由视图持有映射，最后一个视图释放时解除"""
+    try:
+        segment.close()
+    except BufferError:
+        # 解除段对象对缓冲区与映射的引用，避免段对象析构时再次关闭失败
+        segment._buf = None
+        segment._mmap = None
+
+
+class SharedImage(NamedTuple):
+    """共享内存中图像的描述，跨进程传递时代替图像本身"""
+    name: str
+    offset: int
+    shape: Tuple[int, ...]
+    strides: Tuple[int, ...]
+    dtype: str
+
+
+class SharedResult:
+    """
+    工作进程返回值的包装，其中的图像已写入工作进程创建的共享内存段
+    
+    服务进程收到后由 adopt() 接管这些段并换回图像，接管与读取分开进行，调用方不再等待结果时段同样被接管并回收。
+    """
+    
+    def __init__(self, value: Any):
+        """
+        初始化包装
+        
+        Args:
+            value: 返回值，其中的图像已替换为 SharedImage
+        """
+        self.value = value
+        self._adopted = False
+    
+    def adopt(self, pool: "SharedMemoryPool") -> Any:
+        """
+        接管返回值中的共享内存段并换回图像，重复调用只接管一次
+        
+        Args:
+            pool: 服务进程的共享内存池
+        
+        Returns:
+            图像以共享内存为存储的返回值
+        """
+        if not self._adopted:
+            self.value = _map_images(self.value, SharedImage, pool.adopt)
+            self._adopted = True
+        return self.value
+
+
+def _map_images(value: Any, kind: type, convert: Callable[[Any], Any]) -> Any:
+    """将值中（含元组与列表的元素）指定类型的对象逐个转换"""
+    if isinstance(value, kind):
+        return convert(value)
+    if isinstance(value, (tuple, list)) and not isinstance(value, SharedImage):
+        return type(value)(_map_images(item, kind, convert) for item in value)
+    return value
+
+
+class SharedMemoryPool:
+    """
+    服务进程中的共享内存池
+    
+    池中的段都由服务进程持有并负责删除。图像以段为存储时，其所有视图都释放后段回到空闲列表供下次复用，
+    空闲段的总字节数超过 max_idle_bytes 时删除最早空闲的段。
+    """
+    
+    def __init__(self, max_idle_bytes: int):
+        """
+        初始化共享内存池
+        
+        Args:
+            max_idle_bytes: 保留的空闲段总字节数上限，0表示不使用共享内存
+        """
+        self.max_idle_bytes = max(max_idle_bytes, 0)
+        # 段名 -> 共享内存段
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        # 段尺寸 -> 空闲段名，按空闲的先后排列
+        self._idle: Dict[int, List[str]] = {}
+        self._idle_order: List[str] = []
+        self._idle_bytes = 0
+        self._allocations = 0
+        self._reuses = 0
+        self._copies = 0
+        # 段可能在持有锁时因垃圾回收而回到空闲列表，需使用可重入锁
+        self._lock = threading.RLock()
+    
+    @property
+    def enabled(self) -> bool:
+        """是否使用共享内存传递图像"""
+        return self.max_idle_bytes > 0
+    
+    def allocate(self, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+        """
+        分配以共享内存为存储的图像，优先复用空闲段
+        
+        Args:
+            shape: 图像形状
+            dtype: 数据类型
+        
+        Returns:
+            未初始化的可写图像
+        
+        Raises:
+            OSError: 共享内存空间不足或创建失败
+        """
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        size = _segment_size(nbytes)
+        with self._lock:
+            free = self._idle.get(size)
+            if free:
+                name = free.pop()
+                self._idle_order.remove(name)
+                self._idle_bytes -= size
+                self._reuses += 1
+                segment = self._segments[name]
+            else:
+                segment = None
+        
+        if segment is None:
+            if not _has_room(size):
+                raise OSError(f"共享内存空间不足，无法分配 {size} 字节")
+            segment = shared_memory.SharedMemory(create=True, size=size)
+            with self._lock:
+                self._segments[segment.name] = segment
+                self._allocations += 1
+        return self._wrap(segment, 0, tuple(shape), None, dtype)
+    
+    def adopt(self, descriptor: SharedImage) -> np.ndarray:
+        """
+        接管工作进程创建的共享内存段，段随后与池中其他段一样复用与删除
+        
+        Args:
+            descriptor: 工作进程返回的图像描述
+        
+        Returns:
+            以该段为存储的图像
+        """
+        segment = shared_memory.SharedMemory(name=descriptor.name)
+        with self._lock:
+            self._segments[segment.name] = segment
+        return self._wrap(segment, descriptor.offset, descriptor.shape, descriptor.strides, np.dtype(descriptor.dtype))
+    
+    def share(self, image: np.ndarray) -> Tuple[SharedImage, np.ndarray]:
+        """
+        获取图像的共享内存描述，以池中段为存储的图像（及其视图）直接描述，其余图像先复制到新分配的段
+        
+        Args:
+            image: 图像
+        
+        Returns:
+            (图像描述, 共享内存中的图像)，调用方需持有后者直到工作进程用完该图像
+        
+        Raises:
+            OSError: 共享内存空间不足或创建失败
+        """
+        located = self._locate(image)
+        if located is None:
+            shared = self.allocate(image.shape, image.dtype)
+            np.copyto(shared, image)
+            with self._lock:
+                self._copies += 1
+            image = shared
+            located = self._locate(image)
+        
+        name, offset = located
+        return SharedImage(name, offset, image.shape, image.strides, image.dtype.str), image
+    
+    def _locate(self, image: np.ndarray) -> Optional[Tuple[str, int]]:
+        """查找图像所在的池中段及其在段内的偏移，不在池中时返回None"""
+        owner = image
+        while isinstance(owner, np.ndarray):
+            owner = owner.base
+        name = getattr(owner, "segment_name", None)
+        if name is None or name not in self._segments:
+            return None
+        return name, image.__array_interface__["data"][0] - ctypes.addressof(owner)
+    
+    def _wrap(self, segment: shared_memory.SharedMemory, offset: int, shape: Tuple[int, ...],
+              strides: Optional[Tuple[int, ...]], dtype: np.dtype) -> np.ndarray:
+        """以段为存储创建图像，图像及其所有视图都释放后段回到空闲列表"""
+        owner = (ctypes.c_char * segment.size).from_buffer(segment.buf)
+        owner.segment_name = segment.name
+        weakref.finalize(owner, self._release, segment.name)
+        return np.ndarray(shape, dtype=dtype, buffer=owner, offset=offset, strides=strides)
+    
+    def _release(self, name: str) -> None:
+        """段不再被引用，放回空闲列表"""
+        with self._lock:
+            segment = self._segments.get(name)
+            if segment is None:
+                return
+            self._idle.setdefault(segment.size, []).append(name)
+            self._idle_order.append(name)
+            self._idle_bytes += segment.size
+            self._trim()
+    
+    def _trim(self) -> None:
+        """删除最早空闲的段直到空闲总字节数不超过上限，调用方需持有锁"""
+        while self._idle_bytes > self.max_idle_bytes and self._idle_order:
+            name = self._idle_order.pop(0)
+            segment = self._segments.pop(name)
+            self._idle[segment.size].remove(name)
+            self._idle_bytes -= segment.size
+            _close(segment)
+            segment.unlink()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取共享内存池统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            total_bytes = sum(segment.size for segment in self._segments.values())
+            return {
+                "enabled": self.enabled,
+                "segments": len(self._segments),
+                "in_use_bytes": total_bytes - self._idle_bytes,
+                "idle_bytes": self._idle_bytes,
+                "max_idle_bytes": self.max_idle_bytes,
+                "allocations": self._allocations,
+                "reuses": self._reuses,
+                "copies": self._copies,
+            }
+    
+    def close(self) -> None:
+        """删除池中所有的段，仍被引用的段只删除名称，内存在最后一个视图释放后归还"""
+        with self._lock:
+            for segment in self._segments.values():
+                _close(segment)
+                try:
+                    segment.unlink()
+                except FileNotFoundError:
+                    pass
+            self._segments.clear()
+            self._idle.clear()
+            self._idle_order.clear()
+            self._idle_bytes = 0
+
+
+# 工作进程中已映射的共享内存段：段名 -> 共享内存段，按最近使用排列
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(descriptor: SharedImage) -> np.ndarray:
+    """在工作进程中映射服务进程传来的图像，返回只读视图"""
+    segment = _attached.pop(descriptor.name, None)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=descriptor.name)
+        while len(_attached) >= _ATTACHED_MAX:
+            _close(_attached.pop(next(iter(_attached))))
+    _attached[descriptor.name] = segment
+    
+    image = np.ndarray(
+        descriptor.shape, dtype=np.dtype(descriptor.dtype), buffer=segment.buf,
+        offset=descriptor.offset, strides=descriptor.strides
+    )
+    image.flags.writeable = False
+    return image
+
+
+def _export(image: np.ndarray) -> Any:
+    """在工作进程中将返回的图像写入新的共享内存段，由服务进程接管；过小或空间不足时原样返回"""
+    if image.nbytes < MIN_SHARED_BYTES:
+        return image
+    size = _segment_size(image.nbytes)
+    if not _has_room(size):
+        return image
+    
+    segment = shared_memory.SharedMemory(create=True, size=size)
+    target = np.ndarray(image.shape, dtype=image.dtype, buffer=segment.buf)
+    np.copyto(target, image)
+    descriptor = SharedImage(segment.name, 0, target.shape, target.strides, target.dtype.str)
+    del target
+    segment.close()
+    return descriptor
+
+
+def call_shared(func: Callable[..., Any], *args, **kwargs) -> SharedResult:
+    """
+    在工作进程中执行函数：参数中的图像描述映射为只读图像，返回值中的图像写入共享内存
+    
+    函数不应返回输入图像的视图或在进程内缓存之，输入所在的段在本次调用结束后会被服务进程复用。
+    
+    Args:
+        func: 要执行的函数
+        *args: 位置参数，SharedImage 会被换成图像
+        **kwargs: 关键字参数，SharedImage 会被换成图像
+    
+    Returns:
+        包装后的返回值
+    """
+    args = _map_images(args, SharedImage, _attach)
+    kwargs = {key: _map_images(value, SharedImage, _attach) for key, value in kwargs.items()}
+    result = func(*args, **kwargs)
+    del args, kwargs
+    
+    exported: List[str] = []
+    
+    def export(image: np.ndarray) -> Any:
+        shared = _export(image)
+        if isinstance(shared, SharedImage):
+            exported.append(shared.name)
+        return shared
+    
+    try:
+        return SharedResult(_map_images(result, np.ndarray, export))
+    except BaseException:
+        for name in exported:
+            segment = shared_memory.SharedMemory(name=name)
+            segment.close()
+            segment.unlink()
+        raise
+
+
+_shared_memory_pool: Optional[SharedMemoryPool] = None
+
+
+def get_shared_memory_pool() -> SharedMemoryPool:
+    """
+    获取服务进程的共享内存池，首次调用时按配置创建
+    
+    Returns:
+        共享内存池
+    """
+    global _shared_memory_pool
+    if _shared_memory_pool is None:
+        _shared_memory_pool = SharedMemoryPool(max_idle_bytes=config.SHM_POOL_MAX_BYTES)
+    return _shared_memory_pool
+
+
+def shutdown_shared_memory_pool() -> None:
+    """删除共享内存池中的所有段"""
+    global _shared_memory_pool
+    if _shared_memory_pool is not None:
+        _shared_memory_pool.close()
+        _shared_memory_pool = None
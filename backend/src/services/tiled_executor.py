@@ -0,0 +1,176 @@
+"""
+局部滤波分块执行器，将大图拆分为带重叠边的块并行处理，拼接结果与整图处理逐位一致
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+import numpy as np
+from src import config
+from src.models.image_processor_manager import ImageProcessorManager
+
+
+# 块的位置：(输出区域y0, y1, x0, x1, 读取区域y0, y1, x0, x1)
+Tile = Tuple[int, int, int, int, int, int, int, int]
+
+
+class TiledExecutor:
+    """
+    分块执行器
+    
+    每块向四周多读取 halo 个像素（处理器每个输出像素依赖的邻域半径），处理后裁掉重叠边写入输出。
+    块内像素的邻域要么全部位于读取区域内，要么越过的正是图像边界，因此与整图处理结果逐位一致。
+    
+    OpenCV在计算时释放GIL，各块在线程池中并行执行；同时在处理中的块数不超过工作线程数的两倍，
+    工作内存只与块大小有关，输入和输出可以是 np.memmap，从而在固定内存内处理超大图像。
+    """
+    
+    def __init__(self, tile_size: int = 1024, max_workers: int = 4, min_pixels: int = 16_000_000):
+        """
+        初始化分块执行器
+        
+        Args:
+            tile_size: 块的边长（像素）
+            max_workers: 工作线程数
+            min_pixels: 像素数达到该值的图像才分块执行，0表示关闭分块
+        
+        Raises:
+            ValueError: 配置不合法
+        """
+        if tile_size < 1:
+            raise ValueError("块大小必须大于等于 1")
+        if max_workers < 1:
+            raise ValueError("工作者数量必须大于等于 1")
+        
+        self.tile_size = tile_size
+        self.max_workers = max_workers
+        self.min_pixels = max(min_pixels, 0)
+        self._pool: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """是否开启分块执行"""
+        return self.min_pixels > 0
+    
+    def should_tile(self, processor_name: str, validated_params: Dict[str, Any], image: np.ndarray) -> bool:
+        """
+        判断是否对该步骤分块执行
+        
+        Args:
+            processor_name: 处理器名称
+            validated_params: 已验证的参数
+            image: 输入图像
+        
+        Returns:
+            处理器支持分块、未指定 ROI 且图像足够大时返回True
+        """
+        if not self.enabled or image.shape[0] * image.shape[1] < self.min_pixels:
+            return False
+        # 指定了 ROI 的步骤由 ImageProcessorManager 只处理 ROI 区域
+        if "roi" in validated_params:
+            return False
+        processor_class = ImageProcessorManager.get_processor(processor_name)
+        return processor_class is not None and processor_class.halo(validated_params) is not None
+    
+    def run(self, processor_name: str, validated_params: Dict[str, Any], image: np.ndarray,
+            out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        分块执行处理器
+        
+        Args:
+            processor_name: 处理器名称
+            validated_params: 已验证的参数
+            image: 输入图像，可以是 np.memmap
+            out: 输出数组，可以是 np.memmap，为None时按第一块的结果分配
+        
+        Returns:
+            处理后的图像
+        
+        Raises:
+            ValueError: 处理器不存在或不支持分块执行
+        """
+        processor_class = ImageProcessorManager.get_processor(processor_name)
+        if processor_class is None:
+            raise ValueError(f"处理器不存在: {processor_name}")
+        halo = processor_class.halo(validated_params)
+        if halo is None:
+            raise ValueError(f"处理器不支持分块执行: {processor_name}")
+        
+        pool = self._get_pool()
+        pending: Deque[Tuple[Tile, Future]] = deque()
+        for tile in self._tiles(image.shape[0], image.shape[1], halo):
+            if len(pending) >= self.max_workers * 2:
+                out = self._stitch(out, image, *pending.popleft())
+            pending.append((tile, pool.submit(self._process_tile, processor_name, validated_params, image, tile)))
+        while pending:
+            out = self._stitch(out, image, *pending.popleft())
+        return out
+    
+    def _tiles(self, height: int, width: int, halo: int) -> Iterator[Tile]:
+        """按行优先顺序生成各块的输出区域与读取区域"""
+        for y0 in range(0, height, self.tile_size):
+            y1 = min(y0 + self.tile_size, height)
+            for x0 in range(0, width, self.tile_size):
+                x1 = min(x0 + self.tile_size, width)
+                yield (
+                    y0, y1, x0, x1,
+                    max(y0 - halo, 0), min(y1 + halo, height), max(x0 - halo, 0), min(x1 + halo, width)
+                )
+    
+    @staticmethod
+    def _process_tile(processor_name: str, validated_params: Dict[str, Any], image: np.ndarray,
+                      tile: Tile) -> np.ndarray:
+        """读取一块（含重叠边）并处理，返回裁掉重叠边后的结果"""
+        y0, y1, x0, x1, ry0, ry1, rx0, rx1 = tile
+        region = np.ascontiguousarray(image[ry0:ry1, rx0:rx1])
+        result = ImageProcessorManager.execute(processor_name, region, validated_params)
+        return result[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]
+    
+    @staticmethod
+    def _stitch(out: Optional[np.ndarray], image: np.ndarray, tile: Tile, future: Future) -> np.ndarray:
+        """等待一块的结果并写入输出，输出尚未分配时按该块结果的通道数和数据类型分配"""
+        result = future.result()
+        if out is None:
+            out = np.empty(image.shape[:2] + result.shape[2:], dtype=result.dtype)
+        y0, y1, x0, x1 = tile[:4]
+        out[y0:y1, x0:x1] = result
+        return out
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """惰性创建线程池"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-tile")
+        return self._pool
+    
+    def shutdown(self) -> None:
+        """关闭线程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_tiled_executor: Optional[TiledExecutor] = None
+
+
+def get_tiled_executor() -> TiledExecutor:
+    """
+    获取全局分块执行器，首次调用时按配置创建；使用进程执行后端时每个工作进程各有一份
+    
+    Returns:
+        分块执行器
+    """
+    global _tiled_executor
+    if _tiled_executor is None:
+        _tiled_executor = TiledExecutor(
+            tile_size=config.TILE_SIZE,
+            max_workers=config.TILE_WORKERS,
+            min_pixels=config.TILING_MIN_PIXELS
+        )
+    return _tiled_executor
+
+
+def shutdown_tiled_executor() -> None:
+    """关闭全局分块执行器"""
+    global _tiled_executor
+    if _tiled_executor is not None:
+        _tiled_executor.shutdown()
+        _tiled_executor = None
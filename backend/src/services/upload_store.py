@@ -0,0 +1,170 @@
+"""
+上传图像存储，按内容摘要保存解码后的图像，后续请求以ID引用，无需重复传输与解码
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from src import config
+
+
+class UploadNotFoundError(Exception):
+    """上传的图像不存在或已过期"""
+    pass
+
+
+class UploadStore:
+    """
+    上传图像存储
+    
+    键为解码后图像的内容摘要，相同的图像重复上传只保存一份。条目在最后一次访问后 ttl 秒过期；
+    所有图像的字节数之和不超过 max_bytes，超出时按最近最少使用的顺序淘汰。
+    图像设为只读后在请求间共享，处理器不会修改输入图像。
+    """
+    
+    def __init__(self, max_bytes: int, ttl: int):
+        """
+        初始化存储
+        
+        Args:
+            max_bytes: 图像总字节数上限，0表示关闭上传
+            ttl: 条目在最后一次访问后的保留时间（秒）
+        """
+        self.max_bytes = max(max_bytes, 0)
+        self.ttl = ttl
+        # 摘要 -> (图像, 过期时间)
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._size = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        """是否开启上传"""
+        return self.max_bytes > 0
+    
+    def put(self, image_key: str, image: np.ndarray) -> None:
+        """
+        保存图像，并淘汰最近最少使用的条目直到总字节数不超过上限
+        
+        Args:
+            image_key: 解码后图像的摘要
+            image: 解码后的图像
+        
+        Raises:
+            ValueError: 上传未开启或图像超过存储上限
+        """
+        if not self.enabled:
+            raise ValueError("图像上传未开启")
+        if image.nbytes > self.max_bytes:
+            raise ValueError(f"图像解码后为 {image.nbytes} 字节，超过上传存储上限 {self.max_bytes} 字节")
+        
+        image.flags.writeable = False
+        with self._lock:
+            self._expire(time.monotonic())
+            previous = self._entries.pop(image_key, None)
+            if previous is not None:
+                self._size -= previous[0].nbytes
+            self._entries[image_key] = (image, time.monotonic() + self.ttl)
+            self._size += image.nbytes
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+                self._evictions += 1
+    
+    def get(self, image_key: str) -> np.ndarray:
+        """
+        获取图像并延长其有效期
+        
+        Args:
+            image_key: 上传时返回的图像ID
+        
+        Returns:
+            只读的解码后图像
+        
+        Raises:
+            UploadNotFoundError: 图像不存在或已过期
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(image_key)
+            if entry is None:
+                raise UploadNotFoundError(f"图像不存在或已过期: {image_key}")
+            self._entries[image_key] = (entry[0], now + self.ttl)
+            self._entries.move_to_end(image_key)
+            return entry[0]
+    
+    def delete(self, image_key: str) -> bool:
+        """
+        删除图像
+        
+        Args:
+            image_key: 图像ID
+        
+        Returns:
+            是否删除
+        """
+        with self._lock:
+            entry = self._entries.pop(image_key, None)
+            if entry is None:
+                return False
+            self._size -= entry[0].nbytes
+            return True
+    
+    def expires_in(self, image_key: str) -> Optional[float]:
+        """图像距过期的秒数，不存在时返回None"""
+        with self._lock:
+            entry = self._entries.get(image_key)
+            return max(entry[1] - time.monotonic(), 0.0) if entry is not None else None
+    
+    def _expire(self, now: float) -> None:
+        """
+        删除已过期的条目，调用方需持有锁
+        
+        条目按最近访问排序，而每次访问都把有效期延长同样的 ttl，因此过期时间同样有序，只需从头部检查。
+        """
+        while self._entries:
+            image_key, (image, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[image_key]
+            self._size -= image.nbytes
+            self._expirations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计信息
+        
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+_upload_store: Optional[UploadStore] = None
+
+
+def get_upload_store() -> UploadStore:
+    """
+    获取全局上传图像存储，首次调用时按配置创建；存储位于服务进程中，使用进程执行后端时图像随任务传给工作进程
+    
+    Returns:
+        上传图像存储
+    """
+    global _upload_store
+    if _upload_store is None:
+        _upload_store = UploadStore(max_bytes=config.UPLOAD_STORE_MAX_BYTES, ttl=config.UPLOAD_TTL)
+    return _upload_store
@@ -0,0 +1,54 @@
+"""
+摘要工具，为图像内容和处理器链生成稳定的缓存键
+
+使用SHA-256（多数CPU上有硬件加速，比blake2b更快），截取前128位作为键
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+
+
+def data_digest(data: Union[str, bytes, bytearray, memoryview]) -> str:
+    """
+    计算编码后图像数据（Base64字符串或二进制字节）的摘要
+    
+    Args:
+        data: 图像数据
+        
+    Returns:
+        十六进制摘要
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def image_digest(image: np.ndarray) -> str:
+    """
+    计算解码后图像内容的摘要，形状与数据类型也计入摘要
+    
+    Args:
+        image: 图像
+        
+    Returns:
+        十六进制摘要
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{image.shape}|{image.dtype.str}|".encode("ascii"))
+    hasher.update(memoryview(np.ascontiguousarray(image)).cast("B"))
+    return hasher.hexdigest()[:32]
+
+
+def chain_digest(steps: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """
+    计算处理器链及其已验证参数的摘要
+    
+    Args:
+        steps: (处理器名称, 参数) 列表
+        
+    Returns:
+        十六进制摘要
+    """
+    payload = json.dumps(steps, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
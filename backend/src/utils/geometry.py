@@ -0,0 +1,152 @@
+"""
+几何结果工具，轮廓、线段、圆等检测结果的打包、坐标换算与序列化
+"""
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+# 几何结果的输出格式：紧凑JSON，或NumPy的npz打包数组
+GEOMETRY_FORMATS = ("json", "npz")
+
+# 默认的几何结果输出格式，请求的输出格式为图像格式时使用
+DEFAULT_GEOMETRY_FORMAT = "json"
+
+# JSON中浮点坐标保留的小数位数
+_DECIMALS = 2
+
+
+def pack_contours(contours: Tuple[np.ndarray, ...], hierarchy: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    将 cv2.findContours 的结果打包为连续数组
+    
+    Args:
+        contours: 轮廓列表，每个轮廓形状为 (n, 1, 2)
+        hierarchy: 轮廓层级，形状为 (1, k, 4)，没有轮廓时为None
+    
+    Returns:
+        points 为所有轮廓的点 (m, 2)，offsets 为第i个轮廓的点在 points 中的区间 [offsets[i], offsets[i+1])，
+        hierarchy 为每个轮廓的 [后一个, 前一个, 第一个子轮廓, 父轮廓] 序号，-1表示不存在
+    """
+    lengths = np.fromiter((len(contour) for contour in contours), dtype=np.int32, count=len(contours))
+    offsets = np.zeros(len(contours) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    points = (
+        np.concatenate(contours).reshape(-1, 2).astype(np.int32, copy=False)
+        if contours else np.empty((0, 2), dtype=np.int32)
+    )
+    return {
+        "points": points,
+        "offsets": offsets,
+        "hierarchy": (
+            hierarchy.reshape(-1, 4).astype(np.int32, copy=False)
+            if hierarchy is not None else np.empty((0, 4), dtype=np.int32)
+        ),
+    }
+
+
+def unpack_contours(geometry: Dict[str, np.ndarray]) -> List[np.ndarray]:
+    """
+    将打包的轮廓还原为 cv2.drawContours 可用的轮廓列表
+    
+    Args:
+        geometry: pack_contours 的结果
+    
+    Returns:
+        轮廓列表，每个轮廓形状为 (n, 1, 2)，为 points 的视图
+    """
+    points = geometry["points"].reshape(-1, 1, 2)
+    offsets = geometry["offsets"]
+    return [points[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def scale_geometry(geometry: Dict[str, np.ndarray], factor: float) -> Dict[str, np.ndarray]:
+    """
+    按比例换算几何结果的坐标，用于将代理图像上的检测结果换算回原图坐标
+    
+    Args:
+        geometry: 几何结果
+        factor: 缩放比例
+    
+    Returns:
+        换算后的几何结果，原结果不变
+    """
+    scaled = dict(geometry)
+    if "points" in scaled:
+        scaled["points"] = np.rint(scaled["points"] * factor).astype(np.int32)
+    if "lines" in scaled:
+        scaled["lines"] = np.rint(scaled["lines"] * factor).astype(np.int32)
+    if "circles" in scaled:
+        scaled["circles"] = (scaled["circles"] * np.float32(factor)).astype(np.float32)
+    return scaled
+
+
+def translate_geometry(geometry: Dict[str, np.ndarray], dx: int, dy: int) -> Dict[str, np.ndarray]:
+    """
+    平移几何结果的坐标，用于将 ROI 上的检测结果换算回原图坐标
+    
+    Args:
+        geometry: 几何结果
+        dx: 水平偏移
+        dy: 垂直偏移
+    
+    Returns:
+        平移后的几何结果，原结果不变
+    """
+    translated = dict(geometry)
+    if "points" in translated:
+        translated["points"] = translated["points"] + np.array([dx, dy], dtype=np.int32)
+    if "lines" in translated:
+        translated["lines"] = translated["lines"] + np.array([dx, dy, dx, dy], dtype=np.int32)
+    if "circles" in translated:
+        translated["circles"] = translated["circles"] + np.array([dx, dy, 0], dtype=np.float32)
+    return translated
+
+
+def geometry_to_json(geometry: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    将几何结果转换为可JSON序列化的紧凑结构
+    
+    Args:
+        geometry: 几何结果
+    
+    Returns:
+        contours 为每个轮廓的 [[x, y], ...]，hierarchy 为每个轮廓的层级，
+        lines 为每条线段的 [x1, y1, x2, y2]，circles 为每个圆的 [x, y, r]
+    """
+    result: Dict[str, Any] = {}
+    for name, value in geometry.items():
+        if name == "points":
+            result["contours"] = [contour.reshape(-1, 2).tolist() for contour in unpack_contours(geometry)]
+        elif name == "offsets":
+            continue
+        elif value.dtype.kind == "f":
+            result[name] = np.round(value.astype(np.float64), _DECIMALS).tolist()
+        else:
+            result[name] = value.tolist()
+    return result
+
+
+def encode_geometry(geometry: Dict[str, np.ndarray], geometry_format: str = DEFAULT_GEOMETRY_FORMAT) -> bytes:
+    """
+    序列化几何结果
+    
+    Args:
+        geometry: 几何结果
+        geometry_format: 输出格式，json 为紧凑JSON，npz 为 numpy.savez 打包的数组（可用 numpy.load 读取）
+    
+    Returns:
+        序列化后的字节
+    
+    Raises:
+        ValueError: 格式不支持
+    """
+    geometry_format = geometry_format.lower()
+    if geometry_format == "json":
+        return json.dumps(geometry_to_json(geometry), separators=(",", ":")).encode("utf-8")
+    if geometry_format == "npz":
+        buffer = io.BytesIO()
+        np.savez(buffer, **geometry)
+        return buffer.getvalue()
+    raise ValueError(f"不支持的几何结果格式: {geometry_format}")
@@ -0,0 +1,222 @@
+"""
+由粗到精的霍夫检测
+
+全分辨率上的 HoughCircles 与 HoughLinesP 耗时随图像面积（以及圆的半径范围）快速增长。本模块：
+- 先在 cv2.pyrDown 得到的金字塔层上按比例换算参数检测候选（投票阈值与边缘像素数成正比，同样按比例缩小）；
+- 再只在每个候选周围的全分辨率小窗口中精化：圆在窗口内以缩小的半径范围重新做一次霍夫圆检测，
+  线段取窗口内靠近候选的边缘点做稳健直线拟合，端点取边缘点在直线上投影的范围；
+- 精化失败的候选保留换算回原图坐标的粗检测结果。
+
+误差与加速比见 benchmarks/hough_benchmark.py：在带有已知圆与线段的合成测试图上（2层金字塔），
+圆的召回率与全分辨率检测相同，圆心误差相当，2/12/24百万像素上分别快约9/25/20倍；
+线段的召回率在2百万像素上略低（0.92对0.96），大图上因投票阈值按比例缩小反而更高，分别快约1.5/3.4/4.5倍。
+"""
+import math
+from typing import Tuple
+import cv2
+import numpy as np
+
+
+# 最粗金字塔层的短边像素数下限
+MIN_LEVEL_SIZE = 128
+
+# 最粗金字塔层上最小特征（圆半径、线段长度）的像素数下限，过小时候选会丢失
+MIN_LEVEL_FEATURE = 6
+
+# 霍夫线检测的Canny阈值，与全分辨率检测一致
+LINE_CANNY_THRESHOLDS = (50, 150)
+
+
+def pyramid_levels(requested: int, shape: Tuple[int, ...], min_feature: float) -> int:
+    """
+    确定实际使用的金字塔层数：最粗层的短边与最小特征都不能过小
+    
+    Args:
+        requested: 请求的层数
+        shape: 图像形状
+        min_feature: 以原图像素计的最小特征尺寸
+        
+    Returns:
+        层数，0表示直接在全分辨率上检测
+    """
+    levels = requested
+    while levels > 0 and (
+        min(shape[:2]) >> levels < MIN_LEVEL_SIZE
+        or min_feature / (1 << levels) < MIN_LEVEL_FEATURE
+    ):
+        levels -= 1
+    return levels
+
+
+def _downscale(gray: np.ndarray, levels: int) -> np.ndarray:
+    """连续 levels 次 pyrDown"""
+    for _ in range(levels):
+        gray = cv2.pyrDown(gray)
+    return gray
+
+
+def _window(center_x: float, center_y: float, half: float, shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """以给定点为中心、限制在图像内的窗口 (x0, y0, x1, y1)"""
+    height, width = shape[:2]
+    return (
+        max(int(math.floor(center_x - half)), 0),
+        max(int(math.floor(center_y - half)), 0),
+        min(int(math.ceil(center_x + half)) + 1, width),
+        min(int(math.ceil(center_y + half)) + 1, height),
+    )
+
+
+def hough_circles(gray: np.ndarray, levels: int, dp: float, min_dist: int, param1: int, param2: int,
+                  min_radius: int, max_radius: int) -> np.ndarray:
+    """
+    由粗到精的霍夫圆检测，参数与 cv2.HoughCircles 相同
+    
+    Args:
+        gray: 灰度图
+        levels: 金字塔层数，由 pyramid_levels 确定，需大于0
+        dp: 累加器分辨率与图像分辨率的比值
+        min_dist: 圆心之间的最小距离
+        param1: Canny边缘检测的高阈值
+        param2: 累加器阈值
+        min_radius: 最小半径
+        max_radius: 最大半径，0表示不限
+        
+    Returns:
+        圆 (n, 3) float32，每行为 [x, y, r]，按粗检测的投票顺序排列
+    """
+    scale = 1 << levels
+    coarse = cv2.HoughCircles(
+        image=_downscale(gray, levels),
+        method=cv2.HOUGH_GRADIENT,
+        # 粗层已经缩小，累加器不再额外降低分辨率
+        dp=max(dp / scale, 1.0),
+        minDist=max(min_dist / scale, 1.0),
+        param1=param1,
+        param2=max(int(round(param2 / scale)), 1),
+        minRadius=int(min_radius // scale),
+        maxRadius=int(math.ceil(max_radius / scale)) + 1 if max_radius > 0 else 0
+    )
+    if coarse is None:
+        return np.empty((0, 3), dtype=np.float32)
+    
+    # 粗层上1个像素的量化误差对应原图 scale 个像素，窗口与半径范围都留出两倍余量
+    margin = 2 * scale + 2
+    refined = []
+    for x, y, radius in (coarse.reshape(-1, 3) * scale).tolist():
+        low = max(int(radius - margin), min_radius)
+        high = int(math.ceil(radius + margin))
+        if max_radius > 0:
+            high = min(high, max_radius)
+        x0, y0, x1, y1 = _window(x, y, high + margin, gray.shape)
+        found = cv2.HoughCircles(
+            image=gray[y0:y1, x0:x1],
+            method=cv2.HOUGH_GRADIENT,
+            dp=dp,
+            # 窗口内只取一个圆
+            minDist=max(x1 - x0, y1 - y0),
+            param1=param1,
+            param2=param2,
+            minRadius=low,
+            maxRadius=max(high, low + 1)
+        )
+        if found is not None:
+            fx, fy, fr = found[0, 0].tolist()
+            if math.hypot(fx + x0 - x, fy + y0 - y) <= margin:
+                x, y, radius = fx + x0, fy + y0, fr
+        
+        # 多个粗候选可能精化到同一个圆，按最小距离去重
+        if all(math.hypot(x - px, y - py) >= min_dist for px, py, _ in refined):
+            refined.append((x, y, radius))
+    return np.array(refined, dtype=np.float32).reshape(-1, 3)
+
+
+def hough_lines(gray: np.ndarray, levels: int, threshold: int, min_line_length: int,
+                max_line_gap: int) -> np.ndarray:
+    """
+    由粗到精的概率霍夫线检测，先做Canny边缘检测，参数与 cv2.HoughLinesP 相同
+    
+    Args:
+        gray: 灰度图
+        levels: 金字塔层数，由 pyramid_levels 确定，需大于0
+        threshold: 累加器阈值
+        min_line_length: 最小线长
+        max_line_gap: 最大线间隔
+        
+    Returns:
+        线段端点 (n, 4) int32，每行为 [x1, y1, x2, y2]
+    """
+    scale = 1 << levels
+    coarse = cv2.HoughLinesP(
+        image=cv2.Canny(_downscale(gray, levels), *LINE_CANNY_THRESHOLDS),
+        rho=1,
+        theta=np.pi / 180,
+        threshold=max(int(round(threshold / scale)), 1),
+        minLineLength=min_line_length / scale,
+        maxLineGap=max_line_gap / scale
+    )
+    if coarse is None:
+        return np.empty((0, 4), dtype=np.int32)
+    
+    candidates = coarse.reshape(-1, 4).astype(np.float64) * scale
+    # Canny是线性时间的，全分辨率上只做一次；耗时的霍夫投票只在粗层上进行
+    edges = cv2.Canny(gray, *LINE_CANNY_THRESHOLDS)
+    margin = 2 * scale + 2
+    
+    refined = np.empty((len(candidates), 4), dtype=np.float64)
+    for index, segment in enumerate(candidates):
+        refined[index] = _refine_segment(segment, edges, margin)
+    return np.rint(refined).astype(np.int32)
+
+
+def _refine_segment(segment: np.ndarray, edges: np.ndarray, margin: float) -> np.ndarray:
+    """
+    用候选线段附近的全分辨率边缘点精化线段
+    
+    Args:
+        segment: 换算到原图坐标的候选线段 [x1, y1, x2, y2]
+        edges: 全分辨率边缘图
+        margin: 边缘点到候选线段的最大距离
+        
+    Returns:
+        精化后的线段，边缘点不足时为候选线段
+    """
+    start, end = segment[:2], segment[2:]
+    direction = end - start
+    length = float(np.hypot(*direction))
+    if length == 0:
+        return segment
+    
+    # 以候选线段为轴、宽为 2*margin 的带状窗口内的像素，逐像素取样
+    axis = direction / length
+    normal = np.array([-axis[1], axis[0]])
+    along = np.arange(-margin, length + margin + 1.0)
+    across = np.arange(-margin, margin + 1.0)
+    grid = start + along[:, None, None] * axis + across[None, :, None] * normal
+    xs, ys = np.rint(grid.reshape(-1, 2)).astype(np.int64).T
+    height, width = edges.shape[:2]
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    xs, ys = xs[inside], ys[inside]
+    hit = edges[ys, xs] > 0
+    if np.count_nonzero(hit) < 2:
+        return segment
+    points = np.stack([xs[hit], ys[hit]], axis=1).astype(np.float64)
+    
+    # 主成分方向拟合直线，再剔除残差明显偏大的点（穿过窗口的其他边缘）重新拟合一次
+    origin, fitted = _principal_axis(points)
+    residual = np.abs((points - origin) @ np.array([-fitted[1], fitted[0]]))
+    kept = points[residual <= max(2.0, 2.5 * float(np.median(residual)))]
+    if len(kept) >= 2:
+        points = kept
+        origin, fitted = _principal_axis(points)
+    if fitted @ axis < 0:
+        fitted = -fitted
+    projection = (points - origin) @ fitted
+    return np.concatenate([origin + fitted * projection.min(), origin + fitted * projection.max()])
+
+
+def _principal_axis(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """点集的质心与主方向（最小二乘直线）"""
+    origin = points.mean(axis=0)
+    centered = points - origin
+    _, vectors = np.linalg.eigh(centered.T @ centered)
+    return origin, vectors[:, -1]
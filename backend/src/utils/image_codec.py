@@ -0,0 +1,149 @@
+"""
+图像编解码工具，直接在内存缓冲区中完成图像的解码与编码，避免临时文件读写
+
+OpenCV 的 Python 接口中 imdecode/imencode 每次都分配新的输出数组，无法写入调用方提供的缓冲区，
+因此这里不复用暂存缓冲区；编码结果以 imencode 返回的数组本身（或其 memoryview）向后传递，不再拷贝。
+"""
+import base64
+import binascii
+from typing import Union
+import cv2
+import numpy as np
+from src.utils.timing import stage
+
+
+# Base64数据URL前缀标记
+BASE64_MARKER = "base64,"
+
+# 默认输出格式，与原先写入的.jpg临时文件保持一致
+DEFAULT_FORMAT = "jpg"
+
+# 输出格式到OpenCV扩展名的映射
+FORMAT_EXTENSIONS = {
+    "jpg": ".jpg",
+    "jpeg": ".jpg",
+    "png": ".png",
+    "webp": ".webp",
+    "bmp": ".bmp",
+}
+
+# 输出格式到HTTP媒体类型的映射
+FORMAT_MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "bmp": "image/bmp",
+    # 检测类处理器输出几何结果时的格式
+    "json": "application/json",
+    "npz": "application/octet-stream",
+}
+
+
+def decode_image(image_bytes: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+    """
+    从内存缓冲区解码图像
+    
+    Args:
+        image_bytes: 编码后的图像字节
+        
+    Returns:
+        BGR格式的图像
+        
+    Raises:
+        ValueError: 无法解码图像数据
+    """
+    # np.frombuffer 直接包装已有缓冲区，不产生额外拷贝
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    if buffer.size == 0:
+        raise ValueError("无法解码图像数据")
+    
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("无法解码图像数据")
+    return image
+
+
+def encode_image(image: np.ndarray, image_format: str = DEFAULT_FORMAT) -> np.ndarray:
+    """
+    将图像编码到内存缓冲区
+    
+    Args:
+        image: 输入图像
+        image_format: 输出格式，可选值：jpg, png, webp, bmp
+        
+    Returns:
+        编码后的一维uint8缓冲区，支持缓冲区协议，可直接写出或Base64编码
+        
+    Raises:
+        ValueError: 格式不支持或编码失败
+    """
+    extension = FORMAT_EXTENSIONS.get(image_format.lower())
+    if extension is None:
+        raise ValueError(f"不支持的图像格式: {image_format}")
+    
+    success, buffer = cv2.imencode(extension, image)
+    if not success:
+        raise ValueError("图像编码失败")
+    return buffer
+
+
+def media_type(image_format: str) -> str:
+    """
+    获取输出格式对应的媒体类型
+    
+    Args:
+        image_format: 输出格式
+        
+    Returns:
+        HTTP Content-Type
+        
+    Raises:
+        ValueError: 格式不支持
+    """
+    media = FORMAT_MEDIA_TYPES.get(image_format.lower())
+    if media is None:
+        raise ValueError(f"不支持的图像格式: {image_format}")
+    return media
+
+
+def decode_base64_image(image_data: str) -> np.ndarray:
+    """
+    解码Base64编码的图像数据
+    
+    Args:
+        image_data: Base64编码的图像数据，可带有data URL前缀
+        
+    Returns:
+        BGR格式的图像
+        
+    Raises:
+        ValueError: 无法解码图像数据
+    """
+    # 移除Base64前缀（如果有），只定位一次而不是split出整个列表
+    index = image_data.find(BASE64_MARKER)
+    if index != -1:
+        image_data = image_data[index + len(BASE64_MARKER):]
+    
+    try:
+        with stage("b64decode"):
+            image_bytes = binascii.a2b_base64(image_data)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Base64解码失败: {str(e)}")
+    
+    return decode_image(image_bytes)
+
+
+def encode_base64_image(image: np.ndarray, image_format: str = DEFAULT_FORMAT) -> str:
+    """
+    将图像编码为Base64字符串
+    
+    Args:
+        image: 输入图像
+        image_format: 输出格式
+        
+    Returns:
+        Base64编码的图像数据
+    """
+    # imencode 返回的缓冲区直接交给 b64encode，省去 tobytes() 拷贝
+    return base64.b64encode(encode_image(image, image_format)).decode("ascii")
@@ -0,0 +1,214 @@
+"""
+逐通道查找表工具，逐像素处理器的查找表表示、组合与执行
+
+白平衡、灰度世界等处理器对每个像素各通道的取值做同一个映射，可以表示为每通道256项的查找表。
+连续的逐像素步骤组合为一张表后只需一次 cv2.LUT 遍历；与图像统计量（如各通道均值）有关的表
+由直方图计算，中间结果的直方图由输入直方图经查找表换算得到，不必生成中间图像。
+"""
+from typing import Optional, Sequence, Tuple
+import cv2
+import numpy as np
+
+
+# 恒等查找表
+IDENTITY = np.arange(256, dtype=np.uint8)
+
+# cv2.calcHist 以float32输出计数，超过2^24时不再精确，按不超过该像素数的行块分别统计再累加
+_HISTOGRAM_CHUNK_PIXELS = 1 << 24
+
+
+def channel_histograms(image: np.ndarray) -> np.ndarray:
+    """
+    统计8位图像各通道的直方图
+    
+    Args:
+        image: 单通道或多通道8位图像
+        
+    Returns:
+        直方图 (通道数, 256) int64
+    """
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    histogram = np.zeros((channels, 256), dtype=np.int64)
+    rows = max(_HISTOGRAM_CHUNK_PIXELS // max(image.shape[1], 1), 1)
+    for start in range(0, image.shape[0], rows):
+        chunk = image[start:start + rows]
+        for channel in range(channels):
+            counts = cv2.calcHist([chunk], [channel], None, [256], [0, 256])
+            histogram[channel] += counts.reshape(256).astype(np.int64)
+    return histogram
+
+
+class ChannelLUT:
+    """
+    逐通道查找表：输出第c通道的像素为 table[:, c][输入第 source[c] 通道的像素]
+    
+    source 为通道的来源，恒等时即为普通的逐通道查表；非恒等时表示查表的同时重排通道。
+    """
+    
+    def __init__(self, table: np.ndarray, source: Optional[Sequence[int]] = None):
+        """
+        创建查找表
+        
+        Args:
+            table: 查找表 (256, 通道数) uint8，单通道可为 (256,)
+            source: 每个输出通道的来源输入通道，默认不重排
+        """
+        self.table = np.ascontiguousarray(table, dtype=np.uint8).reshape(256, -1)
+        self.source: Tuple[int, ...] = tuple(source) if source is not None else tuple(range(self.channels))
+    
+    @classmethod
+    def per_channel(cls, tables: Sequence[np.ndarray], source: Optional[Sequence[int]] = None) -> "ChannelLUT":
+        """
+        由各通道的查找表创建
+        
+        Args:
+            tables: 各输出通道的查找表，每个为256项
+            source: 每个输出通道的来源输入通道，默认不重排
+            
+        Returns:
+            查找表
+        """
+        return cls(np.stack([np.asarray(table).reshape(256) for table in tables], axis=1), source)
+    
+    @property
+    def channels(self) -> int:
+        """通道数"""
+        return self.table.shape[1]
+    
+    @property
+    def reorders(self) -> bool:
+        """是否重排通道"""
+        return self.source != tuple(range(self.channels))
+    
+    def then(self, other: "ChannelLUT") -> "ChannelLUT":
+        """
+        组合查找表：先查本表，再查 other
+        
+        Args:
+            other: 之后执行的查找表
+            
+        Returns:
+            组合后的查找表
+            
+        Raises:
+            ValueError: 通道数不同
+        """
+        if other.channels != self.channels:
+            raise ValueError(f"查找表的通道数不同: {self.channels} 与 {other.channels}")
+        tables = [other.table[self.table[:, other.source[c]], c] for c in range(self.channels)]
+        return ChannelLUT.per_channel(tables, [self.source[other.source[c]] for c in range(self.channels)])
+    
+    def map_histogram(self, histogram: np.ndarray) -> np.ndarray:
+        """
+        由输入的直方图换算查表结果的直方图
+        
+        Args:
+            histogram: 输入直方图 (通道数, 256)
+            
+        Returns:
+            输出直方图 (通道数, 256) int64
+        """
+        return np.stack([
+            np.bincount(self.table[:, c], weights=histogram[self.source[c]], minlength=256).astype(np.int64)
+            for c in range(self.channels)
+        ])
+    
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """
+        对图像查表
+        
+        Args:
+            image: 8位图像，通道数与查找表相同
+            
+        Returns:
+            新图像
+        """
+        if self.channels == 1:
+            return cv2.LUT(image, self.table.reshape(256))
+        
+        # cv2.LUT 按输入通道查表，先把每张表放到其来源通道上，查表后再重排
+        order = np.argsort(self.source)
+        result = cv2.LUT(image, self.table[:, order].reshape(256, 1, self.channels))
+        if not self.reorders:
+            return result
+        if self.source == (2, 1, 0):
+            return cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
+        reordered = np.empty_like(result)
+        pairs = [index for c, source in enumerate(self.source) for index in (source, c)]
+        cv2.mixChannels([result], [reordered], pairs)
+        return reordered
+
+
+class LUTInput:
+    """
+    逐像素处理器编译查找表时的输入：通道数以及按需计算的统计量
+    
+    来自实际图像时直接在图像上统计；来自前一步查找表的输出时由前一步输入的直方图换算，不生成中间图像。
+    """
+    
+    def __init__(self, image: Optional[np.ndarray] = None, parent: Optional["LUTInput"] = None,
+                 lut: Optional[ChannelLUT] = None):
+        """
+        创建输入
+        
+        Args:
+            image: 实际图像
+            parent: 前一步的输入，与 lut 一起给出时表示前一步查表的输出
+            lut: 前一步的查找表
+        """
+        self._image = image
+        self._parent = parent
+        self._lut = lut
+        self._histogram: Optional[np.ndarray] = None
+        if image is not None:
+            self.channels = 1 if image.ndim == 2 else image.shape[2]
+            self.pixels = image.shape[0] * image.shape[1]
+        else:
+            self.channels = lut.channels
+            self.pixels = parent.pixels
+    
+    def mapped(self, lut: ChannelLUT) -> "LUTInput":
+        """
+        查表之后的输入
+        
+        Args:
+            lut: 查找表
+            
+        Returns:
+            查表结果对应的输入
+        """
+        return LUTInput(parent=self, lut=lut)
+    
+    def histogram(self) -> np.ndarray:
+        """
+        各通道直方图
+        
+        Returns:
+            直方图 (通道数, 256) int64
+        """
+        if self._histogram is None:
+            if self._image is not None:
+                self._histogram = channel_histograms(self._image)
+            else:
+                self._histogram = self._lut.map_histogram(self._parent.histogram())
+        return self._histogram
+    
+    def sums(self) -> np.ndarray:
+        """
+        各通道像素值之和
+        
+        Returns:
+            (通道数,) int64
+        """
+        return self.histogram() @ np.arange(256, dtype=np.int64)
+    
+    def mean(self) -> Tuple[float, ...]:
+        """
+        各通道均值，与 cv2.mean 逐位相同（和乘以像素数的倒数）
+        
+        Returns:
+            各通道均值
+        """
+        if self._image is not None and self._histogram is None:
+            return tuple(cv2.mean(self._image)[:self.channels])
+        return tuple(float(total) * (1.0 / self.pixels) for total in self.sums())
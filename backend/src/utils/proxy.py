@@ -0,0 +1,49 @@
+"""
+预览代理图像工具，在缩小的代理图像上运行处理器链以加快交互式调参
+"""
+from typing import Tuple
+import cv2
+import numpy as np
+
+
+# 渲染模式：final 全分辨率，preview 在代理图像上执行
+RENDER_MODES = ("final", "preview")
+
+
+def proxy_factor(shape: Tuple[int, ...], max_size: int) -> float:
+    """
+    计算代理图像相对原图的缩放比例，原图长边不超过 max_size 时不缩放
+    
+    Args:
+        shape: 原图形状
+        max_size: 代理图像长边的最大像素数
+    
+    Returns:
+        缩放比例，不大于1
+    
+    Raises:
+        ValueError: max_size 不合法
+    """
+    if max_size < 1:
+        raise ValueError("预览尺寸必须大于等于 1")
+    return min(1.0, max_size / max(shape[0], shape[1]))
+
+
+def make_proxy(image: np.ndarray, factor: float) -> np.ndarray:
+    """
+    按缩放比例生成代理图像
+    
+    Args:
+        image: 原图
+        factor: 缩放比例
+    
+    Returns:
+        代理图像，比例为1时直接返回原图
+    """
+    if factor >= 1.0:
+        return image
+    
+    height, width = image.shape[:2]
+    size = (max(int(round(width * factor)), 1), max(int(round(height * factor)), 1))
+    # INTER_AREA 对缩小做区域平均，避免摩尔纹，预览与全分辨率结果缩小后更接近
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,129 @@
+"""
+感兴趣区域（ROI）工具，ROI 的解析、按邻域半径扩展、坐标换算与贴回原图
+
+任意处理器都可以只处理图像中的一个矩形区域：ImageProcessorManager 在 ROI 四周按处理器的邻域半径（halo）
+多裁出一圈像素，只在这块区域上运行处理器，再裁掉多出的边，耗时随 ROI 面积而非整幅图像的面积增长。
+"""
+import math
+from typing import Any, List, Tuple
+import cv2
+import numpy as np
+
+
+# ROI 的输出方式：paste 贴回原图（输出尺寸与输入相同），crop 只返回 ROI 区域
+ROI_OUTPUTS = ("paste", "crop")
+
+# 默认的 ROI 输出方式
+DEFAULT_ROI_OUTPUT = "paste"
+
+# 以 (x0, y0, x1, y1) 表示的矩形，右下角不含
+Box = Tuple[int, int, int, int]
+
+
+def parse_roi(value: Any) -> List[int]:
+    """
+    解析 ROI 参数
+    
+    Args:
+        value: 'x,y,w,h' 格式的字符串，或 [x, y, w, h] 列表
+        
+    Returns:
+        [x, y, w, h]
+        
+    Raises:
+        ValueError: 格式不正确、坐标为负或宽高不大于0
+    """
+    try:
+        parts = value.split(",") if isinstance(value, str) else list(value)
+        roi = [int(part) for part in parts]
+    except (ValueError, TypeError):
+        roi = []
+    if len(roi) != 4 or roi[0] < 0 or roi[1] < 0 or roi[2] <= 0 or roi[3] <= 0:
+        raise ValueError("参数 roi 必须是'x,y,w,h'格式，坐标为非负整数，宽高大于0")
+    return roi
+
+
+def clip_roi(roi: List[int], shape: Tuple[int, ...]) -> Box:
+    """
+    将 ROI 限制在图像范围内
+    
+    Args:
+        roi: [x, y, w, h]
+        shape: 图像形状
+        
+    Returns:
+        (x0, y0, x1, y1)
+        
+    Raises:
+        ValueError: ROI 与图像没有重叠
+    """
+    height, width = shape[:2]
+    x, y, w, h = roi
+    box = (min(x, width), min(y, height), min(x + w, width), min(y + h, height))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        raise ValueError(f"ROI {roi} 超出图像范围 {width}x{height}")
+    return box
+
+
+def expand_box(box: Box, halo: int, shape: Tuple[int, ...]) -> Box:
+    """
+    将矩形向四周扩展 halo 个像素，并限制在图像范围内
+    
+    Args:
+        box: (x0, y0, x1, y1)
+        halo: 扩展的像素数
+        shape: 图像形状
+        
+    Returns:
+        扩展后的 (x0, y0, x1, y1)
+    """
+    height, width = shape[:2]
+    x0, y0, x1, y1 = box
+    return max(x0 - halo, 0), max(y0 - halo, 0), min(x1 + halo, width), min(y1 + halo, height)
+
+
+def scale_roi(roi: List[int], factor: float) -> List[int]:
+    """
+    按图像缩放比例换算 ROI，向外取整使换算后的区域覆盖原区域
+    
+    Args:
+        roi: [x, y, w, h]
+        factor: 图像缩放比例
+        
+    Returns:
+        换算后的 [x, y, w, h]
+    """
+    x, y, w, h = roi
+    x0, y0 = int(math.floor(x * factor)), int(math.floor(y * factor))
+    x1, y1 = int(math.ceil((x + w) * factor)), int(math.ceil((y + h) * factor))
+    return [x0, y0, max(x1 - x0, 1), max(y1 - y0, 1)]
+
+
+def paste_roi(image: np.ndarray, region: np.ndarray, box: Box) -> np.ndarray:
+    """
+    将 ROI 的处理结果贴回原图
+    
+    处理结果与原图的通道数不同时（如彩色图上 ROI 内做了边缘检测），灰度的一方转换为BGR；
+    数据类型不同时，原图转换为处理结果的数据类型。
+    
+    Args:
+        image: 原图，不会被修改
+        region: ROI 的处理结果，尺寸与 box 相同
+        box: (x0, y0, x1, y1)
+        
+    Returns:
+        贴回后的新图像
+    """
+    if region.ndim == 2 and image.ndim == 3:
+        region = cv2.cvtColor(region, cv2.COLOR_GRAY2BGR)
+    if image.ndim == 2 and region.ndim == 3:
+        # cvtColor 已经生成新图像，不必再拷贝
+        output = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    else:
+        output = image.copy()
+    if output.dtype != region.dtype:
+        output = output.astype(region.dtype)
+    
+    x0, y0, x1, y1 = box
+    output[y0:y1, x0:x1] = region
+    return output
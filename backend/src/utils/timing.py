@@ -0,0 +1,148 @@
+"""
+阶段计时工具，在工作线程/进程内记录一次处理中各阶段（解码、验证、处理、编码）的耗时与数据大小
+
+记录只在 collect_timings 开启的上下文中进行，未开启时 stage() 不计时，命令行工具与基准测试不受影响。
+记录结果是普通对象，使用进程执行后端时随返回值传回服务进程。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class StageTimings:
+    """一次处理中各阶段的耗时与输入输出字节数"""
+    
+    def __init__(self):
+        # (阶段, 处理器名称, 耗时秒数, 是否失败)，按发生顺序排列
+        self.stages: List[Tuple[str, Optional[str], float, bool]] = []
+        # input / output -> 字节数
+        self.sizes: Dict[str, int] = {}
+        # 在工作者内的总耗时
+        self.total = 0.0
+        # 提交到工作池至开始执行（含排队与进程间传输）的耗时，由执行器在服务进程中填写
+        self.queue = 0.0
+    
+    def add(self, stage_name: str, processor_name: Optional[str], seconds: float, failed: bool = False) -> None:
+        """
+        追加一个阶段的记录
+        
+        Args:
+            stage_name: 阶段名称
+            processor_name: 处理器名称，与处理器无关的阶段为None
+            seconds: 耗时（秒）
+            failed: 该阶段是否抛出异常
+        """
+        self.stages.append((stage_name, processor_name, seconds, failed))
+    
+    def summary(self) -> List[Tuple[str, Optional[str], float]]:
+        """
+        按发生顺序汇总：处理阶段逐步列出，其余阶段按名称合并
+        
+        Returns:
+            [(阶段, 处理器名称, 耗时秒数)]，先列排队耗时
+        """
+        entries: List[Tuple[str, Optional[str], float]] = [("queue", None, self.queue)]
+        merged: Dict[str, int] = {}
+        for stage_name, processor_name, seconds, _ in self.stages:
+            if stage_name == "process":
+                entries.append((stage_name, processor_name, seconds))
+            elif stage_name in merged:
+                index = merged[stage_name]
+                entries[index] = (stage_name, None, entries[index][2] + seconds)
+            else:
+                merged[stage_name] = len(entries)
+                entries.append((stage_name, None, seconds))
+        return entries
+    
+    def server_timing(self) -> str:
+        """
+        导出为 Server-Timing 响应头，处理步骤以"process.处理器名称"命名，耗时单位为毫秒
+        
+        Returns:
+            如 queue;dur=0.2, decode;dur=3.1, process.gaussian_filter;dur=12.0, encode;dur=4.5, total;dur=19.8
+        """
+        entries = [
+            (f"{stage_name}.{processor_name}" if processor_name else stage_name, seconds)
+            for stage_name, processor_name, seconds in self.summary()
+        ]
+        entries.append(("total", self.queue + self.total))
+        return ", ".join(f"{metric};dur={seconds * 1000:.1f}" for metric, seconds in entries)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        导出为响应数据中的 timings 字段
+        
+        Returns:
+            {"stages": [{"stage", "processor", "duration_ms"}], "total_ms": 总耗时}
+        """
+        return {
+            "stages": [
+                {"stage": stage_name, "processor": processor_name, "duration_ms": round(seconds * 1000, 3)}
+                for stage_name, processor_name, seconds in self.summary()
+            ],
+            "total_ms": round((self.queue + self.total) * 1000, 3),
+        }
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def stage(stage_name: str, processor_name: Optional[str] = None) -> Iterator[None]:
+    """
+    记录代码块的耗时，抛出异常时记为失败
+    
+    Args:
+        stage_name: 阶段名称，如 decode, validate, process, encode
+        processor_name: 处理器名称
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    
+    began = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        timings.add(stage_name, processor_name, time.perf_counter() - began, failed)
+
+
+def record_size(direction: str, size: int) -> None:
+    """
+    记录输入或输出数据的字节数
+    
+    Args:
+        direction: input 或 output
+        size: 字节数
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.sizes[direction] = size
+
+
+def collect_timings(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, StageTimings, Optional[Exception]]:
+    """
+    执行函数并收集其中各阶段的耗时，异常也作为返回值，保证失败的处理同样留下记录
+    
+    Args:
+        func: 要执行的函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+    
+    Returns:
+        (函数返回值, 阶段记录, 抛出的异常)，成功时异常为None
+    """
+    timings = StageTimings()
+    token = _current.set(timings)
+    began = time.perf_counter()
+    try:
+        return func(*args, **kwargs), timings, None
+    except Exception as e:
+        return None, timings, e
+    finally:
+        timings.total = time.perf_counter() - began
+        _current.reset(token)
@@ -0,0 +1,83 @@
+"""
+测试公共夹具
+"""
+from typing import Any, Dict, List, Tuple
+import cv2
+import numpy as np
+import pytest
+from src.models.image_processor_manager import ImageProcessorManager
+from src.services.pipeline_planner import ExecutionPlan, PipelinePlanner
+import src.models.processors
+
+
+def make_image(height: int = 240, width: int = 320, channels: int = 3, seed: int = 0) -> np.ndarray:
+    """
+    生成带有渐变、噪声和几何图形的合成图像
+    
+    Args:
+        height: 图像高度
+        width: 图像宽度
+        channels: 通道数，1或3
+        seed: 随机种子
+        
+    Returns:
+        uint8图像
+    """
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    base = np.stack([x * 0.6 + y * 0.4, (255 - x) * 0.5 + y * 0.3, (x + y) * 0.5], axis=2)
+    base += rng.normal(0, 8, size=base.shape).astype(np.float32)
+    image = np.clip(base, 0, 255).astype(np.uint8)
+    for _ in range(6):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(10, 40)), color, thickness=3)
+    if channels == 1:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+@pytest.fixture
+def color_image() -> np.ndarray:
+    return make_image()
+
+
+@pytest.fixture
+def gray_image() -> np.ndarray:
+    return make_image(channels=1)
+
+
+@pytest.fixture(params=[3, 1], ids=["color", "gray"])
+def image(request) -> np.ndarray:
+    return make_image(channels=request.param)
+
+
+def run_sequential(chain: List[Tuple[str, Dict[str, Any]]], image: np.ndarray) -> np.ndarray:
+    """
+    不经执行计划，逐步验证参数并执行处理器链
+    
+    Args:
+        chain: (处理器名称, 参数) 列表
+        image: 输入图像
+        
+    Returns:
+        处理后的图像
+    """
+    for name, params in chain:
+        validated = ImageProcessorManager.get_processor(name).validate_parameters(**params)
+        image = ImageProcessorManager.execute(name, image, validated)
+    return image
+
+
+def compile_chain(chain: List[Tuple[str, Dict[str, Any]]]) -> ExecutionPlan:
+    """
+    将 (处理器名称, 参数) 列表编译为执行计划
+    
+    Args:
+        chain: (处理器名称, 参数) 列表
+        
+    Returns:
+        执行计划
+    """
+    return PipelinePlanner.compile([step[0] for step in chain], [step[1] for step in chain])
@@ -0,0 +1,182 @@
+"""
+异步任务：存储中的状态流转、重启恢复与过期清理，以及任务管理器的执行、排队上限与定期清理
+"""
+import asyncio
+import time
+import numpy as np
+import pytest
+from src.services import job_manager
+from src.services.executor import ProcessingExecutor
+from src.services.job_manager import JobManager, JobQueueFullError
+from src.services.job_store import TERMINAL_STATUSES, JobStore
+from src.utils.image_codec import decode_image, encode_image
+from tests.conftest import make_image, run_sequential
+
+
+SPEC = {
+    "processor_names": ["gaussian_filter", "threshold"],
+    "params_list": [{}, {}],
+    "output_format": "png",
+    "render_mode": "final",
+    "preview_max_size": None,
+}
+
+
+@pytest.fixture
+def store():
+    store = JobStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_job_lifecycle(store):
+    job = store.create("a", SPEC, b"input")
+    assert job["status"] == "queued" and job["started_at"] is None
+    assert store.count_pending() == 1
+    
+    assert store.claim_next() == "a"
+    assert store.get("a")["status"] == "running" and store.get("a")["started_at"] is not None
+    assert store.claim_next() is None
+    assert store.load_input("a") == (SPEC, b"input")
+    assert store.get_result("a") is None
+    
+    store.finish("a", memoryview(b"result"), {"total_ms": 1.0})
+    job = store.get("a")
+    assert job["status"] == "succeeded" and job["timings"] == {"total_ms": 1.0} and job["finished_at"] is not None
+    assert store.get_result("a") == (b"result", "png")
+    # 结束后清除输入
+    assert store.load_input("a") is None
+    assert store.count_pending() == 0
+
+
+def test_failed_job(store):
+    store.create("a", SPEC, "aW5wdXQ=")
+    assert store.load_input("a") == (SPEC, "aW5wdXQ=")
+    store.claim_next()
+    store.fail("a", "解码失败")
+    job = store.get("a")
+    assert job["status"] == "failed" and job["error"] == "解码失败"
+    assert store.get_result("a") is None and store.load_input("a") is None
+
+
+def test_jobs_are_claimed_in_submission_order(store):
+    for job_id in ("a", "b", "c"):
+        store.create(job_id, SPEC, b"input")
+    assert [store.claim_next() for _ in range(4)] == ["a", "b", "c", None]
+
+
+def test_delete(store):
+    store.create("a", SPEC, b"input")
+    store.create("b", SPEC, b"input")
+    store.claim_next()
+    with pytest.raises(ValueError):
+        store.delete("a")
+    assert store.delete("b")
+    assert not store.delete("b")
+    assert store.get("b") is None
+
+
+def test_running_jobs_are_requeued_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    store.create("a", SPEC, b"input")
+    store.create("b", SPEC, b"input")
+    store.claim_next()
+    store.close()
+    
+    store = JobStore(path)
+    try:
+        assert store.requeue_running() == 1
+        job = store.get("a")
+        assert job["status"] == "queued" and job["started_at"] is None
+        assert store.load_input("a") == (SPEC, b"input")
+    finally:
+        store.close()
+
+
+def test_purge_removes_only_finished_jobs(store):
+    for job_id in ("done", "failed", "running", "queued"):
+        store.create(job_id, SPEC, b"input")
+    for _ in range(3):
+        store.claim_next()
+    store.finish("done", b"result")
+    store.fail("failed", "error")
+    
+    assert store.purge(time.time() - 60) == 0
+    assert store.purge(time.time() + 1) == 2
+    assert [store.get(job_id) is not None for job_id in ("done", "failed", "running", "queued")] == [
+        False, False, True, True
+    ]
+
+
+def make_manager(**kwargs) -> JobManager:
+    return JobManager(JobStore(":memory:"), ProcessingExecutor(backend="thread", max_workers=2, max_queue=0), **kwargs)
+
+
+async def wait_finished(manager: JobManager, job_id: str):
+    statuses = [job["status"] async for job in manager.watch(job_id)]
+    return statuses, await manager.status(job_id)
+
+
+def test_manager_runs_jobs():
+    image = make_image()
+    
+    async def scenario():
+        manager = make_manager()
+        await manager.start()
+        try:
+            succeeded = await manager.submit(SPEC["processor_names"], SPEC["params_list"],
+                                             bytes(encode_image(image, "png")), "PNG")
+            failed = await manager.submit(["gaussian_filter"], None, b"not an image", "png")
+            statuses, job = await wait_finished(manager, succeeded["job_id"])
+            _, failed_job = await wait_finished(manager, failed["job_id"])
+            return statuses, job, await manager.result(succeeded["job_id"]), failed_job
+        finally:
+            manager.shutdown()
+    
+    statuses, job, result, failed_job = asyncio.run(scenario())
+    assert statuses[-1] == "succeeded" and set(statuses) <= {"queued", "running", "succeeded"}
+    assert job["timings"] is not None
+    data, output_format = result
+    assert output_format == "png"
+    expected = run_sequential([("gaussian_filter", {}), ("threshold", {})], image)
+    assert np.array_equal(decode_image(data), decode_image(encode_image(expected, "png")))
+    assert failed_job["status"] == "failed" and failed_job["error"]
+
+
+def test_manager_rejects_jobs_beyond_max_pending():
+    async def scenario():
+        # 未启动调度，提交的任务一直排队
+        manager = make_manager(max_pending=2)
+        try:
+            for _ in range(2):
+                await manager.submit(["mean_filter"], None, b"input", "png")
+            with pytest.raises(JobQueueFullError):
+                await manager.submit(["mean_filter"], None, b"input", "png")
+            assert await manager.status("missing") is None
+        finally:
+            manager.shutdown()
+    
+    asyncio.run(scenario())
+
+
+def test_manager_purges_expired_jobs(monkeypatch):
+    monkeypatch.setattr(job_manager, "PURGE_INTERVAL", 0.01)
+    image = bytes(encode_image(make_image(), "png"))
+    
+    async def scenario():
+        manager = make_manager(result_ttl=0.05)
+        await manager.start()
+        try:
+            job = await manager.submit(["mean_filter"], None, image, "png")
+            _, finished = await wait_finished(manager, job["job_id"])
+            assert finished["status"] in TERMINAL_STATUSES
+            for _ in range(100):
+                if await manager.status(job["job_id"]) is None:
+                    return True
+                await asyncio.sleep(0.01)
+            return False
+        finally:
+            manager.shutdown()
+    
+    assert asyncio.run(scenario())
@@ -0,0 +1,77 @@
+"""
+逐像素处理器的查找表：单步查表与 process() 逐位相同，组合为一张查找表的执行计划与逐步执行逐位相同
+"""
+import numpy as np
+import pytest
+from src.models.image_processor_manager import ImageProcessorManager
+from src.models.typed_image import TypedImage
+from src.services.pipeline_planner import LOOKUP_TABLE_STEP, PipelinePlanner
+from tests.conftest import compile_chain, make_image, run_sequential
+
+
+STEPS = [
+    ("white_balance", {}),
+    ("grey_world", {}),
+    ("threshold", {}),
+    ("threshold", {"threshold": 90, "max_value": 200, "threshold_type": "trunc"}),
+    ("threshold", {"threshold": 170, "threshold_type": "tozero_inv"}),
+    ("hsv_fixed_channel", {"fix_v": True, "v_value": 180}),
+    ("hsv_fixed_channel", {"fix_h": True, "h_value": 30, "fix_s": True, "s_value": 90}),
+    ("histogram_equalization", {}),
+]
+
+
+@pytest.mark.parametrize("name, params", STEPS, ids=lambda value: value if isinstance(value, str) else "")
+def test_lookup_table_matches_process(name, params, image):
+    validated = ImageProcessorManager.get_processor(name).validate_parameters(**params)
+    expected = ImageProcessorManager.execute(name, image, validated)
+    result = ImageProcessorManager.execute_lookup_tables([(name, validated)], TypedImage(image)).data
+    assert np.array_equal(result, expected)
+
+
+@pytest.mark.parametrize("value", [0, 17, 255])
+def test_equalization_of_constant_image(value):
+    image = np.full((30, 40, 3), value, dtype=np.uint8)
+    expected = ImageProcessorManager.process_image("histogram_equalization", image)
+    result = ImageProcessorManager.execute_lookup_tables([("histogram_equalization", {})], TypedImage(image)).data
+    assert np.array_equal(result, expected)
+
+
+CHAINS = [
+    [("white_balance", {}), ("grey_world", {}), ("white_balance", {}), ("grey_world", {})],
+    [("white_balance", {}), ("grey_world", {}), ("histogram_equalization", {}), ("white_balance", {}), ("grey_world", {})],
+]
+
+
+@pytest.mark.parametrize("chain", CHAINS, ids=lambda chain: "+".join(step[0] for step in chain))
+def test_fused_chain_matches_sequential(chain, image):
+    plan = compile_chain(chain)
+    assert any(step.processor_name == LOOKUP_TABLE_STEP for step in plan.steps)
+    planned = PipelinePlanner.execute(plan, image)
+    sequential = run_sequential(chain, image)
+    assert planned.shape == sequential.shape
+    assert np.array_equal(planned, sequential)
+
+
+def test_steps_with_different_views_are_not_fused():
+    plan = compile_chain([("white_balance", {}), ("threshold", {}), ("histogram_equalization", {})])
+    assert [step.processor_name for step in plan.steps] == ["white_balance", "threshold", "histogram_equalization"]
+
+
+@pytest.mark.parametrize("chain", [
+    [("hsv_fixed_channel", {"fix_s": True, "s_value": 40}), ("hsv_fixed_channel", {"fix_v": True, "v_value": 200})],
+    [("histogram_equalization", {}), ("histogram_equalization", {})],
+    [("threshold", {"threshold": 200, "threshold_type": "trunc"}), ("threshold", {"threshold": 100})],
+], ids=lambda chain: "+".join(step[0] for step in chain))
+def test_unfusible_steps_run_separately(chain, image):
+    # 两步之间的 BGR 往返有损，组合查表会与逐步执行不同；阈值处理单独执行比查表快
+    plan = compile_chain(chain)
+    assert [step.processor_name for step in plan.steps] == [step[0] for step in chain]
+    assert np.array_equal(PipelinePlanner.execute(plan, image), run_sequential(chain, image))
+
+
+def test_fused_chain_on_large_image():
+    # 超过 2^24 像素时直方图分块统计，换算出的统计量仍须与逐步执行一致
+    image = make_image(height=4200, width=4100, seed=3)
+    chain = [("grey_world", {}), ("white_balance", {}), ("grey_world", {})]
+    assert np.array_equal(PipelinePlanner.execute(compile_chain(chain), image), run_sequential(chain, image))
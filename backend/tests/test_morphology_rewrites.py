@@ -0,0 +1,67 @@
+"""
+执行计划的形态学改写：合并连续的腐蚀（膨胀）、融合开闭运算，结果与原处理器链逐位相同
+"""
+import numpy as np
+import pytest
+from src.services.pipeline_planner import PipelinePlanner
+from tests.conftest import compile_chain, run_sequential
+
+
+# (处理器链, 改写后的步骤：(处理器名称, 迭代次数, 开闭运算))
+CHAINS = [
+    ([("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5})],
+     [("erosion", 2, None)]),
+    ([("dilation", {"kernel_size": 3, "iterations": 2}), ("dilation", {"kernel_size": 3}),
+      ("dilation", {"kernel_size": 3, "iterations": 4})],
+     [("dilation", 7, None)]),
+    ([("erosion", {"kernel_size": 3}), ("erosion", {"kernel_size": 5})],
+     [("erosion", 1, None), ("erosion", 1, None)]),
+    ([("erosion", {"kernel_size": 7}), ("dilation", {"kernel_size": 7})],
+     [("morphology_ex", 1, "open")]),
+    ([("dilation", {"kernel_size": 5, "iterations": 2}), ("erosion", {"kernel_size": 5, "iterations": 2})],
+     [("morphology_ex", 2, "close")]),
+    ([("erosion", {"kernel_size": 5}), ("dilation", {"kernel_size": 5, "iterations": 2})],
+     [("erosion", 1, None), ("dilation", 2, None)]),
+    ([("erosion", {"kernel_size": 3}), ("dilation", {"kernel_size": 5})],
+     [("erosion", 1, None), ("dilation", 1, None)]),
+    # 先合并再融合：两次腐蚀、两次膨胀合并后融合为迭代两次的开运算
+    ([("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5}),
+      ("dilation", {"kernel_size": 5}), ("dilation", {"kernel_size": 5})],
+     [("morphology_ex", 2, "open")]),
+    ([("dilation", {}), ("erosion", {}), ("dilation", {}), ("erosion", {})],
+     [("morphology_ex", 1, "close"), ("morphology_ex", 1, "close")]),
+    ([("gaussian_filter", {}), ("erosion", {}), ("erosion", {}), ("threshold", {}), ("dilation", {}),
+      ("erosion", {})],
+     [("gaussian_filter", None, None), ("erosion", 2, None), ("threshold", None, None),
+      ("morphology_ex", 1, "close")]),
+]
+
+
+def describe(plan):
+    return [
+        (step.processor_name, step.params.get("iterations"), step.params.get("operation"))
+        for step in plan.steps
+    ]
+
+
+@pytest.mark.parametrize("chain, expected", CHAINS, ids=["+".join(step[0] for step in chain) for chain, _ in CHAINS])
+def test_rewritten_plan_matches_chain(chain, expected, image):
+    plan = compile_chain(chain)
+    assert describe(plan) == expected
+    planned = PipelinePlanner.execute(plan, image)
+    sequential = run_sequential(chain, image)
+    assert planned.shape == sequential.shape
+    assert np.array_equal(planned, sequential)
+
+
+def test_rewritten_steps_keep_source_steps():
+    plan = compile_chain([("erosion", {}), ("erosion", {}), ("dilation", {"iterations": 2}), ("mean_filter", {})])
+    assert [step.source_steps for step in plan.steps] == [[0, 1, 2], [3]]
+    assert len(plan.source_chain) == 4
+
+
+def test_steps_with_roi_are_not_rewritten(image):
+    chain = [("erosion", {}), ("dilation", {"roi": "10,10,100,100"}), ("dilation", {}), ("dilation", {})]
+    plan = compile_chain(chain)
+    assert describe(plan) == [("erosion", 1, None), ("dilation", 1, None), ("dilation", 2, None)]
+    assert np.array_equal(PipelinePlanner.execute(plan, image), run_sequential(chain, image))
@@ -0,0 +1,74 @@
+"""
+前缀缓存：命中统计、按原处理器链计算的前缀键与从前缀继续执行
+"""
+import numpy as np
+import pytest
+from src.services import image_service
+from src.services.image_service import ImageService
+from src.services.prefix_cache import PrefixCache
+from tests.conftest import compile_chain, run_sequential
+
+
+@pytest.fixture
+def prefix_cache(monkeypatch) -> PrefixCache:
+    cache = PrefixCache(max_bytes=64 * 1024 * 1024)
+    monkeypatch.setattr(image_service, "get_prefix_cache", lambda: cache)
+    return cache
+
+
+def execute(chain, image, image_key="image"):
+    def load_image():
+        return image
+    return ImageService._execute_from_prefix(compile_chain(chain), image_key, None, load_image)
+
+
+def test_lookup_longest_counts_one_lookup():
+    cache = PrefixCache(max_bytes=1024 * 1024)
+    keys = ["a", "b", "c", "d"]
+    assert cache.lookup_longest(keys) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+    
+    image = np.zeros((4, 4), dtype=np.uint8)
+    cache.put("a", image, 0.1)
+    cache.put("c", image, 0.2)
+    length, cached, cost = cache.lookup_longest(keys)
+    assert (length, cost) == (3, 0.2)
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_resume_from_longest_prefix(prefix_cache, image):
+    first = [("gaussian_filter", {}), ("median_filter", {}), ("sobel_filter", {})]
+    second = [("gaussian_filter", {}), ("median_filter", {}), ("canny_edge", {})]
+    assert np.array_equal(execute(first, image), run_sequential(first, image))
+    assert np.array_equal(execute(second, image), run_sequential(second, image))
+    stats = prefix_cache.stats()
+    # 每次执行只计一次查询
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_prefix_survives_fusion_with_changed_step(prefix_cache, image):
+    # 第二条链修改了第2步，与第1步融合为开运算，第1步的前缀仍然可用
+    first = [("erosion", {}), ("gaussian_filter", {}), ("mean_filter", {})]
+    second = [("erosion", {}), ("dilation", {}), ("mean_filter", {})]
+    execute(first, image)
+    assert [step.processor_name for step in compile_chain(second).steps] == ["morphology_ex", "mean_filter"]
+    assert np.array_equal(execute(second, image), run_sequential(second, image))
+    assert prefix_cache.stats()["hits"] == 1
+
+
+def test_gray_drawing_prefix_is_not_shared(prefix_cache, gray_image):
+    # 第一条链在灰度图上直接绘制，第二条链的同一前缀须输出BGR
+    first = [("contour_detection", {"color": "128,128,128"}), ("threshold", {}), ("mean_filter", {})]
+    second = [("contour_detection", {"color": "128,128,128"}), ("gaussian_filter", {}), ("mean_filter", {})]
+    execute(first, gray_image)
+    result = execute(second, gray_image)
+    expected = run_sequential(second, gray_image)
+    assert result.shape == expected.shape
+    assert np.array_equal(result, expected)
+
+
+def test_different_images_do_not_share_prefixes(prefix_cache, color_image, gray_image):
+    chain = [("gaussian_filter", {}), ("mean_filter", {})]
+    execute(chain, color_image, "color")
+    assert np.array_equal(execute(chain, gray_image, "gray"), run_sequential(chain, gray_image))
+    assert prefix_cache.stats()["hits"] == 0
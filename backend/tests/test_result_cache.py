@@ -0,0 +1,52 @@
+"""
+处理结果缓存：按字节数上限的LRU淘汰与统计
+"""
+from src import config
+from src.services.image_service import ImageService
+from src.services.result_cache import ResultCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", b"x" * 40)
+    cache.put("b", b"x" * 40)
+    assert cache.get("a") is not None
+    # 超出上限，淘汰最近最少使用的 b
+    cache.put("c", b"x" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert (stats["entries"], stats["size_bytes"], stats["evictions"]) == (2, 80, 1)
+
+
+def test_replacing_entry_updates_size():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", b"x" * 60)
+    cache.put("a", b"x" * 30)
+    assert cache.stats()["size_bytes"] == 30
+
+
+def test_oversized_and_disabled_are_not_cached():
+    cache = ResultCache(max_bytes=10)
+    cache.put("a", b"x" * 11)
+    assert cache.get("a") is None
+    
+    disabled = ResultCache(max_bytes=0)
+    assert not disabled.enabled
+    disabled.put("a", b"x")
+    assert disabled.get("a") is None
+
+
+def test_memoryview_counts_bytes():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", memoryview(bytearray(64)))
+    assert cache.stats()["size_bytes"] == 64
+
+
+def test_stats_are_per_worker_with_process_backend(monkeypatch):
+    monkeypatch.setattr(config, "EXECUTOR_BACKEND", "process")
+    monkeypatch.setattr(config, "EXECUTOR_MAX_WORKERS", 4)
+    stats = ImageService.cache_stats()
+    assert stats["backend"] == "process" and stats["per_worker"] and stats["workers"] == 4
+    assert stats["results"]["max_bytes"] == config.RESULT_CACHE_MAX_BYTES // 4
+    assert "hits" not in stats["results"]
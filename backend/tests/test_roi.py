@@ -0,0 +1,87 @@
+"""
+ROI 参数验证、贴回与裁剪，以及含 ROI 步骤的执行计划
+"""
+import cv2
+import numpy as np
+import pytest
+from src.models.image_processor_manager import ImageProcessorManager
+from src.services.pipeline_planner import PipelinePlanner
+from tests.conftest import compile_chain, run_sequential
+
+
+ROI = [40, 30, 120, 90]
+
+
+@pytest.mark.parametrize("roi", ["", "  ", None])
+def test_empty_roi_is_treated_as_absent(roi):
+    # 前端对未填写的可选字符串参数传空字符串
+    processor = ImageProcessorManager.get_processor("gaussian_filter")
+    validated = processor.validate_parameters(kernel_size=9, sigma=1.5, roi=roi, roi_output="paste")
+    assert validated == processor.validate_parameters(kernel_size=9, sigma=1.5)
+    assert "roi" not in validated and "roi_output" not in validated
+
+
+@pytest.mark.parametrize("roi", ["1,2,3", "a,b,c,d", "0,0,0,5", [-1, 0, 5, 5]])
+def test_invalid_roi_is_rejected(roi):
+    with pytest.raises(ValueError):
+        ImageProcessorManager.get_processor("mean_filter").validate_parameters(roi=roi)
+
+
+def test_invalid_roi_output_is_rejected():
+    with pytest.raises(ValueError):
+        ImageProcessorManager.get_processor("mean_filter").validate_parameters(roi="0,0,5,5", roi_output="x")
+
+
+@pytest.mark.parametrize("name", ["mean_filter", "gaussian_filter", "median_filter", "sobel_filter", "erosion", "dilation"])
+def test_local_processor_roi_matches_whole_image(name, image):
+    full = ImageProcessorManager.process_image(name, image)
+    pasted = ImageProcessorManager.process_image(name, image, roi=ROI)
+    cropped = ImageProcessorManager.process_image(name, image, roi=",".join(map(str, ROI)), roi_output="crop")
+    
+    x, y, w, h = ROI
+    assert np.array_equal(cropped, full[y:y + h, x:x + w])
+    if full.ndim < pasted.ndim:
+        # 彩色图上 ROI 内输出灰度的结果转换为BGR贴回
+        full = cv2.cvtColor(full, cv2.COLOR_GRAY2BGR)
+    assert np.array_equal(pasted[y:y + h, x:x + w], full[y:y + h, x:x + w])
+    # ROI 外保持原图
+    outside = np.ones(image.shape[:2], dtype=bool)
+    outside[y:y + h, x:x + w] = False
+    assert np.array_equal(pasted[outside], image[outside])
+
+
+def test_roi_is_clipped_to_image(color_image):
+    height, width = color_image.shape[:2]
+    cropped = ImageProcessorManager.process_image("mean_filter", color_image, roi=[width - 10, height - 20, 50, 50],
+                                                  roi_output="crop")
+    assert cropped.shape[:2] == (20, 10)
+    with pytest.raises(ValueError):
+        ImageProcessorManager.process_image("mean_filter", color_image, roi=[width, 0, 10, 10])
+
+
+def test_geometry_roi_coordinates(color_image):
+    # paste 的坐标为原图坐标，crop 的坐标相对于 ROI 左上角
+    params = {"roi": ROI, "return": "geometry"}
+    pasted = PipelinePlanner.execute(compile_chain([("contour_detection", params)]), color_image)
+    cropped = PipelinePlanner.execute(compile_chain([("contour_detection", {**params, "roi_output": "crop"})]),
+                                      color_image)
+    assert len(cropped["points"]) > 0
+    assert np.array_equal(pasted["points"], cropped["points"] + np.array(ROI[:2], dtype=np.int32))
+
+
+CHAINS = [
+    [("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5, "roi": "10,10,100,100"})],
+    [("erosion", {"roi": "10,10,100,100"}), ("dilation", {})],
+    [("contour_detection", {"color": "128,128,128"}), ("threshold", {"roi": "10,10,100,100"})],
+    [("hough_lines", {"color": "200,200,200"}), ("sobel_filter", {"roi": "10,10,100,100"})],
+    [("contour_detection", {"color": "128,128,128", "roi": "10,10,100,100"}), ("threshold", {})],
+    [("white_balance", {}), ("grey_world", {"roi": "10,10,100,100"}), ("white_balance", {})],
+]
+
+
+@pytest.mark.parametrize("chain", CHAINS, ids=lambda chain: "+".join(step[0] for step in chain))
+def test_plan_with_roi_matches_sequential(chain, image):
+    planned = PipelinePlanner.execute(compile_chain(chain), image)
+    sequential = run_sequential(chain, image)
+    assert planned.shape == sequential.shape
+    assert np.array_equal(planned, sequential)
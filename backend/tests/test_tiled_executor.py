@@ -0,0 +1,88 @@
+"""
+分块执行：拼接结果与整图处理逐位相同，以及分块的触发条件
+"""
+import numpy as np
+import pytest
+from src.models.image_processor_manager import ImageProcessorManager
+from src.services import pipeline_planner
+from src.services.pipeline_planner import PipelinePlanner
+from src.services.tiled_executor import TiledExecutor
+from tests.conftest import compile_chain, run_sequential
+
+
+STEPS = [
+    ("mean_filter", {"kernel_size": 7}),
+    ("gaussian_filter", {"kernel_size": 9, "sigma": 2.0}),
+    ("median_filter", {"kernel_size": 5}),
+    ("sobel_filter", {"dx": 1, "dy": 1, "kernel_size": 5}),
+    ("erosion", {"kernel_size": 5, "iterations": 2}),
+    ("dilation", {"kernel_size": 3, "iterations": 3}),
+]
+
+
+@pytest.fixture
+def executor():
+    # 块边长不整除图像尺寸，且小于部分处理器的邻域半径
+    executor = TiledExecutor(tile_size=37, max_workers=3, min_pixels=1)
+    yield executor
+    executor.shutdown()
+
+
+def validate(name, params):
+    return ImageProcessorManager.get_processor(name).validate_parameters(**params)
+
+
+@pytest.mark.parametrize("name, params", STEPS, ids=lambda value: value if isinstance(value, str) else "")
+def test_tiled_matches_whole_image(name, params, image, executor):
+    validated = validate(name, params)
+    expected = ImageProcessorManager.execute(name, image, validated)
+    tiled = executor.run(name, validated, image)
+    assert tiled.shape == expected.shape and tiled.dtype == expected.dtype
+    assert np.array_equal(tiled, expected)
+
+
+def test_tiles_smaller_than_halo(color_image):
+    executor = TiledExecutor(tile_size=4, max_workers=2, min_pixels=1)
+    try:
+        validated = validate("mean_filter", {"kernel_size": 15})
+        expected = ImageProcessorManager.execute("mean_filter", color_image, validated)
+        assert np.array_equal(executor.run("mean_filter", validated, color_image), expected)
+    finally:
+        executor.shutdown()
+
+
+def test_tiled_writes_into_given_output(color_image, executor, tmp_path):
+    validated = validate("gaussian_filter", {})
+    source = np.memmap(tmp_path / "input.raw", dtype=np.uint8, mode="w+", shape=color_image.shape)
+    source[:] = color_image
+    out = np.memmap(tmp_path / "output.raw", dtype=np.uint8, mode="w+", shape=color_image.shape)
+    result = executor.run("gaussian_filter", validated, source, out=out)
+    assert result is out
+    assert np.array_equal(out, ImageProcessorManager.execute("gaussian_filter", color_image, validated))
+
+
+def test_should_tile(color_image, executor):
+    validated = validate("mean_filter", {})
+    assert executor.should_tile("mean_filter", validated, color_image)
+    assert not executor.should_tile("mean_filter", validate("mean_filter", {"roi": "0,0,10,10"}), color_image)
+    assert not executor.should_tile("threshold", validate("threshold", {}), color_image)
+    assert not TiledExecutor(min_pixels=0).should_tile("mean_filter", validated, color_image)
+    assert not TiledExecutor(min_pixels=color_image.shape[0] * color_image.shape[1] + 1).should_tile(
+        "mean_filter", validated, color_image)
+
+
+def test_unsupported_processor_is_rejected(color_image, executor):
+    with pytest.raises(ValueError):
+        executor.run("threshold", validate("threshold", {}), color_image)
+
+
+def test_plan_uses_tiles(image, executor, monkeypatch):
+    monkeypatch.setattr(pipeline_planner, "get_tiled_executor", lambda: executor)
+    calls = []
+    run = executor.run
+    monkeypatch.setattr(executor, "run", lambda *args, **kwargs: calls.append(args[0]) or run(*args, **kwargs))
+    
+    chain = [("gaussian_filter", {}), ("threshold", {}), ("erosion", {"kernel_size": 5}), ("erosion", {"kernel_size": 5})]
+    planned = PipelinePlanner.execute(compile_chain(chain), image)
+    assert calls == ["gaussian_filter", "erosion"]
+    assert np.array_equal(planned, run_sequential(chain, image))